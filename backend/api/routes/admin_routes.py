@@ -0,0 +1,206 @@
+from flask import Blueprint, Response, g, jsonify, request
+import hmac
+import logging
+import os
+import threading
+import tracemalloc
+
+from api.services.profiling import ProfileStore, SamplingProfiler, format_stats, tracemalloc_status
+
+admin_bp = Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
+
+_profile_store = None
+
+def get_profile_store():
+    """Get the profile store, shared by every worker on this host through PROFILE_PATH"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore()
+    return _profile_store
+
+def is_admin(req):
+    """Check the request's admin token; always false when ADMIN_TOKEN is unset"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    if not expected:
+        return False
+    token = req.headers.get('X-Admin-Token', '')
+    authorization = req.headers.get('Authorization', '')
+    if not token and authorization.startswith('Bearer '):
+        token = authorization[len('Bearer '):]
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+@admin_bp.before_request
+def require_admin():
+    # Without ADMIN_TOKEN the admin surface does not exist
+    if not os.environ.get('ADMIN_TOKEN'):
+        return jsonify({'error': 'Endpoint not found'}), 404
+    if not is_admin(request):
+        return jsonify({'error': 'Admin token required'}), 403
+
+# Per-request profiling: send X-Profile with an admin token and the request's
+# own thread is sampled while the view runs. The profile is saved and its id
+# returned in X-Profile-Id; X-Profile: folded returns the stacks as the body.
+@admin_bp.before_app_request
+def start_request_profile():
+    if 'X-Profile' in request.headers and is_admin(request):
+        interval = float(os.environ.get('PROFILE_REQUEST_INTERVAL_MS', 1)) / 1000
+        g.request_profiler = SamplingProfiler(interval=interval, thread_ids={threading.get_ident()}).start()
+
+@admin_bp.after_app_request
+def finish_request_profile(response):
+    profiler = g.pop('request_profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    try:
+        profile_id = get_profile_store().save_folded(
+            profiler, 'request', meta=f"method={request.method} path={request.path} status={response.status_code}"
+        )
+    except Exception as e:
+        logger.error(f"Error saving request profile: {str(e)}")
+        return response
+    if request.headers.get('X-Profile') == 'folded':
+        response = Response(get_profile_store().read_folded(profile_id), mimetype='text/plain')
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@admin_bp.route('/profile', methods=['POST'])
+def start_profile():
+    """Sample every thread of the answering worker for a number of seconds"""
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', 10))
+        if interval_ms < 1:
+            raise ValueError('interval_ms must be at least 1')
+
+        profile_id = get_profile_store().start_sampling(seconds, interval_ms / 1000)
+        if profile_id is None:
+            return jsonify({'error': 'A profile is already running in this worker', 'pid': os.getpid()}), 409
+
+        return jsonify({
+            'id': profile_id,
+            'pid': os.getpid(),
+            'seconds': seconds,
+            'interval_ms': interval_ms,
+            'result': f"/api/admin/profiles/{profile_id}"
+        }), 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting profile: {str(e)}")
+        return jsonify({'error': 'Failed to start profile'}), 500
+
+@admin_bp.route('/profiles')
+def list_profiles():
+    """List saved CPU profiles and memory snapshots from every worker"""
+    try:
+        profiles = get_profile_store().list(kind=request.args.get('kind'))
+        return jsonify({'profiles': profiles, 'count': len(profiles)})
+    except Exception as e:
+        logger.error(f"Error listing profiles: {str(e)}")
+        return jsonify({'error': 'Failed to list profiles'}), 500
+
+@admin_bp.route('/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Get a CPU profile as folded stacks, ready for flamegraph.pl or speedscope"""
+    try:
+        folded = get_profile_store().read_folded(profile_id)
+        if folded is None:
+            return jsonify({'error': 'Profile not found, or still running'}), 404
+        return Response(folded, mimetype='text/plain')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading profile {profile_id}: {str(e)}")
+        return jsonify({'error': 'Failed to read profile'}), 500
+
+@admin_bp.route('/memory')
+def memory_status():
+    """Get tracemalloc status of the answering worker"""
+    return jsonify(tracemalloc_status())
+
+@admin_bp.route('/memory/start', methods=['POST'])
+def start_memory_tracing():
+    """Start tracing allocations in the answering worker"""
+    try:
+        frames = int(request.args.get('frames', 10))
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"tracemalloc started with {frames} frames")
+        return jsonify(tracemalloc_status())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@admin_bp.route('/memory/stop', methods=['POST'])
+def stop_memory_tracing():
+    """Stop tracing allocations in the answering worker and free the traces"""
+    tracemalloc.stop()
+    return jsonify(tracemalloc_status())
+
+@admin_bp.route('/memory/snapshot', methods=['POST'])
+def take_memory_snapshot():
+    """Save a tracemalloc snapshot of the answering worker and return its largest allocation sites"""
+    try:
+        limit = int(request.args.get('limit', 20))
+        taken = get_profile_store().take_snapshot()
+        if taken is None:
+            return jsonify({'error': 'tracemalloc is not running in this worker', 'pid': os.getpid()}), 409
+
+        profile_id, snapshot = taken
+        return jsonify({
+            'id': profile_id,
+            **tracemalloc_status(),
+            'top': format_stats(snapshot.statistics('lineno'), limit)
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {str(e)}")
+        return jsonify({'error': 'Failed to take memory snapshot'}), 500
+
+@admin_bp.route('/memory/diff')
+def diff_memory_snapshots():
+    """Compare two snapshots, by default the two newest from the same worker
+
+    Allocation sites that grew the most come first; a site that keeps growing
+    across successive snapshots is a leak candidate.
+    """
+    try:
+        store = get_profile_store()
+        base_id = request.args.get('base')
+        target_id = request.args.get('target')
+        group_by = request.args.get('group_by', 'lineno')
+        limit = int(request.args.get('limit', 20))
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            raise ValueError('group_by must be lineno, filename or traceback')
+
+        if not (base_id and target_id):
+            snapshots = store.list(kind='memory')
+            if snapshots:
+                pid = snapshots[0]['pid']
+                snapshots = [entry for entry in snapshots if entry['pid'] == pid]
+            if len(snapshots) < 2:
+                return jsonify({'error': 'Need two snapshots from the same worker'}), 404
+            target_id, base_id = snapshots[0]['id'], snapshots[1]['id']
+
+        base, target = store.load_snapshot(base_id), store.load_snapshot(target_id)
+        if base is None or target is None:
+            return jsonify({'error': 'Snapshot not found'}), 404
+
+        stats = target.compare_to(base, group_by)
+        return jsonify({
+            'base': base_id,
+            'target': target_id,
+            'group_by': group_by,
+            'size_diff_kb': round(sum(stat.size_diff for stat in stats) / 1024, 1),
+            'top': format_stats(stats, limit)
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error diffing memory snapshots: {str(e)}")
+        return jsonify({'error': 'Failed to diff memory snapshots'}), 500
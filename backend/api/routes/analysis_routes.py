@@ -1,18 +1,58 @@
-from flask import Blueprint, jsonify, request
-from flask_limiter import Limiter
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+import calendar
 import logging
 from datetime import datetime, timedelta
 import json
 import numpy as np
-import pandas as pd
 from collections import defaultdict
 
 from api.services.temporal_processing import TemporalProcessor
+from api.services.data_export import DataExporter, ExportError, EXPORT_FORMATS
+from api.services.time_series_archive import TimeSeriesArchive, month_start, next_month
+from api.services.accessibility import AccessibilityEngine
+from api.services.correlation_engine import CorrelationEngine
+from api.services.usage_cube import UsageCube, mean_std, COUNT
+from api.services.forecasting import Forecaster, HORIZON_STEPS, STEP_MINUTES
+from api.services.schedule_index import seconds_since_midnight
+from api.services.spatial_processing import SpatialProcessor
+from api.services.synthetic_data import seeded_offset
+from api.services.catalog import catalog
+from api.routes.transit_routes import get_journey_planner, get_all_station_data, parse_departure
+from api.routes.attraction_routes import get_all_attractions
 from utils.data_cache import cache_manager
 
 analysis_bp = Blueprint('analysis', __name__)
 logger = logging.getLogger(__name__)
 
+temporal_processor = TemporalProcessor()
+data_exporter = DataExporter()
+_archive = None
+_usage_cube = None
+_forecaster = None
+
+TRANSIT_USAGE_METRIC = 'passenger_count'
+ATTRACTION_USAGE_METRIC = 'current_occupancy'
+WEEKDAYS = range(5)
+WEEKEND = (5, 6)
+SEASONS = {
+    'dry_season': (3, 4, 5, 6, 7, 8),
+    'wet_season': (9, 10, 11, 12, 1, 2)
+}
+
+# Units of the monthly means archived_monthly_trends() reports
+ARCHIVED_TREND_UNITS = {
+    'passenger_count': 'mean passengers per station',
+    'delay_minutes': 'mean delay minutes per station',
+    'popularity_score': 'mean popularity score per attraction',
+    'current_occupancy': 'mean occupancy percent per attraction',
+}
+
+CORRELATION_WINDOWS = {
+    'today': timedelta(days=1),
+    'last_week': timedelta(days=7),
+    'last_month': timedelta(days=30),
+}
+
 @analysis_bp.route('/trends')
 def get_trend_analysis():
     """Get trend analysis based on time range and metric"""
@@ -51,6 +91,7 @@ def get_trend_analysis():
             'historical': historical,
             'labels': trend_data['labels'],
             'values': trend_data['values'],
+            'unit': trend_data.get('unit'),
             'distribution': trend_data.get('distribution', [25, 35, 20, 20]),
             'statistics': statistics
         }
@@ -66,43 +107,57 @@ def get_trend_analysis():
 
 @analysis_bp.route('/patterns')
 def get_pattern_analysis():
-    """Get pattern analysis for transit and attraction usage"""
+    """Get pattern analysis for transit and attraction usage
+
+    The usage cubes aggregate every archived observation by hour of week
+    and month, so patterns cover all data collected so far; there is no
+    recent-window filter.
+    """
     try:
-        time_range = request.args.get('timeRange', 'last_week')
+        entity_ids = request.args.getlist('entity') or None
+        lines = request.args.getlist('line') or None
+        categories = request.args.getlist('category') or None
+        months = [int(month) for month in request.args.get('months', '').split(',') if month] or None
+        if months and not all(1 <= month <= 12 for month in months):
+            return jsonify({'error': 'months must be between 1 and 12'}), 400
         
-        # Generate pattern data
+        cube = get_usage_cube()
+        transit_filters = {'entity_ids': entity_ids, 'groups': lines, 'months': months}
+        attraction_filters = {'entity_ids': entity_ids, 'groups': categories, 'months': months}
+        transit = cube.query(TRANSIT_USAGE_METRIC, ('dow', 'hour'), **transit_filters)
+        attractions = cube.query(ATTRACTION_USAGE_METRIC, ('dow', 'hour'), **attraction_filters)
+        
+        # Pattern data derived from the usage cubes
         patterns = {
-            'peak_hours': {
-                'morning': '07:00-09:00',
-                'evening': '17:00-19:00',
-                'lunch': '12:00-14:00'
-            },
+            'peak_hours': peak_hours(transit),
             'daily_patterns': {
-                'weekday': generate_weekday_patterns(),
-                'weekend': generate_weekend_patterns()
-            },
-            'seasonal_patterns': {
-                'dry_season': {'trend': 'increasing', 'peak_months': ['March', 'April', 'May']},
-                'wet_season': {'trend': 'decreasing', 'peak_months': ['November', 'December', 'January']}
+                'weekday': daily_pattern(transit, WEEKDAYS),
+                'weekend': daily_pattern(transit, WEEKEND)
             },
+            'seasonal_patterns': seasonal_patterns(
+                cube.query(TRANSIT_USAGE_METRIC, ('month',), entity_ids=entity_ids, groups=lines)
+            ),
             'transit_patterns': {
-                'lrt_usage': 'High during peak hours, moderate off-peak',
-                'mrt_usage': 'Consistent throughout day with morning/evening peaks',
-                'brt_usage': 'Focused on specific routes, morning/evening peaks'
+                line: group_pattern(stats)
+                for line, stats in cube.query_by_group(TRANSIT_USAGE_METRIC, **transit_filters).items()
             },
             'attraction_patterns': {
-                'malls': 'Peak during weekends and holidays',
-                'restaurants': 'Peak during lunch (12-14) and dinner (19-21) times',
-                'entertainment': 'Peak during weekends and evening hours'
+                category: group_pattern(stats)
+                for category, stats in cube.query_by_group(ATTRACTION_USAGE_METRIC, **attraction_filters).items()
+            },
+            'observations': {
+                'transit': int(transit[..., COUNT].sum()) if transit is not None else 0,
+                'attractions': int(attractions[..., COUNT].sum()) if attractions is not None else 0
             }
         }
         
         return jsonify({
-            'time_range': time_range,
             'patterns': patterns,
             'timestamp': datetime.now().isoformat()
         })
         
+    except ValueError:
+        return jsonify({'error': 'Invalid months parameter'}), 400
     except Exception as e:
         logger.error(f"Error in pattern analysis: {str(e)}")
         return jsonify({'error': 'Failed to generate pattern analysis'}), 500
@@ -112,55 +167,215 @@ def get_correlation_analysis():
     """Get correlation analysis between transit and attraction usage"""
     try:
         time_range = request.args.get('timeRange', 'last_week')
+        method = request.args.get('method', 'pearson')
+        resolution = int(request.args.get('resolution', 60))
+        max_lag = min(int(request.args.get('max_lag', 3)), 24)
+        if method not in ('pearson', 'spearman') or resolution < 1:
+            return jsonify({'error': 'Invalid method or resolution parameter'}), 400
         
-        # Generate correlation data
-        correlations = {
-            'transit_attraction': {
-                'correlation_strength': 0.75,
-                'description': 'Strong positive correlation between transit usage and attraction footfall',
-                'insights': [
-                    'Higher transit usage correlates with increased mall activity',
-                    'Restaurant peaks align with lunch/dinner transit schedules',
-                    'Entertainment venues show strong evening transit correlation'
-                ]
-            },
-            'peak_correlations': {
-                'morning_peak': {
-                    'transit': 'High',
-                    'malls': 'Moderate',
-                    'restaurants': 'Low',
-                    'entertainment': 'Low'
+        # Windows end on the current hour so results are cached per window
+        end = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        start = end - CORRELATION_WINDOWS.get(time_range, CORRELATION_WINDOWS['last_week'])
+        
+        # Keyed on the catalog generation so a reload with new stations or
+        # attractions is not answered from pairs of the previous generation
+        cache_key = (f'correlations_{time_range}_{method}_{resolution}_{max_lag}_{end:%Y%m%d%H}'
+                     f'_g{catalog.generation}')
+        cached_data = cache_manager.get(cache_key)
+        if cached_data:
+            return jsonify(cached_data)
+        
+        engine = get_correlation_engine()
+        summary = engine.summarize(engine.correlate(start, end, resolution, max_lag, method))
+        
+        result = {
+            'time_range': time_range,
+            'window': {'start': start.isoformat(), 'end': end.isoformat()},
+            'method': method,
+            'resolution_minutes': resolution,
+            'correlations': {
+                'transit_attraction': {
+                    'correlation_strength': summary['correlation_strength'],
+                    'description': describe_correlation(summary['correlation_strength']),
+                    'insights': correlation_insights(summary, resolution),
+                    'pairs_considered': summary['pairs_considered'],
+                    'pairs_with_data': summary['pairs_with_data']
                 },
-                'evening_peak': {
-                    'transit': 'High',
-                    'malls': 'High',
-                    'restaurants': 'High',
-                    'entertainment': 'Moderate'
-                }
+                'top_pairs': summary['top_pairs'],
+                'by_category': summary['by_category']
             },
-            'seasonal_correlations': {
-                'ramadan': {
-                    'transit_usage': 'decreased',
-                    'mall_footfall': 'decreased',
-                    'restaurant_activity': 'shifted',
-                    'note': 'Late-night shopping increases'
-                },
-                'festivals': {
-                    'transit_usage': 'increased',
-                    'attraction_activity': 'significantly_increased'
-                }
-            }
+            'timestamp': datetime.now().isoformat()
         }
         
+        # Cache until the window moves
+        cache_manager.set(cache_key, result, timeout=3600)
+        
+        return jsonify(result)
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid resolution or max_lag parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error in correlation analysis: {str(e)}")
+        return jsonify({'error': 'Failed to generate correlation analysis'}), 500
+
+@analysis_bp.route('/forecast')
+def get_forecast():
+    """Get precomputed short-term forecasts for stations or attractions"""
+    try:
+        metric = request.args.get('metric', 'passenger_count')
+        entity_ids = request.args.getlist('entity')
+        horizon = int(request.args.get('horizon', 60))
+        forecaster = get_forecaster()
+        if metric not in forecaster.metrics:
+            return jsonify({'error': f"Unknown metric '{metric}'", 'metrics': list(forecaster.metrics)}), 400
+        if not entity_ids:
+            return jsonify({'error': 'At least one entity parameter is required'}), 400
+        if not STEP_MINUTES <= horizon <= HORIZON_STEPS * STEP_MINUTES:
+            return jsonify({'error': f'horizon must be between {STEP_MINUTES} and {HORIZON_STEPS * STEP_MINUTES} minutes'}), 400
+        
+        forecasts = {entity_id: forecaster.get(metric, entity_id, horizon) for entity_id in entity_ids}
+        missing = [entity_id for entity_id, forecast in forecasts.items() if forecast is None]
+        if len(missing) == len(entity_ids):
+            return jsonify({'error': 'No forecast available yet', 'missing': missing}), 404
+        
         return jsonify({
-            'time_range': time_range,
-            'correlations': correlations,
+            'metric': metric,
+            'horizon_minutes': horizon,
+            'forecasts': [forecast for forecast in forecasts.values() if forecast is not None],
+            'missing': missing,
             'timestamp': datetime.now().isoformat()
         })
         
+    except ValueError:
+        return jsonify({'error': 'Invalid horizon parameter'}), 400
     except Exception as e:
-        logger.error(f"Error in correlation analysis: {str(e)}")
-        return jsonify({'error': 'Failed to generate correlation analysis'}), 500
+        logger.error(f"Error getting forecast: {str(e)}")
+        return jsonify({'error': 'Failed to get forecast'}), 500
+
+@analysis_bp.route('/accessibility')
+def get_accessibility_analysis():
+    """Get attraction reachability rankings and an accessibility heatmap grid"""
+    try:
+        budget = min(int(request.args.get('budget', 30)), 180)
+        grid_size = max(float(request.args.get('grid_size', 0.01)), 0.005)
+        departure_time = parse_departure(request.args.get('date'), request.args.get('depart'))
+        
+        engine = get_accessibility_engine()
+        weekday = departure_time.weekday()
+        departure = seconds_since_midnight(departure_time)
+        
+        # Surfaces are cached per departure-time bucket, not per request time
+        cache_key = f'accessibility_{weekday}_{engine.bucket_of(departure)}_{budget}_{grid_size}'
+        cached_data = cache_manager.get(cache_key)
+        if cached_data:
+            return jsonify(cached_data)
+        
+        locations = get_all_station_data() + get_all_attractions()
+        bounds = SpatialProcessor().get_spatial_bounds(locations)
+        padding = grid_size
+        surface = engine.surface(
+            weekday, departure,
+            (bounds['min_lat'] - padding, bounds['min_lng'] - padding,
+             bounds['max_lat'] + padding, bounds['max_lng'] + padding),
+            grid_size=grid_size, budget_minutes=budget
+        )
+        
+        result = {
+            'timestamp': datetime.now().isoformat(),
+            'budget_minutes': budget,
+            'departure_bucket': {
+                'weekday': weekday,
+                'start': str(timedelta(seconds=engine.bucket_of(departure) * engine.bucket_seconds))
+            },
+            'stations': engine.rank_stations(weekday, departure, budget),
+            'attractions': engine.rank_attractions(weekday, departure, budget),
+            'surface': {
+                'grid_size': grid_size,
+                'max_accessibility': surface['max_accessibility'],
+                'cells': [
+                    {key: cell[key] for key in ('center_lat', 'center_lng', 'accessibility')}
+                    for cell in surface['grid_cells'] if cell['accessibility'] > 0
+                ]
+            }
+        }
+        
+        # Cache for 30 minutes
+        cache_manager.set(cache_key, result, timeout=1800)
+        
+        return jsonify(result)
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid budget, grid_size, depart or date parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error in accessibility analysis: {str(e)}")
+        return jsonify({'error': 'Failed to generate accessibility analysis'}), 500
+
+@analysis_bp.route('/export/<table>')
+def export_table(table):
+    """Stream a table export as Parquet, Arrow IPC or CSV"""
+    try:
+        export_format = request.args.get('format', 'parquet')
+        columns = [column for column in request.args.get('columns', '').split(',') if column] or None
+        entity_ids = [entity for entity in request.args.get('entity', '').split(',') if entity] or None
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        
+        chunks = data_exporter.stream(table, export_format, columns, start, end, entity_ids)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={table}.{extension}'}
+        )
+        
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error exporting {table}: {str(e)}")
+        return jsonify({'error': 'Failed to export data'}), 500
+
+def get_correlation_engine():
+    """Get the correlation engine, with its station/attraction pairs, from the shared catalog"""
+    return catalog.get('correlation_engine')
+
+def describe_correlation(strength):
+    """Describe a median correlation coefficient"""
+    if strength is None:
+        return 'Not enough archived data to correlate transit usage and attraction footfall'
+    if strength >= 0.5:
+        return 'Strong positive correlation between transit usage and attraction footfall'
+    if strength >= 0.2:
+        return 'Moderate positive correlation between transit usage and attraction footfall'
+    if strength > -0.2:
+        return 'Weak correlation between transit usage and attraction footfall'
+    return 'Negative correlation between transit usage and attraction footfall'
+
+def correlation_insights(summary, resolution_minutes):
+    """Derive insights from a correlation summary"""
+    insights = []
+    categories = sorted(summary['by_category'].items(), key=lambda item: item[1]['mean_correlation'], reverse=True)
+    if categories:
+        category, stats = categories[0]
+        insights.append(f"{category} shows the strongest link to nearby station ridership (mean r={stats['mean_correlation']})")
+    if len(categories) > 1:
+        category, stats = categories[-1]
+        insights.append(f"{category} is least tied to nearby station ridership (mean r={stats['mean_correlation']})")
+    lagged = [pair for pair in summary['top_pairs'] if pair['best_lag_periods'] != 0]
+    if lagged:
+        pair = lagged[0]
+        direction = 'after' if pair['best_lag_periods'] > 0 else 'before'
+        minutes = abs(pair['best_lag_periods']) * resolution_minutes
+        insights.append(
+            f"{pair['attraction_name']} activity peaks {minutes} min {direction} ridership at {pair['station_name']}"
+        )
+    return insights
+
+def get_accessibility_engine():
+    """Get the accessibility engine from the shared catalog"""
+    return catalog.get('accessibility_engine')
 
 def generate_realtime_trends(metric):
     """Generate real-time trends (last 30 minutes)"""
@@ -172,14 +387,14 @@ def generate_realtime_trends(metric):
         time_point = current_time - timedelta(minutes=29-i)
         labels.append(time_point.strftime('%H:%M'))
         
-        # Simulate real-time values with some randomness
+        # Simulate real-time values with some deterministic noise
         base_value = {
             'passenger_count': 500,
             'delay_minutes': 2,
             'active_routes': 24
         }.get(metric, 500)
         
-        value = base_value + np.random.randint(-50, 50)
+        value = base_value + seeded_offset(f'realtime:{metric}', time_point.strftime('%Y-%m-%dT%H:%M'), -50, 50)
         values.append(max(0, value))
     
     return {'labels': labels, 'values': values}
@@ -210,7 +425,7 @@ def generate_hourly_trends(metric):
             'active_routes': 24
         }.get(metric, 800)
         
-        value = int(base_value * base_multiplier) + np.random.randint(-100, 100)
+        value = int(base_value * base_multiplier) + seeded_offset(f'hourly:{metric}', time_point.strftime('%Y-%m-%dT%H'), -100, 100)
         values.append(max(0, value))
     
     return {'labels': labels, 'values': values}
@@ -234,7 +449,7 @@ def generate_daily_trends(metric):
             'active_routes': 24
         }.get(metric, 50000)
         
-        value = int(base_value * base_multiplier) + np.random.randint(-5000, 5000)
+        value = int(base_value * base_multiplier) + seeded_offset(f'daily:{metric}', date_point.date(), -5000, 5000)
         values.append(max(0, value))
     
     return {'labels': labels, 'values': values}
@@ -254,13 +469,17 @@ def generate_weekly_trends(metric):
             'active_routes': 24
         }.get(metric, 350000)
         
-        value = base_value + np.random.randint(-30000, 30000)
+        value = base_value + seeded_offset(f'weekly:{metric}', week_point.strftime('%G-W%V'), -30000, 30000)
         values.append(max(0, value))
     
     return {'labels': labels, 'values': values}
 
 def generate_monthly_trends(metric):
     """Generate monthly trends (last 12 months)"""
+    archived = archived_monthly_trends(metric)
+    if archived:
+        return archived
+    
     labels = []
     values = []
     
@@ -285,11 +504,41 @@ def generate_monthly_trends(metric):
             'active_routes': 24
         }.get(metric, 1500000)
         
-        value = int(base_value * seasonal_multiplier) + np.random.randint(-100000, 100000)
+        value = int(base_value * seasonal_multiplier) + seeded_offset(f'monthly:{metric}', f'{year}-{month:02d}', -100000, 100000)
         values.append(max(0, value))
     
     return {'labels': labels, 'values': values}
 
+def archived_monthly_trends(metric):
+    """Get the last 12 months of a metric from the archive, or None without data
+
+    Archived metrics are gauges sampled per station (passengers present,
+    minutes late), so each month is the mean reading rather than a sum,
+    which would count passenger-minutes.
+    """
+    archive = get_archive()
+    if metric not in archive.metrics():
+        return None
+    
+    end = next_month(datetime.now())
+    start = month_start(end - timedelta(days=365))
+    starts, totals = temporal_processor.aggregate_archive(archive, metric, start, end, period='month', how='mean')
+    if not len(totals) or np.all(np.isnan(totals)):
+        return None
+    
+    return {
+        'labels': [period_start.strftime('%Y-%m') for period_start in starts],
+        'values': [0 if np.isnan(value) else round(float(value), 2) for value in totals],
+        'unit': ARCHIVED_TREND_UNITS.get(metric, f'mean {metric} per entity')
+    }
+
+def get_archive():
+    """Get the historical metric archive"""
+    global _archive
+    if _archive is None:
+        _archive = TimeSeriesArchive()
+    return _archive
+
 def calculate_trend_statistics(values):
     """Calculate statistics for trend data"""
     if not values:
@@ -307,20 +556,134 @@ def calculate_trend_statistics(values):
         'growth_rate': round(((values[-1] - values[0]) / values[0]) * 100, 1) if values[0] > 0 else 0
     }
 
-def generate_weekday_patterns():
-    """Generate weekday usage patterns"""
+def get_forecaster():
+    """Get the forecasting service, reading from the shared archive"""
+    global _forecaster
+    if _forecaster is None:
+        _forecaster = Forecaster(archive_path=get_archive().path)
+    return _forecaster
+
+def get_usage_cube():
+    """Get the usage cube store, created on first use"""
+    global _usage_cube
+    if _usage_cube is None:
+        _usage_cube = UsageCube()
+    return _usage_cube
+
+def hourly_means(stats, days=None):
+    """Get the 24 hourly means of (dow, hour, stat) stats over the given days"""
+    if days is not None:
+        stats = stats[list(days)]
+    return mean_std(stats.sum(axis=0))[0]
+
+def format_hours(start, end):
+    """Format an hour range as HH:00-HH:00"""
+    return f"{start % 24:02d}:00-{end % 24:02d}:00"
+
+def peak_window(means, first_hour, last_hour, width=2):
+    """Get the width-hour window with the highest mean usage starting in [first_hour, last_hour]"""
+    candidates = np.arange(first_hour, last_hour + 1)
+    windows = means[(candidates[:, None] + np.arange(width)) % 24]
+    observed = (~np.isnan(windows)).sum(axis=1)
+    if not observed.any():
+        return None
+    window_means = np.where(observed > 0, np.nansum(windows, axis=1) / np.maximum(observed, 1), -np.inf)
+    best = int(candidates[np.argmax(window_means)])
+    return format_hours(best, best + width)
+
+def hour_ranges(mask):
+    """Format the hours where mask is set as comma-separated ranges, wrapping past midnight"""
+    if mask.all():
+        return '00:00-24:00'
+    if not mask.any():
+        return None
+    # Start scanning just after an unset hour so wrapped runs stay whole
+    origin = int(np.flatnonzero(~mask)[-1]) + 1
+    ranges, start = [], None
+    for offset in range(25):
+        hour = origin + offset
+        if offset < 24 and mask[hour % 24]:
+            if start is None:
+                start = hour
+        elif start is not None:
+            ranges.append(format_hours(start, hour))
+            start = None
+    return ', '.join(ranges)
+
+def peak_hours(stats):
+    """Get morning, lunch and evening peak windows from (dow, hour, stat) stats"""
+    if stats is None:
+        return {'morning': None, 'evening': None, 'lunch': None}
+    means = hourly_means(stats)
     return {
-        'peak_morning': '07:30-09:30',
-        'peak_evening': '17:30-19:30',
-        'moderate_hours': '10:00-16:00',
-        'low_hours': '20:00-06:00'
+        'morning': peak_window(means, 5, 9),
+        'evening': peak_window(means, 16, 20),
+        'lunch': peak_window(means, 11, 13)
     }
 
-def generate_weekend_patterns():
-    """Generate weekend usage patterns"""
+def daily_pattern(stats, days):
+    """Describe the hourly usage profile over a set of days"""
+    if stats is None:
+        return {'peak_morning': None, 'peak_evening': None, 'moderate_hours': None, 'low_hours': None, 'hourly': []}
+    means = hourly_means(stats, days)
+    observed = ~np.isnan(means)
+    if not observed.any():
+        return {'peak_morning': None, 'peak_evening': None, 'moderate_hours': None, 'low_hours': None, 'hourly': []}
+    
+    # Classify hours against the day's own range
+    low, high = np.nanpercentile(means, 25), np.nanpercentile(means, 75)
     return {
-        'shopping_peak': '14:00-18:00',
-        'dining_peak': '12:00-14:00, 19:00-21:00',
-        'entertainment_peak': '20:00-23:00',
-        'transit_moderate': 'Throughout day with evening peak'
-    }
\ No newline at end of file
+        'peak_morning': peak_window(means, 5, 10),
+        'peak_evening': peak_window(means, 15, 21),
+        'moderate_hours': hour_ranges(observed & (means > low) & (means < high)),
+        'low_hours': hour_ranges(observed & (means <= low)),
+        'hourly': [None if np.isnan(value) else round(float(value), 1) for value in means]
+    }
+
+def seasonal_patterns(stats):
+    """Compare usage levels across seasons from (month, stat) stats"""
+    if stats is None:
+        return {season: None for season in SEASONS}
+    means = mean_std(stats)[0]
+    overall = np.nanmean(means) if not np.isnan(means).all() else np.nan
+    patterns = {}
+    for season, months in SEASONS.items():
+        values = np.array([means[month - 1] for month in months])
+        observed = [(month, value) for month, value in zip(months, values) if not np.isnan(value)]
+        if not observed:
+            patterns[season] = None
+            continue
+        # Trend across the season's months in calendar order
+        half = len(observed) // 2
+        early = np.mean([value for _, value in observed[:half]]) if half else observed[0][1]
+        late = np.mean([value for _, value in observed[half:]])
+        change = (late - early) / early * 100 if early else 0
+        trend = 'increasing' if change > 5 else 'decreasing' if change < -5 else 'stable'
+        level = np.mean([value for _, value in observed])
+        patterns[season] = {
+            'trend': trend,
+            'peak_months': [calendar.month_name[month] for month, _ in sorted(observed, key=lambda item: -item[1])[:3]],
+            'shift_percent': round(float((level - overall) / overall * 100), 1) if overall else 0,
+            'months_observed': len(observed)
+        }
+    return patterns
+
+def group_pattern(stats):
+    """Summarize the weekday and weekend peaks of one line or category"""
+    weekday, weekend = hourly_means(stats, WEEKDAYS), hourly_means(stats, WEEKEND)
+    overall = hourly_means(stats)
+    observed = overall[~np.isnan(overall)]
+    pattern = {
+        'weekday_peak': peak_window(weekday, 0, 23),
+        'weekend_peak': peak_window(weekend, 0, 23),
+        'peak_to_offpeak': round(float(observed.max() / observed.min()), 2) if len(observed) and observed.min() > 0 else None,
+        'weekend_to_weekday': None
+    }
+    if not np.isnan(weekday).all() and not np.isnan(weekend).all() and np.nanmean(weekday) > 0:
+        pattern['weekend_to_weekday'] = round(float(np.nanmean(weekend) / np.nanmean(weekday)), 2)
+    return pattern
+
+catalog.register('accessibility_engine', lambda: AccessibilityEngine(get_journey_planner(), get_all_attractions()))
+catalog.register(
+    'correlation_engine', lambda: CorrelationEngine(get_archive(), get_all_station_data(), get_all_attractions())
+)
\ No newline at end of file
@@ -1,6 +1,6 @@
-from flask import Blueprint, jsonify, request
-from flask_limiter import Limiter
+from flask import Blueprint, jsonify, request, current_app
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 
@@ -8,6 +8,14 @@ import json
 from external_apis.google_places import GooglePlacesService
 from external_apis.foursquare_api import FoursquareService
 from external_apis.osm_api import OpenStreetMapService
+from api.services.provider_aggregator import ProviderAggregator
+from api.services.entity_resolution import EntityResolver
+from api.services.search_index import AttractionSearchIndex
+from api.services.catalog import catalog
+from sqlalchemy import event, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models.database import Attraction, EntityLink, db
+from models.serialization import Projection
 from utils.data_cache import cache_manager
 
 attraction_bp = Blueprint('attractions', __name__)
@@ -18,6 +26,27 @@ google_places_service = GooglePlacesService()
 foursquare_service = FoursquareService()
 osm_service = OpenStreetMapService()
 
+# Query providers concurrently; per-provider timeouts in seconds. Nominatim
+# is never hedged because of its 1 request/second usage policy.
+provider_aggregator = ProviderAggregator(max_workers=16)
+provider_aggregator.register('google_places', google_places_service.search_places, timeout=2.5, hedge_after=1.0)
+provider_aggregator.register('foursquare', foursquare_service.search_venues, timeout=2.5, hedge_after=1.0)
+provider_aggregator.register('osm', osm_service.search_pois, timeout=3.0)
+provider_aggregator.register('local', lambda *args: search_local_attractions(*args), timeout=1.0)
+
+entity_resolver = EntityResolver()
+
+# Entity links are written off the request path by a single writer thread,
+# so concurrent searches never race each other inside one process
+entity_link_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='entity-links')
+
+# Only the fields the search index needs
+ATTRACTION_PROJECTION = Projection(
+    Attraction,
+    fields=('id', 'name', 'category', 'latitude', 'longitude', 'address', 'rating', 'operating_hours', 'facilities'),
+    json_fields=('facilities',)
+)
+
 @attraction_bp.route('/active')
 def get_active_attractions():
     """Get currently active attractions based on time range"""
@@ -88,21 +117,21 @@ def search_attractions():
         
         # Search using multiple services
         results = []
+        provider_status = {}
         
         if query:
-            # Search by name/keyword
-            google_results = google_places_service.search_places(query, latitude, longitude, radius)
-            results.extend(google_results)
-            
-            foursquare_results = foursquare_service.search_venues(query, latitude, longitude, radius)
-            results.extend(foursquare_results)
+            # Search by name/keyword across all providers concurrently
+            provider_results, provider_status = provider_aggregator.search(
+                query, latitude, longitude, radius, wrap=with_app_context(current_app._get_current_object())
+            )
+            results.extend(provider_results)
             
         if category:
             # Search by category
             category_results = search_by_category(category, latitude, longitude, radius)
             results.extend(category_results)
         
-        # Remove duplicates based on coordinates
+        # Merge duplicate POIs across providers into canonical entities
         unique_results = remove_duplicate_locations(results)
         
         return jsonify({
@@ -110,6 +139,7 @@ def search_attractions():
             'category': category,
             'results': unique_results,
             'count': len(unique_results),
+            'providers': provider_status,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -117,6 +147,28 @@ def search_attractions():
         logger.error(f"Error searching attractions: {str(e)}")
         return jsonify({'error': 'Failed to search attractions'}), 500
 
+@attraction_bp.route('/autocomplete')
+def autocomplete_attractions():
+    """Suggest attractions from the local index as the user types"""
+    try:
+        prefix = request.args.get('q', '')
+        latitude = request.args.get('lat', type=float)
+        longitude = request.args.get('lng', type=float)
+        radius = request.args.get('radius', 5000, type=float)
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        
+        suggestions = get_search_index().autocomplete(prefix, latitude, longitude, radius / 1000, limit)
+        
+        return jsonify({
+            'query': prefix,
+            'suggestions': suggestions,
+            'count': len(suggestions)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error autocompleting attractions: {str(e)}")
+        return jsonify({'error': 'Failed to autocomplete attractions'}), 500
+
 @attraction_bp.route('/popularity')
 def get_attraction_popularity():
     """Get popularity metrics for attractions"""
@@ -330,6 +382,16 @@ def get_tourist_landmarks():
     
     return landmarks
 
+def get_all_attractions():
+    """Get attractions across all categories"""
+    all_attractions = []
+    all_attractions.extend(get_shopping_malls())
+    all_attractions.extend(get_restaurants())
+    all_attractions.extend(get_entertainment_venues())
+    all_attractions.extend(get_tourist_landmarks())
+    
+    return all_attractions
+
 def filter_by_time_range(attractions, time_range, date):
     """Filter attractions based on time range"""
     # This would implement actual time-based filtering logic
@@ -349,11 +411,7 @@ def search_by_category(category, latitude, longitude, radius):
     # This would implement category-based searching
     # For now, return filtered results based on category
     
-    all_attractions = []
-    all_attractions.extend(get_shopping_malls())
-    all_attractions.extend(get_restaurants())
-    all_attractions.extend(get_entertainment_venues())
-    all_attractions.extend(get_tourist_landmarks())
+    all_attractions = get_all_attractions()
     
     if category.lower() == 'malls':
         return [a for a in all_attractions if a['category'] == 'Shopping Mall']
@@ -364,34 +422,118 @@ def search_by_category(category, latitude, longitude, radius):
     else:
         return all_attractions
 
+def search_local_attractions(query, latitude=None, longitude=None, radius=5000):
+    """Search the local catalog index by name, category, cuisine and facilities"""
+    lat = float(latitude) if latitude else None
+    lng = float(longitude) if longitude else None
+    results = get_search_index().search(query, lat, lng, radius_km=float(radius) / 1000, limit=50)
+    return [{**document, 'search_score': round(score, 3)} for document, score in results]
+
+def build_search_index():
+    search_index = AttractionSearchIndex().add_many(get_all_attractions())
+    try:
+        search_index.add_many(ATTRACTION_PROJECTION.serialize_all(db.session.execute(ATTRACTION_PROJECTION.select())))
+    except Exception as e:
+        logger.error(f"Error loading attractions into search index: {str(e)}")
+    return search_index
+
+def get_search_index():
+    """Get the local search index from the shared catalog
+
+    Database attractions are kept in sync through SQLAlchemy mapper events.
+    """
+    return catalog.get('search_index')
+
+@event.listens_for(Attraction, 'after_insert')
+@event.listens_for(Attraction, 'after_update')
+def index_attraction(mapper, connection, row):
+    search_index = catalog.peek('search_index')
+    if search_index is not None:
+        search_index.add(row.to_dict())
+
+@event.listens_for(Attraction, 'after_delete')
+def unindex_attraction(mapper, connection, row):
+    search_index = catalog.peek('search_index')
+    if search_index is not None:
+        search_index.remove(row.id)
+
+def with_app_context(app):
+    """Wrap provider calls so they run inside the Flask app context"""
+    def wrap(func):
+        def call(*args, **kwargs):
+            with app.app_context():
+                return func(*args, **kwargs)
+        return call
+    return wrap
+
 def remove_duplicate_locations(results):
-    """Remove duplicate locations based on proximity"""
-    unique_results = []
-    
-    for result in results:
-        is_duplicate = False
-        for unique in unique_results:
-            # Check if locations are within 100 meters
-            distance = calculate_distance(
-                result['latitude'], result['longitude'],
-                unique['latitude'], unique['longitude']
+    """Merge duplicate POIs into canonical entities and persist the decisions"""
+    keys = [EntityResolver.source_key(result) for result in results]
+    known_links = load_entity_links(keys)
+    entities, links = entity_resolver.resolve(results, known_links)
+    changed = {key: link for key, link in links.items() if known_links.get(key) != link[0]}
+    if changed:
+        entity_link_writer.submit(with_app_context(current_app._get_current_object())(save_entity_links), changed, known_links)
+    return entities
+
+def load_entity_links(keys):
+    """Load persisted entity ids for (source, source_id) keys"""
+    try:
+        sources = {source for source, _ in keys}
+        source_ids = {source_id for _, source_id in keys}
+        if not keys:
+            return {}
+        rows = EntityLink.query.filter(
+            EntityLink.source.in_(sources), EntityLink.source_id.in_(source_ids)
+        ).all()
+        return {(row.source, row.source_id): row.entity_id for row in rows}
+    except Exception as e:
+        logger.error(f"Error loading entity links: {str(e)}")
+        return {}
+
+def save_entity_links(links, known_links):
+    """Persist new entity resolution decisions and re-point merged entities
+
+    New links are inserted with ON CONFLICT DO NOTHING, so a key another
+    worker already linked keeps its first decision. When a match merged
+    previously separate entities, every link of the absorbed entity is
+    re-pointed to the surviving one.
+    """
+    rows = [
+        {'source': source, 'source_id': source_id, 'entity_id': entity_id,
+         'match_score': score}
+        for (source, source_id), (entity_id, score) in links.items()
+        if (source, source_id) not in known_links
+    ]
+    merged = {
+        known_links[key]: entity_id
+        for key, (entity_id, _) in links.items()
+        if key in known_links and known_links[key] != entity_id
+    }
+    try:
+        if rows:
+            db.session.execute(insert_ignoring_duplicates(EntityLink.__table__, ('source', 'source_id')), rows)
+        for absorbed, survivor in merged.items():
+            db.session.execute(
+                update(EntityLink).where(EntityLink.entity_id == absorbed).values(entity_id=survivor)
             )
-            if distance < 100:  # 100 meters
-                is_duplicate = True
-                break
-        
-        if not is_duplicate:
-            unique_results.append(result)
-    
-    return unique_results
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error saving entity links: {str(e)}")
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in meters"""
-    # Simplified distance calculation
-    # In production, use proper geopy or haversine formula
-    return ((lat1 - lat2) ** 2 + (lon1 - lon2) ** 2) ** 0.5 * 111000  # Rough conversion to meters
+def insert_ignoring_duplicates(table, unique_columns):
+    """Build an INSERT that skips rows clashing on a unique constraint"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing(index_elements=unique_columns)
+    if dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing(index_elements=unique_columns)
+    raise ValueError(f"Unsupported database dialect for entity links: {dialect}")
 
 def is_open_today(attraction, date):
     """Check if attraction is open today"""
     # Simplified logic - would use actual business hours
-    return True
\ No newline at end of file
+    return True
+
+catalog.register('search_index', build_search_index)
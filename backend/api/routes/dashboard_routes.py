@@ -1,45 +1,40 @@
-from flask import Blueprint, jsonify, request
-from flask_limiter import Limiter
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 import logging
 from datetime import datetime, timedelta
 import json
+import os
+import threading
+import time
 
-from utils.data_cache import cache_manager
+from api.services.kpi_aggregator import KPIAggregator
+from api.services.alert_engine import AlertEngine
+from utils.data_cache import cache_manager, shared_snapshots
 
 dashboard_bp = Blueprint('dashboard', __name__)
 logger = logging.getLogger(__name__)
 
+_kpi_aggregator = None
+_alert_engine = None
+
+# Open /alerts/stream connections per process, and how long each one lasts
+ALERT_STREAM_SECONDS = int(os.environ.get('ALERT_STREAM_SECONDS', 300))
+_alert_streams = threading.BoundedSemaphore(int(os.environ.get('ALERT_STREAM_LIMIT', 4)))
+
 @dashboard_bp.route('/stats')
 def get_dashboard_stats():
     """Get dashboard statistics for real-time display"""
     try:
-        # Check cache first
-        cache_key = 'dashboard_stats'
-        cached_data = cache_manager.get(cache_key)
-        if cached_data:
-            return jsonify(cached_data)
-        
-        # Generate real-time statistics
-        stats = generate_realtime_stats()
+        # Snapshot of the incrementally maintained KPIs
+        stats = get_kpi_aggregator().snapshot()
         
         result = {
             'timestamp': datetime.now().isoformat(),
-            'active_routes': stats['active_routes'],
-            'total_passengers': stats['total_passengers'],
-            'busy_stations': stats['busy_stations'],
-            'busy_attractions': stats['busy_attractions'],
-            'avg_delay': stats['avg_delay'],
-            'efficiency_rate': stats['efficiency_rate'],
-            'on_time_percentage': stats['on_time_percentage'],
-            'transit_distribution': stats['transit_distribution'],
-            'system_status': stats['system_status'],
-            'weather': stats['weather'],
-            'alerts': stats['alerts']
+            **stats,
+            # No weather provider is integrated yet
+            'weather': None,
+            'alerts': get_alert_engine().summary()
         }
         
-        # Cache for 1 minute
-        cache_manager.set(cache_key, result, timeout=60)
-        
         return jsonify(result)
         
     except Exception as e:
@@ -96,104 +91,66 @@ def get_dashboard_summary():
 def get_dashboard_alerts():
     """Get current system alerts and notifications"""
     try:
-        alerts = [
-            {
-                'id': 'alert_001',
-                'type': 'transit',
-                'severity': 'warning',
-                'title': 'MRT SBK Line Minor Delays',
-                'message': 'Due to technical issues, expect 5-8 minute delays on SBK Line',
-                'location': 'Bandar Utama - Suria KLCC',
-                'timestamp': datetime.now().isoformat(),
-                'estimated_duration': '45 minutes',
-                'affected_services': ['MRT SBK'],
-                'recommendations': ['Consider alternate routes', 'Allow extra travel time']
-            },
-            {
-                'id': 'alert_002', 
-                'type': 'attraction',
-                'severity': 'info',
-                'title': 'Suria KLCC High Crowds',
-                'message': 'Higher than normal crowds expected due to school holidays',
-                'location': 'Suria KLCC',
-                'timestamp': datetime.now().isoformat(),
-                'estimated_duration': '2 hours',
-                'affected_services': ['Shopping Mall'],
-                'recommendations': ['Visit after 14:00', 'Use parking level B3-B5']
-            },
-            {
-                'id': 'alert_003',
-                'type': 'weather',
-                'severity': 'info',
-                'title': 'Light Rain Expected',
-                'message': 'Light rain expected in KL area from 16:00-18:00',
-                'location': 'Klang Valley Region',
-                'timestamp': datetime.now().isoformat(),
-                'estimated_duration': '2 hours',
-                'affected_services': ['All outdoor attractions'],
-                'recommendations': ['Carry umbrellas', 'Indoor attractions recommended']
-            }
-        ]
+        engine = get_alert_engine()
+        severity = request.args.get('severity')
+        alerts = engine.active_alerts()
+        if severity:
+            alerts = [alert for alert in alerts if alert['severity'] == severity]
         
-        return jsonify({
+        result = {
             'alerts': alerts,
             'count': len(alerts),
+            'summary': engine.summary(),
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        if request.args.get('include_resolved', 'false').lower() == 'true':
+            result['recently_resolved'] = engine.recently_resolved()
+        
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"Error fetching dashboard alerts: {str(e)}")
         return jsonify({'error': 'Failed to fetch dashboard alerts'}), 500
 
-def generate_realtime_stats():
-    """Generate realistic real-time statistics"""
-    import random
-    from datetime import datetime
-    
-    # Simulate realistic variations in real-time data
-    base_time = datetime.now()
-    
-    # Generate passenger counts with realistic patterns
-    current_hour = base_time.hour
-    hour_multiplier = 1.0
+@dashboard_bp.route('/alerts/stream')
+def stream_dashboard_alerts():
+    """Push raised and resolved alerts as server-sent events
+
+    Each stream holds a worker thread, so a process serves at most
+    ALERT_STREAM_LIMIT of them and closes each after ALERT_STREAM_SECONDS;
+    EventSource clients reconnect on their own, others can poll /alerts.
+    """
+    if not _alert_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many alert streams, poll /api/dashboard/alerts instead'}), 503, {'Retry-After': '30'}
     
-    if 7 <= current_hour <= 9 or 17 <= current_hour <= 19:  # Peak hours
-        hour_multiplier = 1.8
-    elif 10 <= current_hour <= 16:  # Business hours
-        hour_multiplier = 1.4
-    elif 22 <= current_hour or current_hour <= 6:  # Night hours
-        hour_multiplier = 0.5
+    def events():
+        yield 'retry: 5000\n\n'
+        deadline = time.monotonic() + ALERT_STREAM_SECONDS
+        for event in get_alert_engine().listen():
+            if event is None:
+                # Keep idle connections open through proxies
+                yield ': keep-alive\n\n'
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['alert'])}\n\n"
+            if time.monotonic() >= deadline:
+                break
     
-    return {
-        'active_routes': random.randint(22, 26),
-        'total_passengers': int(50000 * hour_multiplier) + random.randint(-5000, 5000),
-        'busy_stations': random.randint(6, 12),
-        'busy_attractions': random.randint(12, 18),
-        'avg_delay': round(random.uniform(1.2, 5.8), 1),
-        'efficiency_rate': round(random.uniform(88.5, 97.2), 1),
-        'on_time_percentage': round(random.uniform(82.3, 94.7), 1),
-        'transit_distribution': {
-            'lrt': random.randint(22, 32),
-            'mrt': random.randint(30, 40),
-            'brt': random.randint(18, 28),
-            'ktm': random.randint(12, 22)
-        },
-        'system_status': {
-            'overall': 'operational',
-            'lrt': 'operational',
-            'mrt': 'operational', 
-            'brt': 'operational',
-            'ktm': 'operational'
-        },
-        'weather': {
-            'condition': 'partly_cloudy',
-            'temperature': random.randint(26, 32),
-            'humidity': random.randint(65, 85),
-            'rainfall_chance': random.randint(10, 40)
-        },
-        'alerts': {
-            'active': random.randint(0, 3),
-            'total_today': random.randint(1, 8),
-            'resolved_today': random.randint(1, 6)
-        }
-    }
\ No newline at end of file
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(_alert_streams.release)
+    return response
+
+def get_kpi_aggregator():
+    """Get the KPI aggregator, shared across workers through Redis or snapshot files"""
+    global _kpi_aggregator
+    if _kpi_aggregator is None:
+        _kpi_aggregator = KPIAggregator(cache_manager.get_redis, shared=shared_snapshots)
+    return _kpi_aggregator
+
+def get_alert_engine():
+    """Get the alert engine, shared across workers through Redis or snapshot files"""
+    global _alert_engine
+    if _alert_engine is None:
+        _alert_engine = AlertEngine(redis_client=cache_manager.get_redis, shared=shared_snapshots)
+    return _alert_engine
\ No newline at end of file
@@ -1,24 +1,83 @@
-from flask import Blueprint, jsonify, request
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 import logging
 from datetime import datetime, timedelta
 import json
+import os
+from collections import defaultdict
+from operator import itemgetter
+import numpy as np
 
 # Import services
 from external_apis.grab_api import GrabAPIService
 from external_apis.osm_api import OpenStreetMapService
 from api.services.temporal_processing import TemporalProcessor
-from utils.data_cache import cache_manager
-from models.database import TransitStation, TransitRoute, db
+from api.services.schedule_index import (
+    ScheduleIndex, generate_headway_trips, parse_clock, seconds_since_midnight, WEEKDAYS, WEEKENDS
+)
+from api.services.journey_planner import Timetable, JourneyPlanner, walking_seconds
+from api.services.spatial_processing import haversine_km
+from api.services.demand_grid import DemandGridStore
+from api.services.synthetic_data import DemandSimulator
+from api.services.catalog import catalog
+from api.routes.attraction_routes import get_all_attractions
+from utils.data_cache import cache_manager, shared_snapshots
+from utils.geocoding import LocalGeocoder
+from utils.streaming import page_args, keyset_page, iter_rows, stream_json_list
+from models.database import TransitStation, TransitRealTime, TransitRoute, db
+from models.serialization import Projection
 
 transit_bp = Blueprint('transit', __name__)
 logger = logging.getLogger(__name__)
 
+# Sample stations in Klang Valley, in line order
+LRT_STATIONS_DATA = [
+    {'id': 'lrt_001', 'name': 'KLCC', 'latitude': 3.1478, 'longitude': 101.6953, 'line': 'Kelana Jaya'},
+    {'id': 'lrt_002', 'name': 'Pasar Seni', 'latitude': 3.1478, 'longitude': 101.6947, 'line': 'Kelana Jaya'},
+    {'id': 'lrt_003', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'Kelana Jaya'},
+    {'id': 'lrt_004', 'name': 'Kuala Lumpur', 'latitude': 3.1390, 'longitude': 101.6869, 'line': 'Ampang'},
+    {'id': 'lrt_005', 'name': 'Majlis Ahor南区', 'latitude': 3.1007, 'longitude': 101.6854, 'line': 'Sri Petaling'},
+]
+
+MRT_STATIONS_DATA = [
+    {'id': 'mrt_001', 'name': 'Kajang', 'latitude': 2.9897, 'longitude': 101.7857, 'line': 'SBK'},
+    {'id': 'mrt_002', 'name': 'Bandar Utama', 'latitude': 3.1478, 'longitude': 101.4209, 'line': 'SBK'},
+    {'id': 'mrt_003', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'SBK'},
+    {'id': 'mrt_004', 'name': 'Suria KLCC', 'latitude': 3.1478, 'longitude': 101.6953, 'line': 'PYL'},
+]
+
+BRT_STATIONS_DATA = [
+    {'id': 'brt_001', 'name': 'Klang Sentral', 'latitude': 3.0653, 'longitude': 101.2942, 'line': 'BRT Sunway'},
+    {'id': 'brt_002', 'name': 'USJ 1', 'latitude': 3.0517, 'longitude': 101.1917, 'line': 'BRT Sunway'},
+]
+
+KTM_STATIONS_DATA = [
+    {'id': 'ktm_001', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'Port Klang'},
+    {'id': 'ktm_002', 'name': 'Batu Caves', 'latitude': 3.2379, 'longitude': 101.6841, 'line': 'Port Klang'},
+]
+
+# Service pattern per line (headways and hop times in minutes); would be
+# replaced by GTFS timetables once real schedules are available
+LINE_SERVICE_PATTERNS = {
+    'Kelana Jaya': {'first': '05:00', 'last': '23:30', 'headway': 4, 'weekend_headway': 6, 'hop': 2},
+    'Ampang': {'first': '06:00', 'last': '23:30', 'headway': 5, 'weekend_headway': 8, 'hop': 2},
+    'Sri Petaling': {'first': '06:00', 'last': '23:30', 'headway': 5, 'weekend_headway': 8, 'hop': 2},
+    'SBK': {'first': '06:00', 'last': '23:00', 'headway': 5, 'weekend_headway': 7, 'hop': 3},
+    'PYL': {'first': '06:00', 'last': '23:00', 'headway': 5, 'weekend_headway': 7, 'hop': 3},
+    'BRT Sunway': {'first': '06:00', 'last': '23:00', 'headway': 6, 'weekend_headway': 10, 'hop': 3},
+    'Port Klang': {'first': '05:30', 'last': '23:00', 'headway': 15, 'weekend_headway': 20, 'hop': 6},
+}
+DEFAULT_SERVICE_PATTERN = {'first': '06:00', 'last': '23:00', 'headway': 10, 'weekend_headway': 15, 'hop': 3}
+
+# Projections for streamed list endpoints
+# Stored stations carry the same fields as the built-in station data
+STATION_PROJECTION = Projection(TransitStation, fields=('id', 'name', 'latitude', 'longitude', 'line', 'status'))
+HISTORY_PROJECTION = Projection(TransitRealTime)
+
 # Initialize services
 grab_service = GrabAPIService()
 osm_service = OpenStreetMapService()
 temporal_processor = TemporalProcessor()
+_demand_grid = None
 
 @transit_bp.route('/real-time')
 def get_real_time_transit():
@@ -26,51 +85,124 @@ def get_real_time_transit():
     try:
         # Check cache first
         cache_key = 'transit_real_time'
-        cached_data = cache_manager.get(cache_key)
+        # Normally refreshed by the transit_status collection job
+        cached_data = shared_snapshots.get(cache_key)
         if cached_data:
             return jsonify(cached_data)
 
-        # Fetch real-time data from multiple sources
-        stations = []
-        routes = []
+        result = build_real_time_transit()
+        
+        # Cache for 2 minutes
+        cache_manager.set(cache_key, result, timeout=120)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error fetching real-time transit data: {str(e)}")
+        return jsonify({'error': 'Failed to fetch transit data'}), 500
+
+def build_real_time_transit():
+    """Build the real-time transit snapshot"""
+    # Fetch real-time data from multiple sources
+    stations = []
+    routes = []
+    
+    # One schedule and simulator pass shared by every mode
+    arrivals, metrics = real_time_inputs()
+    
+    # Get LRT/MRT station data (simulated - would integrate with real APIs)
+    lrt_stations = get_lrt_stations(arrivals, metrics)
+    mrt_stations = get_mrt_stations(arrivals, metrics)
+    brt_stations = get_brt_stations(arrivals, metrics)
+    
+    # Get KTM Komuter data
+    ktm_stations = get_ktm_stations(arrivals, metrics)
+    
+    stations.extend(lrt_stations)
+    stations.extend(mrt_stations)  
+    stations.extend(brt_stations)
+    stations.extend(ktm_stations)
+    
+    # Get route information
+    routes = get_transit_routes()
+    
+    # Process and combine data
+    result = {
+        'timestamp': datetime.now().isoformat(),
+        'stations': stations,
+        'routes': routes,
+        'summary': {
+            'total_stations': len(stations),
+            'operational_routes': len([r for r in routes if r.get('status') == 'operational']),
+            'total_passengers': sum([s.get('passenger_count', 0) for s in stations]),
+            'average_delay': calculate_average_delay(stations)
+        }
+    }
+    
+    return result
+
+@transit_bp.route('/demand')
+def get_ride_demand():
+    """Get the latest collected ride demand heatmap"""
+    try:
+        # Written by the grab_demand collection job; never fetched inline
+        demand = shared_snapshots.get('collected_grab_demand')
+        if not demand:
+            return jsonify({'error': 'Ride demand data not collected yet'}), 503
         
-        # Get LRT/MRT station data (simulated - would integrate with real APIs)
-        lrt_stations = get_lrt_stations()
-        mrt_stations = get_mrt_stations()
-        brt_stations = get_brt_stations()
+        return jsonify(demand)
         
-        # Get KTM Komuter data
-        ktm_stations = get_ktm_stations()
+    except Exception as e:
+        logger.error(f"Error fetching ride demand: {str(e)}")
+        return jsonify({'error': 'Failed to fetch ride demand'}), 500
+
+@transit_bp.route('/demand/heatmap')
+def get_ride_demand_surface():
+    """Get the interpolated ride demand surface for a time window and zoom level"""
+    try:
+        minutes = min(int(request.args.get('minutes', 60)), 7 * 24 * 60)
+        zoom = int(request.args.get('zoom', 12))
+        step = int(request.args['step']) if request.args.get('step') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now()
         
-        stations.extend(lrt_stations)
-        stations.extend(mrt_stations)  
-        stations.extend(brt_stations)
-        stations.extend(ktm_stations)
+        store = get_demand_grid()
+        # Round the window end up to a bucket boundary so requests share cache entries
+        if store.bucket_start(end) < end:
+            end = store.bucket_start(end) + timedelta(seconds=store.bucket_seconds)
+        start = end - timedelta(minutes=minutes)
+        # Full resolution from zoom 14, halved per zoom level below
+        factor = 2 ** min(3, max(0, 14 - zoom))
         
-        # Get route information
-        routes = get_transit_routes()
+        cache_key = f'demand_heatmap_{end:%Y%m%d%H%M}_{minutes}_{factor}_{step}'
+        cached_data = cache_manager.get(cache_key)
+        if cached_data:
+            return jsonify(cached_data)
         
-        # Process and combine data
         result = {
-            'timestamp': datetime.now().isoformat(),
-            'stations': stations,
-            'routes': routes,
-            'summary': {
-                'total_stations': len(stations),
-                'operational_routes': len([r for r in routes if r.get('status') == 'operational']),
-                'total_passengers': sum([s.get('passenger_count', 0) for s in stations]),
-                'average_delay': calculate_average_delay(stations)
-            }
+            'window': {'start': start.isoformat(), 'end': end.isoformat()},
+            'cell_size': store.cell_size * factor,
+            'method': store.method
         }
+        if step:
+            result['frames'] = [
+                {'start': frame_start.isoformat(), 'samples': samples, 'cells': store.cells(raster, factor)}
+                for frame_start, raster, samples in store.series(start, end, step)
+            ]
+        else:
+            raster, samples = store.raster(start, end)
+            result['samples'] = samples
+            result['cells'] = store.cells(raster, factor)
         
-        # Cache for 2 minutes
-        cache_manager.set(cache_key, result, timeout=120)
+        # The latest bucket keeps filling, so cache briefly
+        cache_manager.set(cache_key, result, timeout=60)
         
         return jsonify(result)
         
+    except ValueError:
+        return jsonify({'error': 'Invalid minutes, zoom, step or end parameter'}), 400
     except Exception as e:
-        logger.error(f"Error fetching real-time transit data: {str(e)}")
-        return jsonify({'error': 'Failed to fetch transit data'}), 500
+        logger.error(f"Error fetching ride demand surface: {str(e)}")
+        return jsonify({'error': 'Failed to fetch ride demand surface'}), 500
 
 @transit_bp.route('/stations')
 def get_transit_stations():
@@ -78,23 +210,76 @@ def get_transit_stations():
     try:
         line = request.args.get('line')
         status = request.args.get('status')
+        after, limit = page_args(request.args)
+        filters = {'line': line, 'status': status}
         
-        # Get stations from database or external sources
-        stations = get_all_transit_stations(line=line, status=status)
+        # Stream from the database once stations are stored there
+        if db.session.query(TransitStation.id).first() is not None:
+            statement = STATION_PROJECTION.select()
+            if line:
+                statement = statement.where(TransitStation.line == line)
+            if status:
+                statement = statement.where(TransitStation.status == status)
+            rows = with_real_time_fields(
+                STATION_PROJECTION.serialize_all(iter_rows(keyset_page(statement, TransitStation.id, after, limit)))
+            )
+            return Response(
+                stream_with_context(stream_json_list(rows, 'stations', itemgetter('id'), limit, filters=filters)),
+                mimetype='application/json'
+            )
+        
+        # Otherwise page through the built-in station data
+        stations = sorted(get_all_transit_stations(line=line, status=status), key=itemgetter('id'))
+        if after:
+            stations = [s for s in stations if s['id'] > after]
+        page = stations[:limit]
         
         return jsonify({
-            'stations': stations,
-            'count': len(stations),
-            'filters': {
-                'line': line,
-                'status': status
-            }
+            'filters': filters,
+            'stations': page,
+            'count': len(page),
+            'next_after': page[-1]['id'] if len(stations) > limit else None
         })
         
+    except ValueError:
+        return jsonify({'error': 'Invalid limit parameter'}), 400
     except Exception as e:
         logger.error(f"Error fetching transit stations: {str(e)}")
         return jsonify({'error': 'Failed to fetch stations'}), 500
 
+@transit_bp.route('/real-time/history')
+def get_real_time_history():
+    """Stream stored real-time station observations, oldest first"""
+    try:
+        station_id = request.args.get('station')
+        after, limit = page_args(request.args)
+        after = int(after) if after else None
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        
+        statement = HISTORY_PROJECTION.select()
+        if station_id:
+            statement = statement.where(TransitRealTime.station_id == station_id)
+        if start:
+            statement = statement.where(TransitRealTime.timestamp >= start)
+        if end:
+            statement = statement.where(TransitRealTime.timestamp < end)
+        rows = HISTORY_PROJECTION.serialize_all(iter_rows(keyset_page(statement, TransitRealTime.id, after, limit)))
+        
+        return Response(
+            stream_with_context(stream_json_list(
+                rows, 'observations', itemgetter('id'), limit,
+                filters={'station': station_id, 'start': request.args.get('start'), 'end': request.args.get('end')}
+            )),
+            mimetype='application/json'
+        )
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid after, limit, start or end parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error fetching real-time history: {str(e)}")
+        return jsonify({'error': 'Failed to fetch real-time history'}), 500
+
 @transit_bp.route('/status')
 def get_transit_status():
     """Get current transit system status"""
@@ -145,89 +330,197 @@ def get_transit_status():
         logger.error(f"Error fetching transit status: {str(e)}")
         return jsonify({'error': 'Failed to fetch transit status'}), 500
 
-def get_lrt_stations():
+@transit_bp.route('/stations/<station_id>/departures')
+def get_station_departures(station_id):
+    """Get the next scheduled departures at a station"""
+    try:
+        count = min(int(request.args.get('count', 3)), 20)
+        now = datetime.now()
+        schedule_index = get_schedule_index()
+        
+        if station_id not in schedule_index.station_ids:
+            return jsonify({'error': 'Station not found'}), 404
+        
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        station_names = {s['id']: s['name'] for s in get_all_station_data()}
+        departures = [
+            {
+                'time': (midnight + timedelta(seconds=seconds)).isoformat(),
+                'terminus_id': terminus,
+                'terminus': station_names.get(terminus)
+            }
+            for seconds, terminus in schedule_index.next_departures(station_id, now, count=count)
+        ]
+        
+        return jsonify({
+            'station_id': station_id,
+            'departures': departures,
+            'count': len(departures),
+            'timestamp': now.isoformat()
+        })
+        
+    except ValueError:
+        return jsonify({'error': 'count must be an integer'}), 400
+    except Exception as e:
+        logger.error(f"Error fetching station departures: {str(e)}")
+        return jsonify({'error': 'Failed to fetch station departures'}), 500
+
+@transit_bp.route('/journey')
+def plan_journey():
+    """Plan a transit journey between stations, attractions or coordinates"""
+    try:
+        origin = resolve_place(request.args.get('from', ''))
+        destination = resolve_place(request.args.get('to', ''))
+        if not origin or not destination:
+            return jsonify({'error': 'Valid from and to locations are required'}), 400
+        
+        departure_time = parse_departure(request.args.get('date'), request.args.get('depart'))
+        max_transfers = min(int(request.args.get('max_transfers', 3)), 5)
+        
+        planner = get_journey_planner()
+        direct_km = float(haversine_km(origin['latitude'], origin['longitude'],
+                                       destination['latitude'], destination['longitude']))
+        direct_walk = int(walking_seconds(direct_km)) if direct_km <= planner.max_access_km else None
+        
+        if direct_walk is None and (not origin['stations'] or not destination['stations']):
+            return jsonify({'error': 'No station within walking distance'}), 404
+        
+        departure = seconds_since_midnight(departure_time)
+        journey = planner.plan(
+            origin['stations'], destination['stations'], departure,
+            departure_time.weekday(), max_transfers=max_transfers, direct_walk=direct_walk
+        )
+        if journey is None:
+            return jsonify({'error': 'No journey found for the requested time'}), 404
+        
+        return jsonify({
+            'from': {key: origin[key] for key in ('name', 'latitude', 'longitude')},
+            'to': {key: destination[key] for key in ('name', 'latitude', 'longitude')},
+            'journey': format_journey(journey, departure_time),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid depart, date or max_transfers parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error planning journey: {str(e)}")
+        return jsonify({'error': 'Failed to plan journey'}), 500
+
+@transit_bp.route('/reachability')
+def get_reachability():
+    """Get earliest arrival times at every station from one or more origins"""
+    try:
+        origins = [resolve_place(value) for value in request.args.get('from', '').split('|') if value]
+        if not origins or not all(origins):
+            return jsonify({'error': 'Valid from locations are required'}), 400
+        
+        departure_time = parse_departure(request.args.get('date'), request.args.get('depart'))
+        departure = seconds_since_midnight(departure_time)
+        planner = get_journey_planner()
+        
+        arrivals = planner.earliest_arrivals(
+            [origin['stations'] for origin in origins], departure, departure_time.weekday()
+        )
+        station_ids = planner.timetable.station_ids
+        
+        results = []
+        for origin, row in zip(origins, arrivals):
+            results.append({
+                'from': origin['name'],
+                'travel_minutes': {
+                    station_id: round((int(arrival) - departure) / 60, 1)
+                    for station_id, arrival in zip(station_ids, row)
+                    if arrival < np.iinfo(np.int32).max
+                }
+            })
+        
+        return jsonify({
+            'departure': departure_time.isoformat(),
+            'results': results,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError:
+        return jsonify({'error': 'Invalid depart or date parameter'}), 400
+    except Exception as e:
+        logger.error(f"Error computing reachability: {str(e)}")
+        return jsonify({'error': 'Failed to compute reachability'}), 500
+
+@transit_bp.route('/geocode')
+def geocode_location():
+    """Geocode a place name using the local gazetteer and cache first"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        
+        result = get_geocoder().geocode(query)
+        if result is None:
+            return jsonify({'error': 'Location not found', 'query': query}), 404
+        
+        return jsonify({'query': query, **result})
+        
+    except Exception as e:
+        logger.error(f"Error geocoding location: {str(e)}")
+        return jsonify({'error': 'Failed to geocode location'}), 500
+
+def get_lrt_stations(arrivals, metrics):
     """Get LRT stations with real-time data"""
     # This would integrate with actual LRT APIs or GTFS feeds
     stations = []
-    
-    # Sample LRT stations in Klang Valley
-    lrt_stations_data = [
-        {'id': 'lrt_001', 'name': 'KLCC', 'latitude': 3.1478, 'longitude': 101.6953, 'line': 'Kelana Jaya'},
-        {'id': 'lrt_002', 'name': 'Pasar Seni', 'latitude': 3.1478, 'longitude': 101.6947, 'line': 'Kelana Jaya'},
-        {'id': 'lrt_003', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'Kelana Jaya'},
-        {'id': 'lrt_004', 'name': 'Kuala Lumpur', 'latitude': 3.1390, 'longitude': 101.6869, 'line': 'Ampang'},
-        {'id': 'lrt_005', 'name': 'Majlis Ahor南区', 'latitude': 3.1007, 'longitude': 101.6854, 'line': 'Sri Petaling'},
-    ]
-    
-    for station_data in lrt_stations_data:
+    for station_data in LRT_STATIONS_DATA:
         # Simulate real-time data
         stations.append({
             **station_data,
             'status': 'operational',
-            'passenger_count': hash(station_data['id']) % 1000 + 200,
-            'next_arrival': f"{hash(station_data['id']) % 4 + 1} min",
+            'passenger_count': int(metrics['passenger_count'].get(station_data['id'], 0)),
+            'delay_minutes': round(metrics['delay_minutes'].get(station_data['id'], 0), 1),
+            'next_arrival': format_next_arrival(arrivals.get(station_data['id'])),
             'last_updated': datetime.now().isoformat()
         })
     
     return stations
 
-def get_mrt_stations():
+def get_mrt_stations(arrivals, metrics):
     """Get MRT stations with real-time data"""
     stations = []
-    
-    mrt_stations_data = [
-        {'id': 'mrt_001', 'name': 'Kajang', 'latitude': 2.9897, 'longitude': 101.7857, 'line': 'SBK'},
-        {'id': 'mrt_002', 'name': 'Bandar Utama', 'latitude': 3.1478, 'longitude': 101.4209, 'line': 'SBK'},
-        {'id': 'mrt_003', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'SBK'},
-        {'id': 'mrt_004', 'name': 'Suria KLCC', 'latitude': 3.1478, 'longitude': 101.6953, 'line': 'PYL'},
-    ]
-    
-    for station_data in mrt_stations_data:
+    for station_data in MRT_STATIONS_DATA:
         stations.append({
             **station_data,
             'status': 'operational',
-            'passenger_count': hash(station_data['id']) % 800 + 300,
-            'next_arrival': f"{hash(station_data['id']) % 5 + 2} min",
+            'passenger_count': int(metrics['passenger_count'].get(station_data['id'], 0)),
+            'delay_minutes': round(metrics['delay_minutes'].get(station_data['id'], 0), 1),
+            'next_arrival': format_next_arrival(arrivals.get(station_data['id'])),
             'last_updated': datetime.now().isoformat()
         })
     
     return stations
 
-def get_brt_stations():
+def get_brt_stations(arrivals, metrics):
     """Get BRT stations with real-time data"""
     stations = []
-    
-    brt_stations_data = [
-        {'id': 'brt_001', 'name': 'Klang Sentral', 'latitude': 3.0653, 'longitude': 101.2942, 'line': 'BRT Sunway'},
-        {'id': 'brt_002', 'name': 'USJ 1', 'latitude': 3.0517, 'longitude': 101.1917, 'line': 'BRT Sunway'},
-    ]
-    
-    for station_data in brt_stations_data:
+    for station_data in BRT_STATIONS_DATA:
         stations.append({
             **station_data,
             'status': 'operational',
-            'passenger_count': hash(station_data['id']) % 400 + 100,
-            'next_arrival': f"{hash(station_data['id']) % 3 + 1} min",
+            'passenger_count': int(metrics['passenger_count'].get(station_data['id'], 0)),
+            'delay_minutes': round(metrics['delay_minutes'].get(station_data['id'], 0), 1),
+            'next_arrival': format_next_arrival(arrivals.get(station_data['id'])),
             'last_updated': datetime.now().isoformat()
         })
     
     return stations
 
-def get_ktm_stations():
+def get_ktm_stations(arrivals, metrics):
     """Get KTM Komuter stations with real-time data"""
     stations = []
-    
-    ktm_stations_data = [
-        {'id': 'ktm_001', 'name': 'KL Sentral', 'latitude': 3.1347, 'longitude': 101.6869, 'line': 'Port Klang'},
-        {'id': 'ktm_002', 'name': 'Batu Caves', 'latitude': 3.2379, 'longitude': 101.6841, 'line': 'Port Klang'},
-    ]
-    
-    for station_data in ktm_stations_data:
+    for station_data in KTM_STATIONS_DATA:
         stations.append({
             **station_data,
             'status': 'operational',
-            'passenger_count': hash(station_data['id']) % 600 + 150,
-            'next_arrival': f"{hash(station_data['id']) % 8 + 3} min",
+            'passenger_count': int(metrics['passenger_count'].get(station_data['id'], 0)),
+            'delay_minutes': round(metrics['delay_minutes'].get(station_data['id'], 0), 1),
+            'next_arrival': format_next_arrival(arrivals.get(station_data['id'])),
             'last_updated': datetime.now().isoformat()
         })
     
@@ -258,14 +551,27 @@ def get_transit_routes():
     
     return routes
 
+def with_real_time_fields(stations):
+    """Add the real-time fields get_lrt_stations() and friends set to stored station rows"""
+    arrivals, metrics = real_time_inputs()
+    last_updated = datetime.now().isoformat()
+    for station in stations:
+        station['status'] = station.get('status') or 'operational'
+        station['passenger_count'] = int(metrics['passenger_count'].get(station['id'], 0))
+        station['delay_minutes'] = round(metrics['delay_minutes'].get(station['id'], 0), 1)
+        station['next_arrival'] = format_next_arrival(arrivals.get(station['id']))
+        station['last_updated'] = last_updated
+        yield station
+
 def get_all_transit_stations(line=None, status=None):
     """Get all transit stations with optional filtering"""
     # Combine all stations
+    arrivals, metrics = real_time_inputs()
     all_stations = []
-    all_stations.extend(get_lrt_stations())
-    all_stations.extend(get_mrt_stations())
-    all_stations.extend(get_brt_stations())
-    all_stations.extend(get_ktm_stations())
+    all_stations.extend(get_lrt_stations(arrivals, metrics))
+    all_stations.extend(get_mrt_stations(arrivals, metrics))
+    all_stations.extend(get_brt_stations(arrivals, metrics))
+    all_stations.extend(get_ktm_stations(arrivals, metrics))
     
     # Apply filters
     if line:
@@ -280,4 +586,179 @@ def calculate_average_delay(stations):
     delays = [s.get('delay_minutes', 0) for s in stations if 'delay_minutes' in s]
     if delays:
         return sum(delays) / len(delays)
-    return 0
\ No newline at end of file
+    return 0
+
+def get_all_station_data():
+    """Get static data for every station across all lines"""
+    return LRT_STATIONS_DATA + MRT_STATIONS_DATA + BRT_STATIONS_DATA + KTM_STATIONS_DATA
+
+def get_line_trips():
+    """Generate timetable trips for every line from its service pattern"""
+    lines = defaultdict(list)
+    for station_data in get_all_station_data():
+        lines[station_data['line']].append(station_data['id'])
+    
+    line_trips = {}
+    for line, station_ids in lines.items():
+        pattern = LINE_SERVICE_PATTERNS.get(line, DEFAULT_SERVICE_PATTERN)
+        line_trips[line] = generate_headway_trips(
+            station_ids, pattern['first'], pattern['last'],
+            pattern['headway'] * 60, pattern['hop'] * 60, WEEKDAYS
+        ) + generate_headway_trips(
+            station_ids, pattern['first'], pattern['last'],
+            pattern['weekend_headway'] * 60, pattern['hop'] * 60, WEEKENDS
+        )
+    
+    return line_trips
+
+def build_schedule_index():
+    schedule_index = ScheduleIndex()
+    for trips in get_line_trips().values():
+        for station_ids, stop_times, service_days in trips:
+            schedule_index.add_trip(station_ids, stop_times, service_days)
+    return schedule_index.build()
+
+def get_schedule_index():
+    """Get the schedule index from the shared catalog"""
+    return catalog.get('schedule_index')
+
+def format_next_arrival(seconds):
+    """Format seconds until the next departure for display"""
+    if seconds is None:
+        return 'No service'
+    return f"{max(1, -(-seconds // 60))} min"
+
+def build_journey_planner():
+    timetable = Timetable(get_all_station_data())
+    for line, trips in get_line_trips().items():
+        timetable.add_trips(trips, label=line)
+    return JourneyPlanner(timetable.build_footpaths()).prepare()
+
+def build_demand_simulator():
+    seed = int(os.getenv('SYNTHETIC_SEED', '0'))
+    return DemandSimulator(get_all_station_data(), get_all_attractions(), seed=seed)
+
+def get_demand_simulator():
+    """Get the seeded demand simulator from the shared catalog"""
+    return catalog.get('demand_simulator')
+
+def real_time_inputs():
+    """Get next arrivals and simulated station metrics for every station in one pass each"""
+    return get_schedule_index().next_arrivals_for_all(), current_station_metrics()
+
+def current_station_metrics():
+    """Simulated passenger counts and delays for the current minute, as {metric: {station_id: value}}"""
+    return get_demand_simulator().values_at('station', datetime.now())
+
+def get_journey_planner():
+    """Get the journey planner from the shared catalog"""
+    return catalog.get('journey_planner')
+
+def resolve_place(value):
+    """Resolve a station id, attraction id, name or 'lat,lng' into a place
+
+    The place carries the stations reachable on foot as {stop: walk_seconds}.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    
+    planner = get_journey_planner()
+    timetable = planner.timetable
+    
+    if value in timetable.stations:
+        station = timetable.stations[value]
+        return {'name': station['name'], 'latitude': station['latitude'],
+                'longitude': station['longitude'], 'stations': {timetable.stop_index[value]: 0}}
+    
+    attractions = get_all_attractions()
+    match = next((a for a in attractions if a['id'] == value), None)
+    if match is None:
+        parts = value.split(',')
+        if len(parts) == 2:
+            try:
+                lat, lng = float(parts[0]), float(parts[1])
+                return {'name': value, 'latitude': lat, 'longitude': lng,
+                        'stations': planner.access_stations(lat, lng)}
+            except ValueError:
+                pass
+    
+    if match is None:
+        # Same-named stations on different lines are all valid boarding points
+        named = [s for s in timetable.stations.values() if s['name'].lower() == value.lower()]
+        if named:
+            return {'name': named[0]['name'], 'latitude': named[0]['latitude'],
+                    'longitude': named[0]['longitude'],
+                    'stations': {timetable.stop_index[s['id']]: 0 for s in named}}
+        match = next((a for a in attractions if a['name'].lower() == value.lower()), None)
+    
+    if match is None:
+        # Free-text fallback: gazetteer, persistent cache, then Nominatim
+        geocoded = get_geocoder().geocode(value)
+        if geocoded is None:
+            return None
+        return {'name': geocoded['display_name'], 'latitude': geocoded['lat'], 'longitude': geocoded['lng'],
+                'stations': planner.access_stations(geocoded['lat'], geocoded['lng'])}
+    return {'name': match['name'], 'latitude': match['latitude'], 'longitude': match['longitude'],
+            'stations': planner.access_stations(match['latitude'], match['longitude'])}
+
+def build_geocoder():
+    geocoder = LocalGeocoder(remote=osm_service)
+    geocoder.gazetteer.add_locations(get_all_station_data(), 'station')
+    geocoder.gazetteer.add_locations(get_all_attractions(), 'attraction')
+    extract_path = os.environ.get('GAZETTEER_EXTRACT_PATH')
+    if extract_path and os.path.exists(extract_path):
+        geocoder.gazetteer.load_extract(extract_path)
+    return geocoder
+
+def get_geocoder():
+    """Get the local geocoder, with its gazetteer, from the shared catalog"""
+    return catalog.get('geocoder')
+
+def get_demand_grid():
+    """Get the ride demand grid store"""
+    global _demand_grid
+    if _demand_grid is None:
+        _demand_grid = DemandGridStore()
+    return _demand_grid
+
+def parse_departure(date, depart):
+    """Build the departure datetime from optional date and HH:MM parameters"""
+    departure_time = datetime.strptime(date, '%Y-%m-%d') if date else datetime.now()
+    if depart:
+        departure_time = departure_time.replace(hour=0, minute=0, second=0, microsecond=0) + \
+            timedelta(seconds=parse_clock(depart))
+    return departure_time
+
+def format_journey(journey, departure_time):
+    """Convert journey seconds into ISO timestamps and station names"""
+    midnight = departure_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    stations = get_journey_planner().timetable.stations
+    
+    def to_iso(seconds):
+        return (midnight + timedelta(seconds=int(seconds))).isoformat()
+    
+    legs = []
+    for leg in journey['legs']:
+        legs.append({
+            **leg,
+            'from': stations[leg['from']]['name'] if leg['from'] else None,
+            'to': stations[leg['to']]['name'] if leg['to'] else None,
+            'depart': to_iso(leg['depart']),
+            'arrive': to_iso(leg['arrive']),
+            'duration_minutes': round((leg['arrive'] - leg['depart']) / 60, 1)
+        })
+    
+    return {
+        'departure': to_iso(journey['departure']),
+        'arrival': to_iso(journey['arrival']),
+        'duration_minutes': round((journey['arrival'] - journey['departure']) / 60, 1),
+        'transfers': journey['transfers'],
+        'legs': legs
+    }
+
+# Read-only structures shared through the catalog
+catalog.register('schedule_index', build_schedule_index)
+catalog.register('journey_planner', build_journey_planner)
+catalog.register('geocoder', build_geocoder)
+catalog.register('demand_simulator', build_demand_simulator)
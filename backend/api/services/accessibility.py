@@ -0,0 +1,145 @@
+import logging
+import os
+import numpy as np
+
+from api.services.journey_planner import UNREACHED, walking_seconds
+from api.services.spatial_processing import SpatialIndex, SpatialProcessor
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the int64 broadcast block built by one min-plus chunk
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+class AccessibilityEngine:
+    """Batch isochrone engine ranking attractions by transit reachability
+
+    Station-to-station travel times come from one batched RAPTOR pass per
+    departure-time bucket; walking legs to attractions are added with a
+    vectorized min-plus product, so rankings and rasters never run a graph
+    search per request.
+    """
+
+    def __init__(self, planner, attractions, bucket_minutes=30, memory_budget=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.planner = planner
+        self.attractions = attractions
+        self.bucket_seconds = bucket_minutes * 60
+        self.memory_budget = int(memory_budget or os.environ.get('ACCESSIBILITY_MEMORY_BUDGET', DEFAULT_MEMORY_BUDGET))
+        self.attraction_index = SpatialIndex.from_locations(attractions)
+        self._station_walks = self._walk_matrix(
+            self.planner.timetable.spatial_index.lats, self.planner.timetable.spatial_index.lngs
+        )
+        self._buckets = {}
+
+    def bucket_of(self, departure):
+        """Get the departure-time bucket for seconds since midnight"""
+        return int(departure // self.bucket_seconds)
+
+    def _walk_matrix(self, lats, lngs):
+        """Walking seconds from points to every attraction within access range"""
+        walks = np.full((len(lats), len(self.attractions)), UNREACHED, dtype=np.int64)
+        points = SpatialIndex(cell_size=self.attraction_index.cell_size).build(range(len(lats)), lats, lngs)
+        left, right, distances = points.pairs_within(self.planner.max_access_km, self.attraction_index)
+        walks[left, right] = walking_seconds(distances)
+        return walks
+
+    def _station_rows(self):
+        """Map spatial index order onto timetable stop order"""
+        timetable = self.planner.timetable
+        return np.array([timetable.stop_index[sid] for sid in timetable.spatial_index.ids], dtype=np.int64)
+
+    def travel_times(self, weekday, departure):
+        """Get (stations x stations, stations x attractions) travel seconds for a bucket
+
+        Results are cached per (weekday, bucket); the bucket start is used as
+        the representative departure time.
+        """
+        key = (weekday, self.bucket_of(departure))
+        if key in self._buckets:
+            return self._buckets[key]
+
+        timetable = self.planner.timetable
+        start = key[1] * self.bucket_seconds
+        sources = [{stop: 0} for stop in range(len(timetable.station_ids))]
+        arrivals = self.planner.earliest_arrivals(sources, start, weekday)
+        station_times = np.where(arrivals < UNREACHED, arrivals - start, UNREACHED)
+
+        # Station walks are stored in spatial index order; align to stop order
+        egress = np.full_like(self._station_walks, UNREACHED)
+        egress[self._station_rows()] = self._station_walks
+        attraction_times = self._min_plus(station_times, egress)
+
+        self._buckets[key] = (station_times, attraction_times)
+        self.logger.info(f"Computed accessibility for weekday {weekday} bucket {key[1]}")
+        return self._buckets[key]
+
+    def _min_plus(self, left, right):
+        """Min-plus matrix product, chunked so each broadcast block fits the memory budget"""
+        result = np.full((left.shape[0], right.shape[1]), UNREACHED, dtype=np.int64)
+        # Each row of the chunk broadcasts to an (inner x columns) int64 block
+        chunk_size = max(1, self.memory_budget // max(1, left.shape[1] * right.shape[1] * 8))
+        for start in range(0, left.shape[0], chunk_size):
+            block = left[start:start + chunk_size, :, None] + right[None, :, :]
+            result[start:start + chunk_size] = np.minimum(block.min(axis=1), UNREACHED)
+        return result
+
+    def rank_stations(self, weekday, departure, budget_minutes=30):
+        """Count attractions reachable within the budget from each station"""
+        _, attraction_times = self.travel_times(weekday, departure)
+        counts = (attraction_times <= budget_minutes * 60).sum(axis=1)
+        station_ids = self.planner.timetable.station_ids
+        ranking = [
+            {'station_id': station_ids[i], 'name': self.planner.timetable.stations[station_ids[i]]['name'],
+             'reachable_attractions': int(counts[i])}
+            for i in np.argsort(-counts, kind='stable')
+        ]
+        return ranking
+
+    def rank_attractions(self, weekday, departure, budget_minutes=30):
+        """Rank attractions by how many stations reach them within the budget"""
+        _, attraction_times = self.travel_times(weekday, departure)
+        within = attraction_times <= budget_minutes * 60
+        counts = within.sum(axis=0)
+        reachable = np.where(within, attraction_times, 0)
+        mean_minutes = np.divide(reachable.sum(axis=0), np.maximum(counts, 1)) / 60
+
+        return [
+            {'attraction_id': self.attractions[i]['id'], 'name': self.attractions[i]['name'],
+             'reachable_from_stations': int(counts[i]),
+             'avg_travel_minutes': round(float(mean_minutes[i]), 1) if counts[i] else None}
+            for i in np.argsort(-counts, kind='stable')
+        ]
+
+    def surface(self, weekday, departure, bounds, grid_size=0.01, budget_minutes=30):
+        """Rasterize attraction reachability onto the spatial density grid
+
+        Each cell holds the number of attractions reachable within the budget
+        when walking from the cell centre to a nearby station (or directly).
+        """
+        _, attraction_times = self.travel_times(weekday, departure)
+        grid = SpatialProcessor().create_spatial_grid(bounds, grid_size)
+        if not grid:
+            return {'grid_cells': [], 'max_accessibility': 0}
+
+        lats = np.array([cell['center_lat'] for cell in grid])
+        lngs = np.array([cell['center_lng'] for cell in grid])
+
+        # Cell -> station access walks, then min-plus through the stations
+        timetable = self.planner.timetable
+        station_index = timetable.spatial_index
+        cells = SpatialIndex(cell_size=station_index.cell_size).build(range(len(grid)), lats, lngs)
+        access = np.full((len(grid), len(timetable.station_ids)), UNREACHED, dtype=np.int64)
+        left, right, distances = cells.pairs_within(self.planner.max_access_km, station_index)
+        access[left, self._station_rows()[right]] = walking_seconds(distances)
+
+        times = np.minimum(self._min_plus(access, attraction_times), self._walk_matrix(lats, lngs))
+        counts = (times <= budget_minutes * 60).sum(axis=1)
+
+        for cell, count in zip(grid, counts.tolist()):
+            cell['accessibility'] = count
+
+        return {
+            'grid_cells': grid,
+            'max_accessibility': int(counts.max()),
+            'cells_with_access': int((counts > 0).sum())
+        }
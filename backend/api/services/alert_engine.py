@@ -0,0 +1,562 @@
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {'critical': 0, 'warning': 1, 'info': 2}
+
+# Declarative rules; ALERT_RULES_PATH may point to a JSON list replacing them
+DEFAULT_ALERT_RULES = [
+    {
+        'id': 'station_delay', 'metric': 'delay_minutes', 'kind': 'threshold', 'op': '>', 'value': 5,
+        'sustained_minutes': 3, 'severity': 'warning', 'type': 'transit',
+        'title': 'Delays at {name}', 'message': 'Trains are running {value:.0f} min late at {name}',
+        'recommendations': ['Consider alternate routes', 'Allow extra travel time']
+    },
+    {
+        'id': 'station_crowding', 'metric': 'passenger_count', 'kind': 'threshold', 'op': '>=', 'value': 1000,
+        'sustained_minutes': 10, 'severity': 'info', 'type': 'transit',
+        'title': '{name} crowded', 'message': '{value:.0f} passengers at {name}',
+        'recommendations': ['Expect queues at platforms']
+    },
+    {
+        'id': 'passenger_surge', 'metric': 'passenger_count', 'kind': 'rate_of_change', 'percent': 50,
+        'window_minutes': 15, 'severity': 'warning', 'type': 'transit',
+        'title': 'Passenger surge at {name}', 'message': 'Ridership at {name} rose {change:.0f}% in 15 minutes',
+        'recommendations': ['Allow extra travel time']
+    },
+    {
+        'id': 'ridership_anomaly', 'metric': 'passenger_count', 'kind': 'anomaly', 'z': 3.0, 'min_samples': 30,
+        'severity': 'info', 'type': 'transit',
+        'title': 'Unusual ridership at {name}', 'message': 'Ridership at {name} is {z:.1f} standard deviations from normal',
+        'recommendations': []
+    },
+    {
+        'id': 'attraction_crowds', 'metric': 'current_occupancy', 'kind': 'threshold', 'op': '>=', 'value': 85,
+        'sustained_minutes': 15, 'severity': 'info', 'type': 'attraction',
+        'title': '{name} high crowds', 'message': '{name} is at {value:.0f}% occupancy',
+        'recommendations': ['Visit later in the day']
+    }
+]
+
+OPERATORS = {
+    '>': lambda value, limit: value > limit,
+    '>=': lambda value, limit: value >= limit,
+    '<': lambda value, limit: value < limit,
+    '<=': lambda value, limit: value <= limit
+}
+
+class AlertRule:
+    """A declarative alert rule scoped to a metric and optionally an entity or group"""
+
+    KINDS = ('threshold', 'rate_of_change', 'anomaly')
+
+    def __init__(self, spec):
+        self.spec = dict(spec)
+        self.id = spec['id']
+        self.metric = spec['metric']
+        self.kind = spec.get('kind', 'threshold')
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Rule {self.id}: unknown kind '{self.kind}'")
+        if self.kind == 'threshold' and spec.get('op', '>') not in OPERATORS:
+            raise ValueError(f"Rule {self.id}: unknown operator '{spec.get('op')}'")
+        self.entities = spec.get('entity')
+        if isinstance(self.entities, str):
+            self.entities = [self.entities]
+        self.group = spec.get('group')
+        self.sustained = timedelta(minutes=spec.get('sustained_minutes', 0))
+        self.clear_after = timedelta(minutes=spec.get('clear_minutes', 0))
+        self.window = timedelta(minutes=spec.get('window_minutes', 15))
+        self.severity = spec.get('severity', 'warning')
+
+    def check(self, value, series):
+        """Evaluate the rule; returns (condition holds, template fields)"""
+        fields = {'value': value}
+        if self.kind == 'threshold':
+            return OPERATORS[self.spec.get('op', '>')](value, self.spec['value']), fields
+        if self.kind == 'rate_of_change':
+            reference = series.value_at(series.last_seen - self.window)
+            if reference is None or reference == 0:
+                return False, fields
+            change = (value - reference) / abs(reference) * 100
+            fields['change'] = change
+            percent = self.spec['percent']
+            return (change >= percent) if percent >= 0 else (change <= percent), fields
+        z = series.z_score
+        fields['z'] = z if z is not None else 0
+        return z is not None and series.count >= self.spec.get('min_samples', 30) and abs(z) >= self.spec.get('z', 3.0), fields
+
+class SeriesState:
+    """Recent history and running mean/variance of one metric/entity series
+
+    Shared by every rule on the series, so it is updated once per
+    observation however many rules apply.
+    """
+
+    def __init__(self, history, alpha=0.05):
+        self.history = deque()
+        self.horizon = history
+        self.alpha = alpha
+        self.mean = None
+        self.variance = 0.0
+        self.count = 0
+        self.z_score = None
+        self.last_seen = None
+
+    def update(self, timestamp, value):
+        # Score against the statistics before this observation
+        if self.mean is not None and self.variance > 0:
+            self.z_score = (value - self.mean) / math.sqrt(self.variance)
+        else:
+            self.z_score = None
+        if self.mean is None:
+            self.mean = value
+        else:
+            delta = value - self.mean
+            self.mean += self.alpha * delta
+            self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+        self.count += 1
+
+        self.history.append((timestamp, value))
+        # Keep one point at or before the horizon as the rate reference
+        while len(self.history) > 1 and self.history[1][0] <= timestamp - self.horizon:
+            self.history.popleft()
+        self.last_seen = timestamp
+
+    def value_at(self, timestamp):
+        """Get the latest value observed at or before timestamp"""
+        reference = None
+        for observed_at, value in self.history:
+            if observed_at > timestamp:
+                break
+            reference = value
+        return reference
+
+class AlertEngine:
+    """Evaluate declarative alert rules against the incoming observation stream
+
+    Rules are indexed by (metric, entity), (metric, group) and metric-wide,
+    so an observation is checked only against the rules that apply to it.
+    Each (rule, entity) pair has at most one active alert: repeats update
+    it, and it resolves once the condition has been false for the rule's
+    clear_minutes or the entity stops reporting. Raised and resolved
+    alerts are pushed to subscribers and, with Redis, mirrored to a hash
+    and published so every worker sees them; a new leader adopts that
+    hash with reconcile(). Without Redis the active set, today's counts
+    and recent events go to the shared snapshot store instead, and other
+    workers read and poll that.
+    """
+
+    def __init__(self, rules=None, redis_client=None, prefix='alerts', resolved_history=50, stale_minutes=30,
+                 shared=None, shared_events=100):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._redis = redis_client
+        self.shared = shared
+        self.shared_key = f'{prefix}_state'
+        self.instance = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.events = deque(maxlen=shared_events)
+        self.updated_at = None
+        self.active_key = f'{prefix}:active'
+        self.resolved_key = f'{prefix}:resolved'
+        self.counts_prefix = f'{prefix}:counts'
+        self.channel = f'{prefix}:events'
+        self.stale = timedelta(minutes=stale_minutes)
+        self.resolved_history = resolved_history
+
+        self.rules = {}
+        self.by_entity = defaultdict(list)
+        self.by_group = defaultdict(list)
+        self.by_metric = defaultdict(list)
+        self.horizons = defaultdict(lambda: timedelta(0))
+        self.series = {}
+        self.conditions = {}
+        self.active = {}
+        self.resolved = deque(maxlen=resolved_history)
+        self.counts = defaultdict(lambda: {'raised': 0, 'resolved': 0})
+        self.subscribers = []
+        self.lock = threading.Lock()
+        for spec in (rules if rules is not None else load_rules()):
+            self.add_rule(spec)
+
+    @property
+    def redis_client(self):
+        # redis_client may be a getter, so reconnects are picked up
+        return self._redis() if callable(self._redis) else self._redis
+
+    def add_rule(self, spec):
+        """Register a rule in the metric/entity/group indexes"""
+        rule = AlertRule(spec)
+        with self.lock:
+            if rule.id in self.rules:
+                self._unindex(self.rules[rule.id])
+            self.rules[rule.id] = rule
+            if rule.entities:
+                for entity_id in rule.entities:
+                    self.by_entity[(rule.metric, entity_id)].append(rule)
+            elif rule.group:
+                self.by_group[(rule.metric, rule.group)].append(rule)
+            else:
+                self.by_metric[rule.metric].append(rule)
+            if rule.kind == 'rate_of_change':
+                self.horizons[rule.metric] = max(self.horizons[rule.metric], rule.window)
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self.lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is not None:
+                self._unindex(rule)
+
+    def _unindex(self, rule):
+        for index in (self.by_entity, self.by_group):
+            for rules in index.values():
+                if rule in rules:
+                    rules.remove(rule)
+        if rule in self.by_metric[rule.metric]:
+            self.by_metric[rule.metric].remove(rule)
+
+    def observe(self, metric, entity_id, value, timestamp=None, group=None, name=None):
+        """Evaluate one observation; returns the raised/resolved events"""
+        return self.observe_batch(metric, timestamp or datetime.now(), {entity_id: value},
+                                  {entity_id: group}, {entity_id: name})
+
+    def observe_batch(self, metric, timestamp, values, groups=None, names=None):
+        """Evaluate {entity_id: value} observed at one timestamp"""
+        groups, names = groups or {}, names or {}
+        events, refreshed = [], {}
+        with self.lock:
+            for entity_id, value in values.items():
+                if value is not None:
+                    self._evaluate(metric, entity_id, float(value), timestamp, groups.get(entity_id),
+                                   names.get(entity_id), events, refreshed)
+            refreshed = {alert_id: json.dumps(alert) for alert_id, alert in refreshed.items()}
+        for event in events:
+            self._notify(event)
+        self._store(refreshed)
+        self._share()
+        return events
+
+    def _evaluate(self, metric, entity_id, value, timestamp, group, name, events, refreshed):
+        key = (metric, entity_id)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = SeriesState(self.horizons[metric])
+        series.update(timestamp, value)
+
+        rules = self.by_entity.get(key, []) + self.by_metric.get(metric, [])
+        if group is not None:
+            rules = rules + self.by_group.get((metric, group), [])
+        for rule in rules:
+            holds, fields = rule.check(value, series)
+            event = self._apply(rule, entity_id, holds, fields, timestamp, group, name, refreshed)
+            if event is not None:
+                events.append(event)
+
+    def _apply(self, rule, entity_id, holds, fields, timestamp, group, name, refreshed):
+        """Advance the (rule, entity) condition state; returns an event when an alert changes"""
+        alert_id = f'{rule.id}:{entity_id}'
+        condition = self.conditions.setdefault(alert_id, {'since': None, 'clear_since': None})
+        alert = self.active.get(alert_id)
+        if holds:
+            condition['clear_since'] = None
+            if condition['since'] is None:
+                condition['since'] = timestamp
+            if alert is not None:
+                # Deduplicate: refresh the active alert instead of raising another
+                alert['value'] = round(fields['value'], 2)
+                alert['last_seen'] = timestamp.isoformat()
+                alert['occurrences'] += 1
+                refreshed[alert_id] = alert
+                return None
+            if timestamp - condition['since'] < rule.sustained:
+                return None
+            return self._raise(rule, alert_id, entity_id, fields, condition['since'], timestamp, group, name)
+
+        condition['since'] = None
+        if alert is None:
+            return None
+        if condition['clear_since'] is None:
+            condition['clear_since'] = timestamp
+        if timestamp - condition['clear_since'] >= rule.clear_after:
+            return self._resolve(alert_id, timestamp, 'condition cleared')
+        return None
+
+    def _raise(self, rule, alert_id, entity_id, fields, since, timestamp, group, name):
+        template_fields = dict(fields, name=name or entity_id, entity=entity_id, group=group or '')
+        try:
+            title = rule.spec.get('title', rule.id).format(**template_fields)
+            message = rule.spec.get('message', '').format(**template_fields)
+        except (KeyError, ValueError, IndexError):
+            title, message = rule.spec.get('title', rule.id), rule.spec.get('message', '')
+        alert = {
+            'id': alert_id,
+            'rule': rule.id,
+            'type': rule.spec.get('type', 'system'),
+            'severity': rule.severity,
+            'title': title,
+            'message': message,
+            'entity_id': entity_id,
+            'location': name or entity_id,
+            'metric': rule.metric,
+            'value': round(fields['value'], 2),
+            'status': 'active',
+            'started_at': since.isoformat(),
+            'timestamp': timestamp.isoformat(),
+            'last_seen': timestamp.isoformat(),
+            'occurrences': 1,
+            'affected_services': [group] if group else [],
+            'recommendations': rule.spec.get('recommendations', [])
+        }
+        self.active[alert_id] = alert
+        self.counts[timestamp.date().isoformat()]['raised'] += 1
+        return {'event': 'raised', 'alert': alert}
+
+    def _resolve(self, alert_id, timestamp, reason):
+        alert = self.active.pop(alert_id)
+        alert.update(status='resolved', resolved_at=timestamp.isoformat(), resolution=reason)
+        self.resolved.appendleft(alert)
+        self.counts[timestamp.date().isoformat()]['resolved'] += 1
+        return {'event': 'resolved', 'alert': alert}
+
+    def expire(self, now=None):
+        """Resolve alerts whose entity has stopped reporting"""
+        now = now or datetime.now()
+        events = []
+        with self.lock:
+            for alert_id, alert in list(self.active.items()):
+                series = self.series.get((alert['metric'], alert['entity_id']))
+                # Alerts adopted from a previous leader have no series here yet
+                last_seen = series.last_seen if series is not None else datetime.fromisoformat(alert['last_seen'])
+                if now - last_seen >= self.stale:
+                    events.append(self._resolve(alert_id, now, 'no recent data'))
+                    self.conditions.pop(alert_id, None)
+        for event in events:
+            self._notify(event)
+        self._share()
+        return events
+
+    def reconcile(self):
+        """Take over the active alerts mirrored in Redis, e.g. after a restart or leader change
+
+        The hash becomes the local active set: alerts raised by a previous
+        leader are refreshed or resolved by this one's observations (or by
+        expire() once they go stale), and local alerts the hash no longer
+        holds were resolved elsewhere. Returns the number of alerts adopted.
+        """
+        client = self.redis_client
+        if client is None:
+            state = self._shared_state()
+            if state is None:
+                return 0
+            mirrored = {alert['id']: alert for alert in state['active']}
+        else:
+            try:
+                mirrored = {alert_id: json.loads(value) for alert_id, value in client.hgetall(self.active_key).items()}
+            except Exception as e:
+                self.logger.error(f"Failed to reconcile active alerts: {e}")
+                return 0
+        with self.lock:
+            adopted = len(set(mirrored) - set(self.active))
+            for alert_id in set(self.active) - set(mirrored):
+                self.conditions.pop(alert_id, None)
+            self.active = mirrored
+        if adopted:
+            self.logger.info(f"Adopted {adopted} active alerts")
+        return adopted
+
+    def _store(self, alerts):
+        """Write refreshed {alert_id: json} active alerts back to the Redis hash"""
+        client = self.redis_client
+        if not alerts or client is None:
+            return
+        try:
+            client.hset(self.active_key, mapping=alerts)
+        except Exception as e:
+            self.logger.error(f"Failed to store refreshed alerts: {e}")
+
+    def _share(self):
+        """Write the active set, recent counts and events to the shared snapshot store (no Redis only)"""
+        if self.shared is None or self.redis_client is not None:
+            return
+        with self.lock:
+            self.updated_at = time.time()
+            days = sorted(self.counts)[-2:]
+            state = {
+                'instance': self.instance,
+                'version': self.version,
+                'updated_at': self.updated_at,
+                'active': list(self.active.values()),
+                'resolved': list(self.resolved),
+                'counts': {day: dict(self.counts[day]) for day in days},
+                'events': list(self.events)
+            }
+        # Expires with the alerts themselves if the leader stops collecting
+        self.shared.set(self.shared_key, state, timeout=self.stale.total_seconds())
+
+    def _shared_state(self):
+        """Get the collecting worker's shared state when it is newer than this process's own"""
+        if self.shared is None or self.redis_client is not None:
+            return None
+        state = self.shared.get(self.shared_key)
+        if state is None or (self.updated_at is not None and state['updated_at'] < self.updated_at):
+            return None
+        return state
+
+    def subscribe(self, max_events=100):
+        """Get a queue that receives raised/resolved events from this process"""
+        subscriber = queue.Queue(maxsize=max_events)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def _notify(self, event):
+        with self.lock:
+            self.version += 1
+            self.events.append([self.version, event])
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.logger.warning("Dropping alert event for a slow subscriber")
+        if self.redis_client is None:
+            return
+        alert = event['alert']
+        counts_key = f"{self.counts_prefix}:{alert['timestamp'][:10] if event['event'] == 'raised' else alert['resolved_at'][:10]}"
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            if event['event'] == 'raised':
+                pipe.hset(self.active_key, alert['id'], json.dumps(alert))
+            else:
+                pipe.hdel(self.active_key, alert['id'])
+                pipe.lpush(self.resolved_key, json.dumps(alert))
+                pipe.ltrim(self.resolved_key, 0, self.resolved_history - 1)
+            pipe.hincrby(counts_key, event['event'], 1)
+            pipe.expire(counts_key, 2 * 86400)
+            pipe.publish(self.channel, json.dumps(event))
+            pipe.execute()
+        except Exception as e:
+            self.logger.error(f"Failed to publish alert event: {e}")
+
+    def active_alerts(self):
+        """Get active alerts, most severe and most recent first"""
+        alerts = None
+        if self.redis_client is not None:
+            try:
+                alerts = [json.loads(value) for value in self.redis_client.hvals(self.active_key)]
+            except Exception as e:
+                self.logger.error(f"Failed to read active alerts: {e}")
+        if alerts is None:
+            state = self._shared_state()
+            if state is not None:
+                alerts = state['active']
+            else:
+                with self.lock:
+                    alerts = [dict(alert) for alert in self.active.values()]
+        alerts.sort(key=lambda alert: alert['started_at'], reverse=True)
+        alerts.sort(key=lambda alert: SEVERITY_ORDER.get(alert['severity'], len(SEVERITY_ORDER)))
+        return alerts
+
+    def recently_resolved(self, limit=20):
+        if self.redis_client is not None:
+            try:
+                return [json.loads(value) for value in self.redis_client.lrange(self.resolved_key, 0, limit - 1)]
+            except Exception as e:
+                self.logger.error(f"Failed to read resolved alerts: {e}")
+        state = self._shared_state()
+        if state is not None:
+            return state['resolved'][:limit]
+        with self.lock:
+            return list(self.resolved)[:limit]
+
+    def summary(self, now=None):
+        """Get active/raised/resolved counts for today"""
+        day = (now or datetime.now()).date().isoformat()
+        counts = None
+        if self.redis_client is not None:
+            try:
+                counts = {key: int(value) for key, value in self.redis_client.hgetall(f'{self.counts_prefix}:{day}').items()}
+                active = self.redis_client.hlen(self.active_key)
+            except Exception as e:
+                self.logger.error(f"Failed to read alert counts: {e}")
+                counts = None
+        if counts is None:
+            state = self._shared_state()
+            if state is not None:
+                counts, active = state['counts'].get(day, {}), len(state['active'])
+            else:
+                with self.lock:
+                    counts, active = dict(self.counts.get(day, {})), len(self.active)
+        return {'active': active, 'total_today': counts.get('raised', 0), 'resolved_today': counts.get('resolved', 0)}
+
+    def listen(self, timeout=15):
+        """Yield raised/resolved events as they happen, or None every timeout seconds
+
+        Events come from Redis pub/sub when available (so every worker sees
+        the collector's events), otherwise by polling the shared snapshot's
+        version, or from this process's subscribers when nothing is shared.
+        """
+        if self.redis_client is not None:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.channel)
+            try:
+                while True:
+                    message = pubsub.get_message(timeout=timeout)
+                    yield json.loads(message['data']) if message else None
+            finally:
+                pubsub.close()
+        elif self.shared is not None:
+            yield from self._poll_shared(timeout)
+        else:
+            subscriber = self.subscribe()
+            try:
+                while True:
+                    try:
+                        yield subscriber.get(timeout=timeout)
+                    except queue.Empty:
+                        yield None
+            finally:
+                self.unsubscribe(subscriber)
+
+    def _poll_shared(self, timeout, interval=1.0):
+        """Yield events newer than the last seen snapshot version, or None every timeout seconds"""
+        state = self.shared.get(self.shared_key) or {}
+        instance, seen = state.get('instance'), state.get('version', 0)
+        idle_since = time.monotonic()
+        while True:
+            time.sleep(interval)
+            state = self.shared.get(self.shared_key)
+            if state is not None:
+                if state['instance'] != instance:
+                    # A new leader numbers its events from scratch
+                    instance, seen = state['instance'], 0
+                fresh = [event for version, event in state['events'] if version > seen]
+                seen = max(seen, state['version'])
+                for event in fresh:
+                    yield event
+                if fresh:
+                    idle_since = time.monotonic()
+            if time.monotonic() - idle_since >= timeout:
+                idle_since = time.monotonic()
+                yield None
+
+def load_rules(path=None):
+    """Load rule specs from ALERT_RULES_PATH (a JSON list), or the defaults"""
+    path = path or os.environ.get('ALERT_RULES_PATH')
+    if not path:
+        return DEFAULT_ALERT_RULES
+    with open(path) as handle:
+        return json.load(handle)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import gc
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+def array_bytes(value, depth=4):
+    """Estimate the NumPy buffer bytes held by an object and its attributes"""
+    if hasattr(value, 'dtype') and hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if depth == 0:
+        return 0
+    if isinstance(value, dict):
+        return sum(array_bytes(item, depth - 1) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(item, depth - 1) for item in value)
+    if hasattr(value, '__dict__'):
+        return sum(array_bytes(item, depth - 1) for item in vars(value).values())
+    return 0
+
+def freeze_for_fork():
+    """Move every live object out of the collector's reach before forking
+
+    The cyclic GC writes to the header of every object it scans, which
+    would copy a preloaded catalog into each worker on its first collection.
+    """
+    gc.collect()
+    gc.freeze()
+
+class Catalog:
+    """Read-only reference structures shared by every worker
+
+    Route modules register a builder per structure (schedule index, journey
+    planner, gazetteer, search and accessibility indices). Each is built on
+    first use, or all at once by warm() in the gunicorn master before it
+    forks, so workers start with them in memory and share the pages
+    copy-on-write. reload() rebuilds every structure as a new generation.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.builders = {}
+        self.entries = {}
+        self.build_ms = {}
+        self.generation = 0
+        self.built_at = None
+        self.lock = threading.RLock()
+
+    def register(self, name, builder):
+        """Register a zero-argument builder for a structure"""
+        self.builders[name] = builder
+
+    def get(self, name):
+        """Get a structure, building it on first use"""
+        entry = self.entries.get(name)
+        if entry is None:
+            with self.lock:
+                entry = self.entries.get(name)
+                if entry is None:
+                    started = time.perf_counter()
+                    entry = self.builders[name]()
+                    self.build_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+                    self.entries[name] = entry
+        return entry
+
+    def peek(self, name):
+        """Get a structure only if it has been built"""
+        return self.entries.get(name)
+
+    def warm(self):
+        """Build every registered structure; returns build times in milliseconds"""
+        with self.lock:
+            for name in self.builders:
+                self.get(name)
+            if self.built_at is None:
+                self.built_at = datetime.now()
+        self.logger.info(f"Catalog generation {self.generation} ready: {self.build_ms}")
+        return dict(self.build_ms)
+
+    def reload(self):
+        """Rebuild every structure from its source, keeping the old ones if a build fails"""
+        with self.lock:
+            previous = (self.entries, self.build_ms)
+            self.entries, self.build_ms = {}, {}
+            try:
+                for name in self.builders:
+                    self.get(name)
+            except Exception:
+                self.entries, self.build_ms = previous
+                raise
+            self.generation += 1
+            self.built_at = datetime.now()
+        self.logger.info(f"Catalog reloaded as generation {self.generation}: {self.build_ms}")
+        return dict(self.build_ms)
+
+    def status(self):
+        return {
+            'generation': self.generation,
+            'built_at': self.built_at.isoformat() if self.built_at else None,
+            'entries': {
+                name: {
+                    'built': name in self.entries,
+                    'build_ms': self.build_ms.get(name),
+                    'array_bytes': array_bytes(self.entries[name]) if name in self.entries else 0
+                }
+                for name in self.builders
+            }
+        }
+
+# Shared by the route modules; one per process, inherited by forked workers
+catalog = Catalog()
\ No newline at end of file
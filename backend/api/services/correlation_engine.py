@@ -0,0 +1,152 @@
+import logging
+import numpy as np
+
+from api.services.spatial_processing import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+def pairwise_correlations(left, right, left_rows, right_rows, lag=0, min_overlap=6, chunk_size=20000):
+    """Pearson correlation of left[left_rows[k]] with right[right_rows[k]] for every pair k
+
+    lag shifts right forward in time: a positive lag correlates left at t
+    with right at t + lag. Only periods where both series have values are
+    used. Returns (r, n) arrays; r is NaN where fewer than min_overlap
+    periods overlap or a series is constant.
+    """
+    periods = left.shape[1]
+    if abs(lag) >= periods:
+        return np.full(len(left_rows), np.nan), np.zeros(len(left_rows), dtype=np.int64)
+    if lag >= 0:
+        left, right = left[:, :periods - lag], right[:, lag:]
+    else:
+        left, right = left[:, -lag:], right[:, :periods + lag]
+
+    r = np.full(len(left_rows), np.nan)
+    n = np.zeros(len(left_rows), dtype=np.int64)
+    for start in range(0, len(left_rows), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        x, y = left[left_rows[chunk]], right[right_rows[chunk]]
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        count = valid.sum(axis=1)
+        x = np.where(valid, x, 0.0)
+        y = np.where(valid, y, 0.0)
+        safe_count = np.maximum(count, 1)
+        x -= (x.sum(axis=1) / safe_count)[:, None]
+        y -= (y.sum(axis=1) / safe_count)[:, None]
+        x *= valid
+        y *= valid
+        denominator = np.sqrt((x * x).sum(axis=1) * (y * y).sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = (x * y).sum(axis=1) / denominator
+        values[(count < min_overlap) | (denominator == 0)] = np.nan
+        r[chunk] = values
+        n[chunk] = count
+    return r, n
+
+def rank_rows(matrix):
+    """Rank each row (average ranks for ties, NaN kept) for Spearman correlation"""
+    import pandas as pd
+    return pd.DataFrame(matrix).rank(axis=1).to_numpy()
+
+class CorrelationEngine:
+    """Lagged correlations between station ridership and nearby attraction popularity
+
+    Stations and attractions are paired through the spatial index within
+    radius_km. Both series are read from the archive onto a common time
+    grid, then every pair is correlated at every lag in one vectorized
+    pass per lag. Spearman correlation uses ranks over the whole window.
+    """
+
+    def __init__(self, archive, stations, attractions, radius_km=1.0,
+                 station_metric='passenger_count', attraction_metric='popularity_score'):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.archive = archive
+        self.stations = stations
+        self.attractions = attractions
+        self.radius_km = radius_km
+        self.station_metric = station_metric
+        self.attraction_metric = attraction_metric
+
+        station_index = SpatialIndex.from_locations(stations)
+        attraction_index = SpatialIndex.from_locations(attractions)
+        self.station_rows, self.attraction_rows, self.distances = station_index.pairs_within(radius_km, attraction_index)
+
+    def correlate(self, start, end, resolution_minutes=60, max_lag=3, method='pearson', min_overlap=6):
+        """Correlate all nearby pairs over [start, end) at lags -max_lag..max_lag periods"""
+        resolution = resolution_minutes * 60
+        station_series = self.archive.matrix(
+            self.station_metric, [s['id'] for s in self.stations], start, end, resolution
+        )
+        attraction_series = self.archive.matrix(
+            self.attraction_metric, [a['id'] for a in self.attractions], start, end, resolution
+        )
+        if method == 'spearman':
+            station_series, attraction_series = rank_rows(station_series), rank_rows(attraction_series)
+
+        lags = np.arange(-max_lag, max_lag + 1)
+        by_lag = np.full((len(lags), len(self.station_rows)), np.nan)
+        overlaps = np.zeros((len(lags), len(self.station_rows)), dtype=np.int64)
+        for i, lag in enumerate(lags):
+            by_lag[i], overlaps[i] = pairwise_correlations(
+                station_series, attraction_series, self.station_rows, self.attraction_rows, int(lag), min_overlap
+            )
+
+        # Best lag per pair by absolute correlation
+        has_value = ~np.all(np.isnan(by_lag), axis=0)
+        best = np.zeros(len(self.station_rows), dtype=np.int64)
+        if has_value.any():
+            best[has_value] = np.nanargmax(np.abs(by_lag[:, has_value]), axis=0)
+        zero = int(np.flatnonzero(lags == 0)[0])
+        pair_index = np.arange(len(self.station_rows))
+
+        return {
+            'station_rows': self.station_rows,
+            'attraction_rows': self.attraction_rows,
+            'distances': self.distances,
+            'r': by_lag[zero],
+            'overlap': overlaps[zero],
+            'best_lag': np.where(has_value, lags[best], 0),
+            'best_r': np.where(has_value, by_lag[best, pair_index], np.nan),
+            'resolution_minutes': resolution_minutes,
+            'method': method
+        }
+
+    def summarize(self, result, top=20):
+        """Summarize a correlation result into JSON-friendly pairs and aggregates"""
+        r = result['r']
+        valid = ~np.isnan(r)
+        pairs = []
+        order = np.argsort(-np.abs(np.where(valid, r, 0)), kind='stable')[:top]
+        for k in order[valid[order]]:
+            station = self.stations[result['station_rows'][k]]
+            attraction = self.attractions[result['attraction_rows'][k]]
+            pairs.append({
+                'station_id': station['id'],
+                'station_name': station['name'],
+                'attraction_id': attraction['id'],
+                'attraction_name': attraction['name'],
+                'category': attraction.get('category'),
+                'distance_km': round(float(result['distances'][k]), 3),
+                'correlation': round(float(r[k]), 3),
+                'best_lag_periods': int(result['best_lag'][k]),
+                'best_lag_correlation': round(float(result['best_r'][k]), 3),
+                'overlap_periods': int(result['overlap'][k])
+            })
+
+        by_category = {}
+        if valid.any():
+            categories = np.array([self.attractions[row].get('category') or 'Other' for row in result['attraction_rows']])
+            for category in np.unique(categories[valid]):
+                mask = valid & (categories == category)
+                by_category[str(category)] = {
+                    'mean_correlation': round(float(r[mask].mean()), 3),
+                    'pairs': int(mask.sum())
+                }
+
+        return {
+            'pairs_considered': int(len(r)),
+            'pairs_with_data': int(valid.sum()),
+            'correlation_strength': round(float(np.median(r[valid])), 3) if valid.any() else None,
+            'top_pairs': pairs,
+            'by_category': by_category
+        }
\ No newline at end of file
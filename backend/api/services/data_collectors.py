@@ -0,0 +1,392 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'collector.lock')
+
+class CollectionJob:
+    """A periodic collection job with jittered scheduling"""
+
+    def __init__(self, name, func, interval, jitter=0.1):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.last_run = None
+        self.last_success = None
+        self.last_error = None
+        self.last_duration_ms = None
+        self.runs = 0
+        self.failures = 0
+
+    def schedule_next(self, now):
+        """Schedule the next run at interval +/- jitter (a fraction of interval)"""
+        spread = self.interval * self.jitter
+        self.next_run = now + self.interval + random.uniform(-spread, spread)
+
+    def status(self):
+        return {
+            'interval_seconds': self.interval,
+            'last_run': self.last_run,
+            'last_success': self.last_success,
+            'last_error': self.last_error,
+            'last_duration_ms': self.last_duration_ms,
+            'runs': self.runs,
+            'failures': self.failures
+        }
+
+class LeaderElection:
+    """Lease-based leader election so only one worker collects
+
+    Uses a Redis key with a TTL when Redis is available; otherwise falls
+    back to an exclusive lock file, which covers workers on one host.
+    """
+
+    # Renew only if we still own the lease
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_client=None, key='collector:leader', ttl=30, lock_path=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._redis = redis_client
+        self.key = key
+        self.ttl = ttl
+        self.lock_path = lock_path or os.environ.get('COLLECTOR_LOCK_PATH', DEFAULT_LOCK_PATH)
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._lock_file = None
+
+    @property
+    def redis_client(self):
+        # Resolved per election round, so a Redis that comes up after boot is used
+        return self._redis() if callable(self._redis) else self._redis
+
+    def acquire_or_renew(self):
+        """Try to become (or stay) leader; returns whether we lead"""
+        try:
+            if self.redis_client is not None:
+                ttl_ms = int(self.ttl * 1000)
+                if self.is_leader:
+                    self.is_leader = bool(self.redis_client.eval(self.RENEW_SCRIPT, 1, self.key, self.identity, ttl_ms))
+                if not self.is_leader:
+                    self.is_leader = bool(self.redis_client.set(self.key, self.identity, nx=True, px=ttl_ms))
+            elif not self.is_leader:
+                self.is_leader = self._acquire_file_lock()
+        except Exception as e:
+            self.logger.error(f"Leader election error: {e}")
+            self.is_leader = False
+        return self.is_leader
+
+    def _acquire_file_lock(self):
+        """Take a non-blocking exclusive lock on the lock file"""
+        try:
+            import fcntl
+        except ImportError:
+            # No flock on this platform: assume a single worker
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        handle = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_file = handle
+        return True
+
+    def release(self):
+        try:
+            if self.redis_client is not None and self.is_leader:
+                self.redis_client.eval(
+                    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+                    1, self.key, self.identity
+                )
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+        except Exception as e:
+            self.logger.error(f"Error releasing leadership: {e}")
+        self.is_leader = False
+
+class DataCollectionScheduler:
+    """Background scheduler running provider refresh jobs on the leader worker
+
+    Jobs run inside the Flask app context and write their results to the
+    database and cache, so request handlers only read precomputed data.
+    on_elected hooks run whenever this process becomes the leader.
+    """
+
+    def __init__(self, app=None, election=None, tick=1.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.app = app
+        self.election = election or LeaderElection()
+        self.tick = tick
+        self.jobs = {}
+        self.on_elected = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_election = 0.0
+
+    def add_job(self, name, func, interval, jitter=0.1):
+        """Register a job; the first run is staggered within its jitter window"""
+        job = CollectionJob(name, func, interval, jitter)
+        job.next_run = time.monotonic() + random.uniform(0, interval * jitter)
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='data-collector', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Data collection scheduler started with {len(self.jobs)} jobs")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.election.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            # Renew the lease at a third of its TTL
+            if now - self._last_election >= self.election.ttl / 3:
+                was_leader = self.election.is_leader
+                if self.election.acquire_or_renew() and not was_leader:
+                    self._elected()
+                self._last_election = now
+
+            if self.election.is_leader:
+                for job in self.jobs.values():
+                    if now >= job.next_run:
+                        self.run_job(job)
+                        job.schedule_next(time.monotonic())
+
+            self._stop.wait(self.tick)
+
+    def _elected(self):
+        self.logger.info(f"Became collection leader as {self.election.identity}")
+        for hook in self.on_elected:
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        hook()
+                else:
+                    hook()
+            except Exception as e:
+                self.logger.error(f"Leader takeover hook {hook.__name__} failed: {e}")
+
+    def run_job(self, job):
+        """Run one job, recording its outcome"""
+        started = time.monotonic()
+        job.last_run = datetime.now().isoformat()
+        job.runs += 1
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    job.func()
+            else:
+                job.func()
+            job.last_success = job.last_run
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            self.logger.error(f"Collection job {job.name} failed: {e}")
+        job.last_duration_ms = round((time.monotonic() - started) * 1000, 1)
+
+    def run_all(self):
+        """Run every job once, regardless of leadership (e.g. for warmup or CLI)"""
+        for job in self.jobs.values():
+            self.run_job(job)
+            job.schedule_next(time.monotonic())
+
+    def status(self):
+        return {
+            'leader': self.election.is_leader,
+            'identity': self.election.identity,
+            'jobs': {name: job.status() for name, job in self.jobs.items()}
+        }
+
+def collect_grab_demand():
+    """Refresh the Grab ride demand heatmap and add it to the demand grid"""
+    from api.routes.transit_routes import grab_service, get_demand_grid
+    from models.database import TrendAnalysis, db
+    from utils.data_cache import shared_snapshots
+
+    heatmap = grab_service.get_ride_demand_heatmap()
+    regions = heatmap.get('regions', [])
+    observed_at = datetime.fromisoformat(heatmap['timestamp'])
+    get_demand_grid().add_samples(
+        observed_at,
+        [region['lat'] for region in regions],
+        [region['lng'] for region in regions],
+        [region['demand'] for region in regions]
+    )
+    for region in regions:
+        db.session.add(TrendAnalysis(
+            entity_type='region',
+            entity_id=f"{region['lat']:.4f},{region['lng']:.4f}",
+            time_period='sample',
+            metric_type='ride_demand',
+            timestamp=observed_at,
+            value=region['demand']
+        ))
+    db.session.commit()
+    shared_snapshots.set('collected_grab_demand', heatmap, timeout=900)
+
+def collect_attraction_popularity():
+    """Refresh attraction popularity snapshots
+
+    Provider popularity endpoints are not integrated yet, so the seeded
+    demand simulator's values for the current minute stand in for them.
+    """
+    from api.routes.attraction_routes import get_all_attractions
+    from api.routes.transit_routes import get_demand_simulator
+    from api.routes.analysis_routes import get_archive, get_usage_cube, ATTRACTION_USAGE_METRIC
+    from api.routes.dashboard_routes import get_kpi_aggregator, get_alert_engine
+    from models.database import AttractionRealTime, db
+    from utils.data_cache import shared_snapshots
+
+    observed_at = datetime.now()
+    simulated = get_demand_simulator().values_at('attraction', observed_at)
+    attractions = [
+        {**a, **{metric: values[a['id']] for metric, values in simulated.items() if a['id'] in values}}
+        for a in get_all_attractions()
+    ]
+    occupancy = {a['id']: a.get('current_occupancy', 0) for a in attractions}
+    groups = {a['id']: a.get('category') for a in attractions}
+
+    archive = get_archive()
+    archive.append('popularity_score', observed_at, {a['id']: a.get('popularity_score', 50) for a in attractions})
+    archive.append('current_occupancy', observed_at, occupancy)
+    get_usage_cube().add(ATTRACTION_USAGE_METRIC, observed_at, occupancy, groups=groups)
+    get_kpi_aggregator().observe_attractions(attractions)
+    get_alert_engine().observe_batch(
+        'current_occupancy', observed_at, occupancy, groups, {a['id']: a.get('name') for a in attractions}
+    )
+
+    seed_catalog()
+    for attraction in attractions:
+        db.session.add(AttractionRealTime(
+            attraction_id=attraction['id'],
+            timestamp=observed_at,
+            popularity_score=attraction.get('popularity_score', 50),
+            current_occupancy=attraction.get('current_occupancy', 0),
+            estimated_wait_time=attraction.get('estimated_wait_time', 0)
+        ))
+    db.session.commit()
+    shared_snapshots.set('collected_attraction_popularity', {
+        'timestamp': observed_at.isoformat(),
+        'attractions': attractions
+    }, timeout=1800)
+
+def collect_transit_status():
+    """Refresh the real-time transit snapshot and archive per-station metrics"""
+    from api.routes.transit_routes import build_real_time_transit
+    from api.routes.analysis_routes import get_archive, get_usage_cube, TRANSIT_USAGE_METRIC
+    from api.routes.dashboard_routes import get_kpi_aggregator, get_alert_engine
+    from models.database import TransitRealTime, db
+    from utils.data_cache import shared_snapshots
+
+    result = build_real_time_transit()
+    stations = result['stations']
+    observed_at = datetime.now()
+    values = {metric: {station['id']: station.get(metric, 0) for station in stations}
+              for metric in ('passenger_count', 'delay_minutes')}
+    groups = {station['id']: station.get('line') for station in stations}
+    names = {station['id']: station.get('name') for station in stations}
+
+    archive = get_archive()
+    alerts = get_alert_engine()
+    for metric, metric_values in values.items():
+        archive.append(metric, observed_at, metric_values)
+        alerts.observe_batch(metric, observed_at, metric_values, groups, names)
+    get_usage_cube().add(TRANSIT_USAGE_METRIC, observed_at, values[TRANSIT_USAGE_METRIC], groups=groups)
+    get_kpi_aggregator().observe_stations(observed_at, stations, result['routes'])
+    alerts.expire(observed_at)
+
+    seed_catalog()
+    for station in stations:
+        db.session.add(TransitRealTime(
+            station_id=station['id'],
+            timestamp=observed_at,
+            passenger_count=station.get('passenger_count', 0),
+            delay_minutes=station.get('delay_minutes', 0),
+            next_arrival=station.get('next_arrival')
+        ))
+    db.session.commit()
+    shared_snapshots.set('transit_real_time', result, timeout=120)
+
+def adopt_active_alerts():
+    """Take over the active alerts the previous leader mirrored to Redis"""
+    from api.routes.dashboard_routes import get_alert_engine
+
+    get_alert_engine().reconcile()
+
+def refit_forecasts():
+    """Queue incremental forecast refits on the forecaster's process pool"""
+    from api.routes.analysis_routes import get_forecaster
+
+    get_forecaster().refit_all()
+
+def seed_catalog():
+    """Insert catalog stations and attractions missing from the database"""
+    from api.routes.transit_routes import get_all_station_data
+    from api.routes.attraction_routes import get_all_attractions
+    from models.database import TransitStation, Attraction, db
+
+    known_stations = {row[0] for row in db.session.query(TransitStation.id).all()}
+    for station in get_all_station_data():
+        if station['id'] not in known_stations:
+            db.session.add(TransitStation(
+                id=station['id'], name=station['name'], latitude=station['latitude'],
+                longitude=station['longitude'], line=station['line'],
+                station_type=station['id'].split('_')[0]
+            ))
+
+    known_attractions = {row[0] for row in db.session.query(Attraction.id).all()}
+    for attraction in get_all_attractions():
+        if attraction['id'] not in known_attractions:
+            db.session.add(Attraction(
+                id=attraction['id'], name=attraction['name'], category=attraction['category'],
+                latitude=attraction['latitude'], longitude=attraction['longitude'],
+                address=attraction.get('address'), rating=attraction.get('rating'),
+                operating_hours=attraction.get('operating_hours'),
+                facilities=attraction.get('facilities', [])
+            ))
+    db.session.commit()
+
+# Default per-provider schedules in seconds
+DEFAULT_SCHEDULES = {
+    'grab_demand': (collect_grab_demand, 300),
+    'attraction_popularity': (collect_attraction_popularity, 900),
+    'transit_status': (collect_transit_status, 60),
+    'forecast_refit': (refit_forecasts, 900),
+}
+
+def create_scheduler(app, redis_client=None):
+    """Create a scheduler with the default collection jobs
+
+    Intervals can be overridden with COLLECT_<JOB>_INTERVAL (seconds).
+    """
+    scheduler = DataCollectionScheduler(app, LeaderElection(redis_client))
+    for name, (func, interval) in DEFAULT_SCHEDULES.items():
+        interval = float(os.environ.get(f"COLLECT_{name.upper()}_INTERVAL", interval))
+        scheduler.add_job(name, func, interval)
+    scheduler.on_elected.append(adopt_active_alerts)
+    return scheduler
\ No newline at end of file
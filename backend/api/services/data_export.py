@@ -0,0 +1,176 @@
+import csv
+import io
+import logging
+from datetime import datetime
+
+from sqlalchemy import select, DateTime, Float, Integer
+
+from models.database import TransitRealTime, AttractionRealTime, TrendAnalysis, db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Exportable tables: model, time column and entity column
+EXPORT_TABLES = {
+    'transit_realtime': (TransitRealTime, 'timestamp', 'station_id'),
+    'attraction_realtime': (AttractionRealTime, 'timestamp', 'attraction_id'),
+    'trend_analysis': (TrendAnalysis, 'timestamp', 'entity_id'),
+}
+
+EXPORT_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'csv': ('text/csv', 'csv'),
+}
+
+class ExportError(ValueError):
+    """Raised for invalid export requests"""
+
+class _ChunkSink:
+    """Write-only file object whose written bytes are drained between batches"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+class DataExporter:
+    """Stream table rows as Parquet, Arrow IPC or CSV in constant memory
+
+    Rows are read with a server-side cursor (yield_per) as plain tuples of
+    the projected columns and encoded one batch at a time; each encoded
+    batch is yielded as bytes before the next is fetched.
+    """
+
+    def __init__(self, batch_size=10000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.batch_size = batch_size
+
+    def columns_for(self, table, columns=None):
+        """Validate a table and column projection; returns (model, column names)"""
+        if table not in EXPORT_TABLES:
+            raise ExportError(f"Unknown table: {table}")
+        model = EXPORT_TABLES[table][0]
+        available = [column.name for column in model.__table__.columns]
+        if not columns:
+            return model, available
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ExportError(f"Unknown columns for {table}: {', '.join(unknown)}")
+        return model, list(columns)
+
+    def batches(self, table, columns=None, start=None, end=None, entity_ids=None):
+        """Yield lists of row tuples for the projected columns matching the predicates"""
+        model, names = self.columns_for(table, columns)
+        _, time_column, entity_column = EXPORT_TABLES[table]
+        statement = select(*(getattr(model, name) for name in names))
+        if start is not None:
+            statement = statement.where(getattr(model, time_column) >= start)
+        if end is not None:
+            statement = statement.where(getattr(model, time_column) < end)
+        if entity_ids:
+            statement = statement.where(getattr(model, entity_column).in_(entity_ids))
+        statement = statement.order_by(getattr(model, time_column), model.id)
+
+        result = db.session.execute(statement.execution_options(yield_per=self.batch_size))
+        try:
+            for partition in result.partitions():
+                yield partition
+        finally:
+            result.close()
+
+    def arrow_schema(self, table, columns=None):
+        """Build the Arrow schema for a projection from the column types"""
+        self._require_pyarrow()
+        model, names = self.columns_for(table, columns)
+        fields = []
+        for name in names:
+            column_type = model.__table__.columns[name].type
+            if isinstance(column_type, Integer):
+                arrow_type = pa.int64()
+            elif isinstance(column_type, Float):
+                arrow_type = pa.float64()
+            elif isinstance(column_type, DateTime):
+                arrow_type = pa.timestamp('us')
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    def stream(self, table, format='parquet', columns=None, start=None, end=None, entity_ids=None):
+        """Yield the encoded export as byte chunks"""
+        # Validate eagerly so errors surface before the response starts
+        if format not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown format: {format}")
+        self.columns_for(table, columns)
+        if format == 'csv':
+            return self._stream_csv(table, columns, start, end, entity_ids)
+        schema = self.arrow_schema(table, columns)
+        return self._stream_arrow(schema, table, format, columns, start, end, entity_ids)
+
+    def _stream_arrow(self, schema, table, format, columns, start, end, entity_ids):
+        sink = _ChunkSink()
+        if format == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+        try:
+            for rows in self.batches(table, columns, start, end, entity_ids):
+                arrays = [
+                    pa.array(values, type=field.type)
+                    for values, field in zip(zip(*rows), schema)
+                ]
+                batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+                if format == 'parquet':
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def _stream_csv(self, table, columns, start, end, entity_ids):
+        _, names = self.columns_for(table, columns)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        for rows in self.batches(table, columns, start, end, entity_ids):
+            writer.writerows(
+                tuple(value.isoformat() if isinstance(value, datetime) else value for value in row)
+                for row in rows
+            )
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    def _require_pyarrow(self):
+        if pa is None:
+            raise ExportError('pyarrow is required for parquet and arrow exports; use format=csv or install pyarrow')
\ No newline at end of file
@@ -0,0 +1,204 @@
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+
+from api.services.spatial_processing import KM_PER_DEGREE_LAT
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'demand_grid')
+
+# (min_lat, min_lng, max_lat, max_lng)
+KLANG_VALLEY_BOUNDS = (2.85, 101.35, 3.35, 101.85)
+
+def _squared_distances_km(grid_lats, grid_lngs, lats, lngs):
+    """Squared distances (rows x cols x samples) on a local equirectangular projection"""
+    lng_scale = KM_PER_DEGREE_LAT * math.cos(math.radians(float(np.mean(grid_lats))))
+    dy = (grid_lats[:, None] - lats[None, :]) * KM_PER_DEGREE_LAT
+    dx = (grid_lngs[:, None] - lngs[None, :]) * lng_scale
+    return dy[:, None, :] ** 2 + dx[None, :, :] ** 2
+
+def idw_surface(grid_lats, grid_lngs, lats, lngs, values, power=2.0, radius_km=3.0, chunk_size=256):
+    """Inverse distance weighted surface over grid cell centres
+
+    Only samples within radius_km contribute to a cell; cells with no
+    sample in range are 0. Samples are processed in chunks to bound memory.
+    """
+    lats, lngs, values = (np.asarray(v, dtype=np.float64) for v in (lats, lngs, values))
+    numerator = np.zeros((len(grid_lats), len(grid_lngs)))
+    denominator = np.zeros_like(numerator)
+    min_distance = 0.05
+    for start in range(0, len(values), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        squared = _squared_distances_km(grid_lats, grid_lngs, lats[chunk], lngs[chunk])
+        distances = np.sqrt(np.maximum(squared, min_distance ** 2))
+        weights = np.where(distances <= radius_km, distances ** -power, 0.0)
+        numerator += weights @ values[chunk]
+        denominator += weights.sum(axis=2)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def kde_surface(grid_lats, grid_lngs, lats, lngs, values, bandwidth_km=1.0, chunk_size=256):
+    """Gaussian kernel density surface of sample values over grid cell centres"""
+    lats, lngs, values = (np.asarray(v, dtype=np.float64) for v in (lats, lngs, values))
+    surface = np.zeros((len(grid_lats), len(grid_lngs)))
+    for start in range(0, len(values), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        squared = _squared_distances_km(grid_lats, grid_lngs, lats[chunk], lngs[chunk])
+        surface += np.exp(-squared / (2 * bandwidth_km ** 2)) @ values[chunk]
+    return surface
+
+def downsample_raster(raster, factor):
+    """Average factor x factor blocks of a raster (edges use the cells present)"""
+    if factor <= 1:
+        return raster
+    rows, cols = raster.shape
+    padded = np.full((-(-rows // factor) * factor, -(-cols // factor) * factor), np.nan)
+    padded[:rows, :cols] = raster
+    blocks = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    counts = np.sum(~np.isnan(blocks), axis=(1, 3))
+    return np.nansum(blocks, axis=(1, 3)) / np.maximum(counts, 1)
+
+class DemandGridStore:
+    """Time-bucketed demand rasters memory-mapped on disk
+
+    Each day is one .npy file of shape (buckets_per_day, rows, cols) holding
+    the sum of interpolated sample surfaces per time bucket, with a sidecar
+    file of per-bucket sample counts. Samples are interpolated onto the grid
+    once, when added; window queries only sum memory-mapped slices, so any
+    time window and zoom level is served without re-interpolating.
+    """
+
+    def __init__(self, path=None, bounds=KLANG_VALLEY_BOUNDS, cell_size=0.005, bucket_minutes=15,
+                 method='idw', **interpolation_options):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path or os.environ.get('DEMAND_GRID_PATH', DEFAULT_GRID_PATH)
+        self.bounds = bounds
+        self.cell_size = cell_size
+        self.bucket_seconds = bucket_minutes * 60
+        self.buckets_per_day = 86400 // self.bucket_seconds
+        self.method = method
+        self.interpolation_options = interpolation_options
+
+        min_lat, min_lng, max_lat, max_lng = bounds
+        self.rows = int(round((max_lat - min_lat) / cell_size))
+        self.cols = int(round((max_lng - min_lng) / cell_size))
+        self.cell_lats = min_lat + (np.arange(self.rows) + 0.5) * cell_size
+        self.cell_lngs = min_lng + (np.arange(self.cols) + 0.5) * cell_size
+        self._days = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _day_arrays(self, day, create=False):
+        """Get the (sums, counts) memmaps for a day, or None if not stored"""
+        key = day.strftime('%Y%m%d')
+        arrays = self._days.get(key)
+        if arrays is not None:
+            return arrays
+
+        sums_path = os.path.join(self.path, f"demand_{key}.npy")
+        counts_path = os.path.join(self.path, f"demand_{key}_counts.npy")
+        if os.path.exists(sums_path) and os.path.exists(counts_path):
+            arrays = (np.load(sums_path, mmap_mode='r+'), np.load(counts_path, mmap_mode='r+'))
+        elif create:
+            # Counts last, so readers never see a day without both files
+            sums = np.lib.format.open_memmap(
+                sums_path, mode='w+', dtype=np.float32, shape=(self.buckets_per_day, self.rows, self.cols)
+            )
+            counts = np.lib.format.open_memmap(
+                counts_path, mode='w+', dtype=np.int32, shape=(self.buckets_per_day,)
+            )
+            arrays = (sums, counts)
+        else:
+            return None
+        self._days[key] = arrays
+        return arrays
+
+    def bucket_of(self, timestamp):
+        """Get the bucket index of a timestamp within its day"""
+        seconds = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+        return seconds // self.bucket_seconds
+
+    def bucket_start(self, timestamp):
+        """Floor a timestamp to the start of its bucket"""
+        midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight + timedelta(seconds=self.bucket_of(timestamp) * self.bucket_seconds)
+
+    def interpolate(self, lats, lngs, values):
+        """Interpolate point samples onto the grid with the configured method"""
+        if self.method == 'kde':
+            return kde_surface(self.cell_lats, self.cell_lngs, lats, lngs, values, **self.interpolation_options)
+        return idw_surface(self.cell_lats, self.cell_lngs, lats, lngs, values, **self.interpolation_options)
+
+    def add_samples(self, timestamp, lats, lngs, values):
+        """Interpolate one batch of point samples into its time bucket"""
+        if not len(values):
+            return
+        surface = self.interpolate(lats, lngs, values).astype(np.float32)
+        bucket = self.bucket_of(timestamp)
+        with self.lock:
+            sums, counts = self._day_arrays(timestamp.date(), create=True)
+            sums[bucket] += surface
+            counts[bucket] += 1
+            sums.flush()
+            counts.flush()
+
+    def raster(self, start, end):
+        """Get (mean raster, sample count) over buckets overlapping [start, end)"""
+        total = np.zeros((self.rows, self.cols), dtype=np.float64)
+        samples = 0
+        last_moment = end - timedelta(microseconds=1)
+        day = start.date()
+        while day <= last_moment.date():
+            arrays = self._day_arrays(day)
+            if arrays is not None:
+                sums, counts = arrays
+                first = self.bucket_of(start) if day == start.date() else 0
+                last = self.bucket_of(last_moment) + 1 if day == last_moment.date() else self.buckets_per_day
+                if first < last:
+                    total += sums[first:last].sum(axis=0, dtype=np.float64)
+                    samples += int(counts[first:last].sum())
+            day += timedelta(days=1)
+        if samples:
+            total /= samples
+        return total, samples
+
+    def series(self, start, end, step_minutes=60):
+        """Temporally downsample a window into (step_start, raster, samples) steps"""
+        step = timedelta(minutes=max(step_minutes, self.bucket_seconds // 60))
+        current = self.bucket_start(start)
+        frames = []
+        while current < end:
+            raster, samples = self.raster(current, min(current + step, end))
+            frames.append((current, raster, samples))
+            current += step
+        return frames
+
+    def cells(self, raster, factor=1, min_value=0.01):
+        """Convert a raster (optionally downsampled) to non-empty grid cells"""
+        raster = downsample_raster(raster, factor)
+        cell_size = self.cell_size * factor
+        rows, cols = np.nonzero(raster > min_value)
+        return [
+            {
+                'center_lat': round(self.bounds[0] + (row + 0.5) * cell_size, 6),
+                'center_lng': round(self.bounds[1] + (col + 0.5) * cell_size, 6),
+                'demand': round(float(raster[row, col]), 2)
+            }
+            for row, col in zip(rows.tolist(), cols.tolist())
+        ]
+
+    def latest_timestamp(self):
+        """Get the start of the most recent bucket holding samples, or None"""
+        days = sorted(
+            name[len('demand_'):-len('_counts.npy')]
+            for name in os.listdir(self.path) if name.endswith('_counts.npy')
+        )
+        for key in reversed(days):
+            arrays = self._day_arrays(datetime.strptime(key, '%Y%m%d').date())
+            filled = np.nonzero(arrays[1])[0] if arrays else []
+            if len(filled):
+                return datetime.strptime(key, '%Y%m%d') + timedelta(seconds=int(filled[-1]) * self.bucket_seconds)
+        return None
\ No newline at end of file
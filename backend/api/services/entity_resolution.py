@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import numpy as np
+
+from api.services.spatial_processing import SpatialIndex
+from utils.geocoding import normalize_place_name, trigrams
+
+logger = logging.getLogger(__name__)
+
+# Field holding each provider's native identifier
+SOURCE_ID_FIELDS = {
+    'google_places': 'place_id',
+    'foursquare': 'venue_id',
+    'osm': 'osm_id',
+    'local': 'id',
+}
+
+# Preferred source for canonical field values, best first
+SOURCE_PRIORITY = ['local', 'google_places', 'foursquare', 'osm']
+
+class EntityResolver:
+    """Merge duplicate POIs from several providers into canonical entities
+
+    Candidates are blocked with a spatial grid so only POIs within
+    block_radius_km of each other are compared. Pairs are scored on name
+    trigram similarity, category agreement and distance; matches are
+    clustered with union-find. Previously persisted links are honoured so
+    entity ids stay stable across runs.
+    """
+
+    def __init__(self, block_radius_km=0.15, match_threshold=0.7, min_name_similarity=0.5,
+                 weights=(0.6, 0.2, 0.2)):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.block_radius_km = block_radius_km
+        self.match_threshold = match_threshold
+        self.min_name_similarity = min_name_similarity
+        self.name_weight, self.category_weight, self.distance_weight = weights
+
+    @staticmethod
+    def source_key(poi):
+        """Get the (source, source_id) pair identifying a POI"""
+        source = poi.get('source', 'local')
+        source_id = poi.get(SOURCE_ID_FIELDS.get(source, 'id')) or poi.get('id')
+        if source_id is None:
+            source_id = f"{poi.get('name')}@{poi.get('latitude')},{poi.get('longitude')}"
+        return source, str(source_id)
+
+    def resolve(self, pois, known_links=None):
+        """Resolve POIs into canonical entities
+
+        known_links maps (source, source_id) to a persisted entity id.
+        Returns (entities, links) where links maps every source key to the
+        entity id it resolved to, with the pair score used for new matches.
+        A key whose resolved id differs from its known link belongs to an
+        entity that was merged into another.
+        """
+        known_links = known_links or {}
+        pois = [poi for poi in pois if poi.get('latitude') is not None and poi.get('longitude') is not None]
+        if not pois:
+            return [], {}
+
+        keys = [self.source_key(poi) for poi in pois]
+        parent = list(range(len(pois)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+        # Persisted decisions first
+        by_entity = {}
+        for i, key in enumerate(keys):
+            entity_id = known_links.get(key)
+            if entity_id is not None:
+                if entity_id in by_entity:
+                    union(i, by_entity[entity_id])
+                else:
+                    by_entity[entity_id] = i
+
+        # Spatial blocking, then pairwise scoring over candidates only
+        index = SpatialIndex(cell_size=0.005).build(
+            range(len(pois)), [poi['latitude'] for poi in pois], [poi['longitude'] for poi in pois]
+        )
+        left, right, distances = index.pairs_within(self.block_radius_km)
+        names = [normalize_place_name(poi.get('name') or '') for poi in pois]
+        grams = [trigrams(name) if name else set() for name in names]
+        categories = [normalize_place_name(poi.get('category') or '') for poi in pois]
+
+        scores = {}
+        for i, j, distance in zip(left.tolist(), right.tolist(), distances.tolist()):
+            name_score = self._name_similarity(names[i], names[j], grams[i], grams[j])
+            if name_score < self.min_name_similarity:
+                continue
+            score = (self.name_weight * name_score +
+                     self.category_weight * self._category_similarity(categories[i], categories[j]) +
+                     self.distance_weight * (1 - distance / self.block_radius_km))
+            if score >= self.match_threshold:
+                union(i, j)
+                scores[i] = max(scores.get(i, 0), score)
+                scores[j] = max(scores.get(j, 0), score)
+
+        clusters = {}
+        for i in range(len(pois)):
+            clusters.setdefault(find(i), []).append(i)
+
+        entities = []
+        links = {}
+        for members in clusters.values():
+            # When a new match joins previously separate entities, the smallest
+            # id wins so every run picks the same survivor
+            known_ids = [known_links[keys[i]] for i in members if keys[i] in known_links]
+            entity_id = min(known_ids) if known_ids else None
+            if entity_id is None:
+                entity_id = 'ent_' + hashlib.sha1('|'.join(min(keys[i] for i in members)).encode()).hexdigest()[:12]
+            entities.append(self._merge(entity_id, [pois[i] for i in members], [keys[i] for i in members]))
+            for i in members:
+                links[keys[i]] = (entity_id, scores.get(i))
+
+        self.logger.debug(f"Resolved {len(pois)} POIs into {len(entities)} entities")
+        return entities, links
+
+    def _name_similarity(self, name_a, name_b, grams_a, grams_b):
+        """Trigram Jaccard similarity, with full credit for token containment"""
+        if not name_a or not name_b:
+            return 0.0
+        if name_a == name_b:
+            return 1.0
+        tokens_a, tokens_b = set(name_a.split()), set(name_b.split())
+        smaller, larger = sorted((tokens_a, tokens_b), key=len)
+        if len(smaller) >= 2 and smaller <= larger:
+            return 0.9
+        overlap = len(grams_a & grams_b)
+        return overlap / (len(grams_a) + len(grams_b) - overlap)
+
+    def _category_similarity(self, category_a, category_b):
+        """1 for matching categories, 0.5 when unknown, 0 when different"""
+        if not category_a or not category_b:
+            return 0.5
+        if category_a in category_b or category_b in category_a:
+            return 1.0
+        return 0.0
+
+    def _merge(self, entity_id, members, keys):
+        """Build the canonical entity from its members, best source first"""
+        ranked = sorted(
+            zip(members, keys),
+            key=lambda item: SOURCE_PRIORITY.index(item[1][0]) if item[1][0] in SOURCE_PRIORITY else len(SOURCE_PRIORITY)
+        )
+        entity = {}
+        for poi, _ in ranked:
+            for field, value in poi.items():
+                if value is not None and field not in entity and field != 'source':
+                    entity[field] = value
+
+        entity['entity_id'] = entity_id
+        entity['latitude'] = float(np.mean([poi['latitude'] for poi in members]))
+        entity['longitude'] = float(np.mean([poi['longitude'] for poi in members]))
+        entity['source_ids'] = [
+            {'source': source, 'id': source_id}
+            for source, source_id in dict.fromkeys(key for _, key in ranked)
+        ]
+        return entity
@@ -0,0 +1,276 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import numpy as np
+
+from api.services.time_series_archive import TimeSeriesArchive, month_start, next_month
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORECAST_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'forecasts')
+
+STEP_MINUTES = 15
+HORIZON_STEPS = 24 * 60 // STEP_MINUTES
+SLOTS_PER_DAY = 24 * 60 // STEP_MINUTES
+SEASONS = 2 * SLOTS_PER_DAY
+HISTORY_DAYS = 28
+
+# Smoothing for level, trend and season, and trend damping
+DEFAULT_PARAMS = {'alpha': 0.3, 'beta': 0.05, 'gamma': 0.1, 'phi': 0.9}
+
+def align(timestamp):
+    """Round a timestamp down to the forecast step"""
+    return timestamp.replace(minute=timestamp.minute - timestamp.minute % STEP_MINUTES, second=0, microsecond=0)
+
+def season_keys(start, periods):
+    """Get the seasonal index of each step from start: weekday/weekend × time-of-day slot"""
+    stamps = np.datetime64(start, 'm') + np.arange(periods) * np.timedelta64(STEP_MINUTES, 'm')
+    days = stamps.astype('datetime64[D]')
+    weekend = ((days.astype(np.int64) + 3) % 7) >= 5  # 1970-01-01 was a Thursday
+    slots = (stamps - days).astype(np.int64) // STEP_MINUTES
+    return weekend * SLOTS_PER_DAY + slots
+
+def _masked_mean(values, axis):
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0).sum(axis=axis)
+    result = np.full(count.shape, np.nan)
+    np.divide(total, count, out=result, where=count > 0)
+    return result
+
+def initial_state(series, keys):
+    """Initialize level, trend and seasonal components for every entity row of series"""
+    level = _masked_mean(series, axis=1)
+    deviations = series - level[:, None]
+    valid = ~np.isnan(deviations)
+    rows, positions = np.nonzero(valid)
+    ids = rows * SEASONS + keys[positions]
+    size = len(series) * SEASONS
+    sums = np.bincount(ids, weights=deviations[valid], minlength=size).reshape(len(series), SEASONS)
+    counts = np.bincount(ids, minlength=size).reshape(len(series), SEASONS)
+    seasonal = np.zeros((len(series), SEASONS))
+    np.divide(sums, counts, out=seasonal, where=counts > 0)
+    return {'level': level, 'trend': np.zeros(len(series)), 'seasonal': seasonal}
+
+def smooth(state, series, keys, alpha, beta, gamma, phi):
+    """Advance damped additive Holt-Winters state through series, one vectorized step per period"""
+    level, trend, seasonal = state['level'].copy(), state['trend'].copy(), state['seasonal'].copy()
+    rows = np.arange(len(level))
+    for step, key in enumerate(keys):
+        observed = series[:, step]
+        valid = ~np.isnan(observed) & ~np.isnan(level)
+        # Entities seen for the first time start at their first observation
+        fresh = ~np.isnan(observed) & np.isnan(level)
+        level[fresh] = observed[fresh] - seasonal[fresh, key]
+
+        season = seasonal[rows, key]
+        previous = level.copy()
+        damped = level + phi * trend
+        level = np.where(valid, alpha * (observed - season) + (1 - alpha) * damped, damped)
+        trend = np.where(valid, beta * (level - previous) + (1 - beta) * phi * trend, phi * trend)
+        seasonal[rows[valid], key] = (gamma * (observed - level) + (1 - gamma) * season)[valid]
+    return {'level': level, 'trend': trend, 'seasonal': seasonal}
+
+def project(state, start, steps, phi):
+    """Forecast steps periods ahead of start as an (entities, steps) matrix"""
+    damping = np.cumsum(phi ** np.arange(1, steps + 1))
+    keys = season_keys(start, steps)
+    return state['level'][:, None] + state['trend'][:, None] * damping[None, :] + state['seasonal'][:, keys]
+
+def fit_metric(archive_path, forecast_path, metric, now, params=None):
+    """Refit one metric's forecasts from the archive and persist them
+
+    Runs in a worker process. Existing state is advanced over the periods
+    archived since the last fit; a full fit over HISTORY_DAYS is done when
+    there is no state, the entity set changed or the state is too stale.
+    """
+    started = time.monotonic()
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    archive = TimeSeriesArchive(archive_path)
+    end = align(now)
+    history_start = end - timedelta(days=HISTORY_DAYS)
+
+    entities = {}
+    current = month_start(history_start)
+    while current < end:
+        segment = archive.segment(metric, current)
+        if segment is not None:
+            entities.update(dict.fromkeys(segment.entities))
+        current = next_month(current)
+    entities = list(entities)
+    if not entities:
+        return {'metric': metric, 'mode': 'skipped', 'entities': 0}
+
+    store_file = os.path.join(forecast_path, f'{metric}.npz')
+    previous = None
+    if os.path.exists(store_file):
+        with np.load(store_file) as stored:
+            previous = {name: stored[name] for name in stored.files}
+
+    fitted_until = datetime.fromisoformat(str(previous['fitted_until'])) if previous is not None else None
+    incremental = (
+        previous is not None
+        and list(previous['entities']) == entities
+        and history_start <= fitted_until <= end
+    )
+    if incremental:
+        start = fitted_until
+        state = {name: previous[name] for name in ('level', 'trend', 'seasonal')}
+    else:
+        start = history_start
+
+    periods = int((end - start).total_seconds() // (STEP_MINUTES * 60))
+    if periods:
+        series = archive.matrix(metric, entities, start, end, STEP_MINUTES * 60)
+        keys = season_keys(start, periods)
+        if not incremental:
+            state = initial_state(series, keys)
+            state['level'][:] = np.nan
+        state = smooth(state, series, keys, params['alpha'], params['beta'], params['gamma'], params['phi'])
+
+    forecasts = project(state, end, HORIZON_STEPS, params['phi']).astype(np.float32)
+    os.makedirs(forecast_path, exist_ok=True)
+    temp_file = store_file + '.tmp'
+    with open(temp_file, 'wb') as handle:
+        np.savez(
+            handle, entities=np.array(entities), fitted_until=np.array(end.isoformat()),
+            level=state['level'], trend=state['trend'], seasonal=state['seasonal'], forecasts=forecasts
+        )
+    os.replace(temp_file, store_file)
+    return {
+        'metric': metric,
+        'mode': 'incremental' if incremental else 'full',
+        'entities': len(entities),
+        'periods': periods,
+        'fitted_until': end.isoformat(),
+        'duration_ms': round((time.monotonic() - started) * 1000, 1)
+    }
+
+class StoredForecasts:
+    """A metric's persisted forecast matrix with an entity row lookup"""
+
+    def __init__(self, path, mtime):
+        with np.load(path) as stored:
+            self.entities = [str(entity_id) for entity_id in stored['entities']]
+            self.issued_at = datetime.fromisoformat(str(stored['fitted_until']))
+            self.forecasts = stored['forecasts']
+        self.mtime = mtime
+        self.rows = {entity_id: row for row, entity_id in enumerate(self.entities)}
+
+class Forecaster:
+    """Short-term forecasts for every archived station and attraction series
+
+    Models are damped additive Holt-Winters with a seasonal index keyed by
+    weekday/weekend and 15-minute time-of-day slot, fitted for all entities
+    of a metric at once. Refits run on a process pool, never in request
+    threads, and persist the smoothing state plus the next 24 hours of
+    forecasts; reads are a row lookup into the loaded forecast matrix.
+    """
+
+    def __init__(self, archive_path=None, path=None, metrics=('passenger_count', 'current_occupancy'),
+                 max_workers=2, params=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.archive_path = archive_path
+        self.path = path or os.environ.get('FORECAST_PATH', DEFAULT_FORECAST_PATH)
+        self.metrics = tuple(metrics)
+        self.max_workers = max_workers
+        self.params = params
+        self.executor = None
+        self.pending = {}
+        self.last_results = {}
+        self._loaded = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _executor(self):
+        # Spawned workers avoid forking a process that is running threads
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self.executor
+
+    def refit(self, metric, now=None):
+        """Queue a refit of one metric; returns the future, or None if one is already running"""
+        with self.lock:
+            future = self.pending.get(metric)
+            if future is not None and not future.done():
+                return None
+            future = self._executor().submit(
+                fit_metric, self.archive_path, self.path, metric, now or datetime.now(), self.params
+            )
+            self.pending[metric] = future
+        future.add_done_callback(lambda done, metric=metric: self._record(metric, done))
+        return future
+
+    def refit_all(self, now=None):
+        """Queue refits of every metric"""
+        return {metric: self.refit(metric, now) for metric in self.metrics}
+
+    def _record(self, metric, future):
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Forecast refit for {metric} failed: {error}")
+            if isinstance(error, BrokenProcessPool):
+                # A worker died; start a fresh pool on the next refit
+                with self.lock:
+                    self.executor = None
+            self.last_results[metric] = {'metric': metric, 'mode': 'failed', 'error': str(error)}
+        else:
+            self.last_results[metric] = future.result()
+
+    def _stored(self, metric):
+        """Get a metric's stored forecasts, reloading when a refit replaced the file"""
+        path = os.path.join(self.path, f'{metric}.npz')
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        stored = self._loaded.get(metric)
+        if stored is None or stored.mtime != mtime:
+            stored = StoredForecasts(path, mtime)
+            self._loaded[metric] = stored
+        return stored
+
+    def get(self, metric, entity_id, horizon_minutes=HORIZON_STEPS * STEP_MINUTES):
+        """Get an entity's forecast up to horizon_minutes ahead, or None if it has none
+
+        Each value is the mean expected over the 15 minutes ending at its timestamp.
+        """
+        stored = self._stored(metric)
+        if stored is None or str(entity_id) not in stored.rows:
+            return None
+        steps = min(max(int(horizon_minutes) // STEP_MINUTES, 1), HORIZON_STEPS)
+        values = stored.forecasts[stored.rows[str(entity_id)], :steps]
+        return {
+            'entity_id': str(entity_id),
+            'metric': metric,
+            'issued_at': stored.issued_at.isoformat(),
+            'step_minutes': STEP_MINUTES,
+            'forecast': [
+                {
+                    'timestamp': (stored.issued_at + timedelta(minutes=STEP_MINUTES * (step + 1))).isoformat(),
+                    'value': None if np.isnan(value) else round(float(max(value, 0)), 1)
+                }
+                for step, value in enumerate(values)
+            ]
+        }
+
+    def status(self):
+        return {
+            metric: dict(
+                self.last_results.get(metric, {}),
+                running=metric in self.pending and not self.pending[metric].done()
+            )
+            for metric in self.metrics
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
\ No newline at end of file
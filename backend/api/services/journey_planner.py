@@ -0,0 +1,271 @@
+import logging
+from collections import defaultdict
+import numpy as np
+
+from api.services.spatial_processing import SpatialIndex
+
+logger = logging.getLogger(__name__)
+
+UNREACHED = np.iinfo(np.int32).max
+
+# Straight-line walking distances are inflated to approximate the street network
+WALKING_SPEED_KMH = 4.5
+WALKING_DETOUR_FACTOR = 1.3
+
+def walking_seconds(distance_km):
+    """Estimate walking time for a straight-line distance"""
+    return np.ceil(np.asarray(distance_km) * WALKING_DETOUR_FACTOR / WALKING_SPEED_KMH * 3600).astype(np.int32)
+
+class Timetable:
+    """Compact array-based timetable for RAPTOR queries
+
+    Trips sharing a stop sequence are grouped into a route whose stop times
+    form a (trips x stops) int32 matrix sorted by departure, so boarding the
+    earliest catchable trip is a searchsorted on one column.
+    """
+
+    def __init__(self, stations):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.station_ids = [station['id'] for station in stations]
+        self.stations = {station['id']: station for station in stations}
+        self.stop_index = {station_id: i for i, station_id in enumerate(self.station_ids)}
+        self.route_stops = []
+        self.route_times = []
+        self.route_service_days = []
+        self.route_labels = []
+        self.routes_by_stop = [[] for _ in self.station_ids]
+        self.footpaths = [[] for _ in self.station_ids]
+        self.spatial_index = SpatialIndex.from_locations(stations)
+
+    def add_trips(self, trips, label=None):
+        """Group (station_ids, stop_times, service_days) trips into routes"""
+        patterns = defaultdict(list)
+        for station_ids, stop_times, service_days in trips:
+            patterns[tuple(station_ids)].append((np.asarray(stop_times, dtype=np.int32), service_days))
+
+        for station_ids, pattern_trips in patterns.items():
+            stops = np.array([self.stop_index[station_id] for station_id in station_ids], dtype=np.int32)
+            times = np.vstack([stop_times for stop_times, _ in pattern_trips])
+            service_days = np.array([days for _, days in pattern_trips], dtype=np.uint8)
+            order = np.argsort(times[:, 0], kind='stable')
+
+            route = len(self.route_stops)
+            self.route_stops.append(stops)
+            self.route_times.append(times[order])
+            self.route_service_days.append(service_days[order])
+            self.route_labels.append(label)
+            for position, stop in enumerate(stops.tolist()):
+                self.routes_by_stop[stop].append((route, position))
+
+    def build_footpaths(self, max_walk_km=0.5, min_transfer_seconds=180):
+        """Derive walking transfers between nearby stations from the spatial index"""
+        self.footpaths = [[] for _ in self.station_ids]
+        left, right, distances = self.spatial_index.pairs_within(max_walk_km)
+        seconds = np.maximum(walking_seconds(distances), min_transfer_seconds)
+
+        for i, j, walk in zip(left.tolist(), right.tolist(), seconds.tolist()):
+            a = self.stop_index[self.spatial_index.ids[i]]
+            b = self.stop_index[self.spatial_index.ids[j]]
+            self.footpaths[a].append((b, walk))
+            self.footpaths[b].append((a, walk))
+
+        self.logger.info(f"Timetable has {len(self.route_stops)} routes and {int(len(left))} transfers")
+        return self
+
+    def active_route_times(self, weekday):
+        """Get per-route stop time matrices filtered to trips running on a weekday"""
+        bit = np.uint8(1 << weekday)
+        return [
+            times[(service_days & bit) != 0]
+            for times, service_days in zip(self.route_times, self.route_service_days)
+        ]
+
+class JourneyPlanner:
+    """RAPTOR journey planner over a Timetable"""
+
+    def __init__(self, timetable, max_access_km=1.5, min_change_seconds=60):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.timetable = timetable
+        self.max_access_km = max_access_km
+        self.min_change_seconds = min_change_seconds
+        self._weekday_times = {}
+
+    def _route_times(self, weekday):
+        """Get (and memoize) the active trip matrices for a weekday"""
+        if weekday not in self._weekday_times:
+            self._weekday_times[weekday] = self.timetable.active_route_times(weekday)
+        return self._weekday_times[weekday]
+
+    def prepare(self):
+        """Compute the active trip matrices for every weekday up front (e.g. before forking workers)"""
+        for weekday in range(7):
+            self._route_times(weekday)
+        return self
+
+    def access_stations(self, lat, lng):
+        """Get {stop: walk_seconds} for stations within walking distance of a point"""
+        index = self.timetable.spatial_index
+        positions, distances = index.query_radius(lat, lng, self.max_access_km)
+        walks = walking_seconds(distances)
+        return {
+            self.timetable.stop_index[index.ids[p]]: int(walk)
+            for p, walk in zip(positions.tolist(), walks.tolist())
+        }
+
+    def run(self, sources, departure, weekday, max_transfers=3):
+        """Run RAPTOR from {stop: seconds_after_departure} sources
+
+        Returns (best, labels, parents): best arrival per stop, per-round
+        arrival labels and per-round parent pointers for reconstruction.
+        """
+        timetable = self.timetable
+        route_times = self._route_times(weekday)
+        n_stops = len(timetable.station_ids)
+        rounds = max_transfers + 2
+
+        best = np.full(n_stops, UNREACHED, dtype=np.int64)
+        labels = np.full((rounds, n_stops), UNREACHED, dtype=np.int64)
+        parents = [dict() for _ in range(rounds)]
+
+        marked = set()
+        for stop, offset in sources.items():
+            arrival = departure + offset
+            if arrival < labels[0, stop]:
+                labels[0, stop] = best[stop] = arrival
+                parents[0][stop] = ('access', None, offset)
+                marked.add(stop)
+        self._relax_footpaths(0, marked, best, labels, parents)
+
+        for k in range(1, rounds):
+            # Collect each route once, from its earliest marked stop
+            queue = {}
+            for stop in marked:
+                for route, position in timetable.routes_by_stop[stop]:
+                    if position < queue.get(route, len(timetable.route_stops[route])):
+                        queue[route] = position
+
+            marked = set()
+            change = self.min_change_seconds if k > 1 else 0
+            for route, start in queue.items():
+                times = route_times[route]
+                if not len(times):
+                    continue
+                stops = timetable.route_stops[route]
+                trip = None
+                board_stop = board_time = None
+
+                for position in range(start, len(stops)):
+                    stop = int(stops[position])
+                    if trip is not None:
+                        arrival = int(times[trip, position])
+                        if arrival < best[stop]:
+                            labels[k, stop] = best[stop] = arrival
+                            parents[k][stop] = ('ride', board_stop, route, board_time, arrival)
+                            marked.add(stop)
+
+                    ready = labels[k - 1, stop]
+                    if ready == UNREACHED:
+                        continue
+                    if trip is None or ready + change <= times[trip, position]:
+                        candidate = int(np.searchsorted(times[:, position], ready + change, side='left'))
+                        if candidate < len(times) and (trip is None or candidate < trip):
+                            trip = candidate
+                            board_stop = stop
+                            board_time = int(times[trip, position])
+
+            self._relax_footpaths(k, marked, best, labels, parents)
+            if not marked:
+                break
+
+        return best, labels, parents
+
+    def _relax_footpaths(self, k, marked, best, labels, parents):
+        """Apply walking transfers from stops improved in round k"""
+        for stop in list(marked):
+            for neighbour, walk in self.timetable.footpaths[stop]:
+                arrival = labels[k, stop] + walk
+                if arrival < best[neighbour]:
+                    labels[k, neighbour] = best[neighbour] = arrival
+                    parents[k][neighbour] = ('walk', stop, int(labels[k, stop]), int(arrival))
+                    marked.add(neighbour)
+
+    def plan(self, sources, targets, departure, weekday, max_transfers=3, direct_walk=None):
+        """Plan the earliest-arrival journey between source and target stops
+
+        sources and targets map stops to walking seconds from the origin and
+        to the destination. direct_walk, when given, is the walk-only time.
+        """
+        best, labels, parents = self.run(sources, departure, weekday, max_transfers)
+
+        destination = None
+        for stop, egress in targets.items():
+            if best[stop] == UNREACHED:
+                continue
+            arrival = int(best[stop]) + egress
+            if destination is None or arrival < destination[1]:
+                destination = (stop, arrival, egress)
+
+        if direct_walk is not None and (destination is None or departure + direct_walk <= destination[1]):
+            return {
+                'departure': departure,
+                'arrival': departure + direct_walk,
+                'transfers': 0,
+                'legs': [{'mode': 'walk', 'from': None, 'to': None,
+                          'depart': departure, 'arrive': departure + direct_walk}]
+            }
+        if destination is None:
+            return None
+
+        stop, arrival, egress = destination
+        legs = self._reconstruct(stop, labels, parents)
+        if egress:
+            legs.append({'mode': 'walk', 'from': self.timetable.station_ids[stop], 'to': None,
+                         'depart': arrival - egress, 'arrive': arrival})
+
+        return {
+            'departure': departure,
+            'arrival': arrival,
+            'transfers': max(0, len([leg for leg in legs if leg['mode'] == 'transit']) - 1),
+            'legs': legs
+        }
+
+    def _reconstruct(self, stop, labels, parents):
+        """Walk parent pointers back from a stop into a list of legs"""
+        station_ids = self.timetable.station_ids
+        k = int(np.argmin(labels[:, stop]))
+        legs = []
+
+        while True:
+            parent = parents[k][stop]
+            kind = parent[0]
+            if kind == 'access':
+                if parent[2]:
+                    legs.append({'mode': 'walk', 'from': None, 'to': station_ids[stop],
+                                 'depart': int(labels[k, stop]) - parent[2], 'arrive': int(labels[k, stop])})
+                break
+            if kind == 'walk':
+                _, previous, depart, arrive = parent
+                legs.append({'mode': 'walk', 'from': station_ids[previous], 'to': station_ids[stop],
+                             'depart': depart, 'arrive': arrive})
+                stop = previous
+            else:
+                _, board_stop, route, board_time, arrival = parent
+                legs.append({'mode': 'transit', 'route': self.timetable.route_labels[route],
+                             'from': station_ids[board_stop], 'to': station_ids[stop],
+                             'depart': board_time, 'arrive': arrival})
+                stop = board_stop
+                k -= 1
+
+        legs.reverse()
+        return legs
+
+    def earliest_arrivals(self, sources_list, departure, weekday, max_transfers=3):
+        """Batched one-to-many mode: arrival seconds at every stop per origin
+
+        Returns an (origins x stops) int64 matrix with UNREACHED where a stop
+        cannot be reached.
+        """
+        result = np.full((len(sources_list), len(self.timetable.station_ids)), UNREACHED, dtype=np.int64)
+        for row, sources in enumerate(sources_list):
+            result[row] = self.run(sources, departure, weekday, max_transfers)[0]
+        return result
@@ -0,0 +1,265 @@
+import json
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODES = ('lrt', 'mrt', 'brt', 'ktm')
+# Sliding-window sums per minute bucket, and current-value gauges, per mode
+WINDOW_FIELDS = ('observations', 'delay_sum', 'on_time', 'served')
+GAUGE_FIELDS = ('stations', 'passengers', 'busy', 'operational')
+
+BUSY_STATION_PASSENGERS = 800
+BUSY_ATTRACTION_OCCUPANCY = 70
+ON_TIME_DELAY_MINUTES = 2
+DELAYED_MODE_MINUTES = 5
+
+def mode_of(station):
+    """Get a station's mode index from its id prefix (lrt_001 -> lrt), or None"""
+    prefix = str(station.get('id', '')).split('_')[0].lower()
+    return MODES.index(prefix) if prefix in MODES else None
+
+class KPIAggregator:
+    """Incremental real-time KPIs per transit mode
+
+    Station observations are added to per-minute ring buffer buckets while
+    running window sums are kept alongside, so expiring a minute subtracts
+    one bucket instead of rescanning the window. Current values (passengers,
+    busy and operational stations) are gauges updated by the difference from
+    each station's previous observation. The ingesting process mirrors its
+    state into Redis hashes; snapshots in any worker read one hash. Without
+    Redis the totals go to the shared snapshot store instead, so workers
+    other than the ingesting one do not report their own empty state.
+    """
+
+    def __init__(self, redis_client=None, window_minutes=60, prefix='kpi', shared=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._redis = redis_client
+        self.shared = shared
+        self.shared_key = f'{prefix}_totals'
+        self.window = window_minutes
+        self.totals_key = f'{prefix}:totals'
+        self.buckets_key = f'{prefix}:buckets'
+        self.latest_key = f'{prefix}:latest'
+
+        self.buckets = np.zeros((window_minutes, len(MODES), len(WINDOW_FIELDS)))
+        self.bucket_minutes = np.full(window_minutes, -1, dtype=np.int64)
+        self.window_totals = np.zeros((len(MODES), len(WINDOW_FIELDS)))
+        self.gauges = np.zeros((len(MODES), len(GAUGE_FIELDS)))
+        self.latest = {}
+        self.busy_attractions = {}
+        self.active_routes = 0
+        self.current_minute = None
+        self.lock = threading.Lock()
+
+    @property
+    def redis_client(self):
+        # Either a client or a callable returning the current one (e.g. CacheManager.get_redis)
+        return self._redis() if callable(self._redis) else self._redis
+
+    def _advance(self, minute):
+        """Move the window to end at minute, expiring old buckets; returns the cleared slots"""
+        if self.current_minute is not None and minute <= self.current_minute:
+            return set()
+        first = minute if self.current_minute is None else max(self.current_minute + 1, minute - self.window + 1)
+        cleared = set()
+        for expired in range(first, minute + 1):
+            slot = expired % self.window
+            self.window_totals -= self.buckets[slot]
+            self.buckets[slot] = 0
+            self.bucket_minutes[slot] = expired
+            cleared.add(slot)
+        self.current_minute = minute
+        return cleared
+
+    def observe_stations(self, timestamp, stations, routes=None):
+        """Ingest one batch of station observations taken at timestamp"""
+        minute = int(timestamp.timestamp() // 60)
+        with self.lock:
+            self._sync()
+            slots = self._advance(minute)
+            slot = minute % self.window
+            if self.bucket_minutes[slot] != minute:
+                self.logger.debug(f"Dropping observations for expired minute {minute}")
+                return
+            slots.add(slot)
+
+            changed = {}
+            for station in stations:
+                mode = mode_of(station)
+                if mode is None:
+                    continue
+                passengers = float(station.get('passenger_count') or 0)
+                delay = float(station.get('delay_minutes') or 0)
+                operational = station.get('status', 'operational') == 'operational'
+                on_time = delay <= ON_TIME_DELAY_MINUTES
+                observed = np.array([1, delay, on_time, on_time and operational], dtype=float)
+                self.buckets[slot, mode] += observed
+                self.window_totals[mode] += observed
+
+                gauge = [mode, passengers, float(passengers >= BUSY_STATION_PASSENGERS), float(operational)]
+                previous = self.latest.get(station['id'])
+                if previous is not None:
+                    self.gauges[int(previous[0])] -= [1, *previous[1:]]
+                self.gauges[mode] += [1, *gauge[1:]]
+                self.latest[station['id']] = gauge
+                changed[station['id']] = json.dumps(gauge)
+
+            if routes is not None:
+                self.active_routes = sum(1 for route in routes if route.get('status') == 'operational')
+            self._publish(slots, changed)
+
+    def observe_attractions(self, attractions):
+        """Ingest current attraction occupancy"""
+        with self.lock:
+            self._sync()
+            changed = {}
+            for attraction in attractions:
+                busy = (attraction.get('current_occupancy') or 0) >= BUSY_ATTRACTION_OCCUPANCY
+                if self.busy_attractions.get(attraction['id']) != busy:
+                    self.busy_attractions[attraction['id']] = busy
+                    changed[f"attraction:{attraction['id']}"] = json.dumps(busy)
+            self._publish(set(), changed)
+
+    def _totals_fields(self):
+        """Flatten window sums, gauges and counters into hash fields"""
+        fields = {}
+        for m, mode in enumerate(MODES):
+            fields.update({f'{mode}:{field}': float(value) for field, value in zip(WINDOW_FIELDS, self.window_totals[m])})
+            fields.update({f'{mode}:{field}': float(value) for field, value in zip(GAUGE_FIELDS, self.gauges[m])})
+        fields['attractions:busy'] = sum(self.busy_attractions.values())
+        fields['routes:active'] = self.active_routes
+        fields['minute'] = self.current_minute if self.current_minute is not None else -1
+        return fields
+
+    def _publish(self, slots, changed):
+        """Mirror the changed state into Redis in one transaction"""
+        if self.redis_client is None:
+            if self.shared is not None:
+                self.shared.set(self.shared_key, self._totals_fields(), timeout=self.window * 60)
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.hset(self.totals_key, mapping=self._totals_fields())
+            if slots:
+                pipe.hset(self.buckets_key, mapping={
+                    str(slot): json.dumps([int(self.bucket_minutes[slot]), self.buckets[slot].tolist()])
+                    for slot in slots
+                })
+            if changed:
+                pipe.hset(self.latest_key, mapping=changed)
+            pipe.execute()
+        except Exception as e:
+            self.logger.error(f"Failed to publish KPI state: {e}")
+
+    def _sync(self):
+        """Reload state from Redis when another process ingested more recently (e.g. a new leader)"""
+        if self.redis_client is None:
+            return
+        try:
+            minute = self.redis_client.hget(self.totals_key, 'minute')
+            if minute is None or int(float(minute)) <= (self.current_minute if self.current_minute is not None else -1):
+                return
+            totals = self.redis_client.hgetall(self.totals_key)
+            buckets = self.redis_client.hgetall(self.buckets_key)
+            latest = self.redis_client.hgetall(self.latest_key)
+        except Exception as e:
+            self.logger.error(f"Failed to load KPI state: {e}")
+            return
+
+        self.buckets[:] = 0
+        self.bucket_minutes[:] = -1
+        for slot, value in buckets.items():
+            bucket_minute, values = json.loads(value)
+            self.bucket_minutes[int(slot)] = bucket_minute
+            self.buckets[int(slot)] = values
+        self.window_totals = self.buckets.sum(axis=0)
+        self.latest, self.busy_attractions = {}, {}
+        for key, value in latest.items():
+            if key.startswith('attraction:'):
+                self.busy_attractions[key[len('attraction:'):]] = json.loads(value)
+            else:
+                self.latest[key] = json.loads(value)
+        self.gauges[:] = 0
+        for mode, passengers, busy, operational in self.latest.values():
+            self.gauges[int(mode)] += [1, passengers, busy, operational]
+        self.active_routes = int(float(totals.get('routes:active', 0)))
+        self.current_minute = int(float(minute))
+
+    def snapshot(self, now=None):
+        """Get the current KPIs; reads one Redis hash, or local state without Redis"""
+        fields = None
+        if self.redis_client is not None:
+            try:
+                fields = {key: float(value) for key, value in self.redis_client.hgetall(self.totals_key).items()}
+            except Exception as e:
+                self.logger.error(f"Failed to read KPI snapshot: {e}")
+        if not fields:
+            with self.lock:
+                fields = self._totals_fields()
+            shared = self.shared.get(self.shared_key) if self.shared is not None else None
+            # Prefer the ingesting worker's totals when they are newer than ours
+            if shared and shared.get('minute', -1) > fields['minute']:
+                fields = shared
+
+        window = np.array([[fields.get(f'{mode}:{field}', 0) for field in WINDOW_FIELDS] for mode in MODES])
+        gauges = np.array([[fields.get(f'{mode}:{field}', 0) for field in GAUGE_FIELDS] for mode in MODES])
+        minute = int(fields.get('minute', -1))
+        now_minute = int((now or datetime.now()).timestamp() // 60)
+        if minute < 0 or now_minute - minute >= self.window:
+            # Nothing ingested within the window
+            window[:] = 0
+        return summarize_kpis(window, gauges, fields, minute)
+
+def _percent(part, whole):
+    return round(float(part / whole * 100), 1) if whole else None
+
+def summarize_kpis(window, gauges, fields, minute):
+    """Turn window sums and gauges into the dashboard's KPI fields"""
+    observations, delays, on_time, served = (window[:, WINDOW_FIELDS.index(f)] for f in WINDOW_FIELDS)
+    stations, passengers, busy, operational = (gauges[:, GAUGE_FIELDS.index(f)] for f in GAUGE_FIELDS)
+
+    total_passengers = passengers.sum()
+    distribution = {
+        mode: int(round(share)) if share is not None else 0
+        for mode, share in zip(MODES, (_percent(value, total_passengers) for value in passengers))
+    }
+    modes = {}
+    status = {}
+    for m, mode in enumerate(MODES):
+        avg_delay = round(float(delays[m] / observations[m]), 1) if observations[m] else None
+        modes[mode] = {
+            'stations': int(stations[m]),
+            'passengers': int(passengers[m]),
+            'busy_stations': int(busy[m]),
+            'avg_delay': avg_delay,
+            'on_time_percentage': _percent(on_time[m], observations[m])
+        }
+        if not stations[m]:
+            status[mode] = 'no_data'
+        elif operational[m] < stations[m]:
+            status[mode] = 'disrupted'
+        elif avg_delay is not None and avg_delay > DELAYED_MODE_MINUTES:
+            status[mode] = 'delayed'
+        else:
+            status[mode] = 'operational'
+    reported = [value for value in status.values() if value != 'no_data']
+    status['overall'] = 'no_data' if not reported else (
+        'operational' if all(value == 'operational' for value in reported) else 'degraded'
+    )
+
+    return {
+        'as_of': datetime.fromtimestamp(minute * 60).isoformat() if minute >= 0 else None,
+        'active_routes': int(fields.get('routes:active', 0)),
+        'total_passengers': int(total_passengers),
+        'busy_stations': int(busy.sum()),
+        'busy_attractions': int(fields.get('attractions:busy', 0)),
+        'avg_delay': round(float(delays.sum() / observations.sum()), 1) if observations.sum() else None,
+        'efficiency_rate': _percent(served.sum(), observations.sum()),
+        'on_time_percentage': _percent(on_time.sum(), observations.sum()),
+        'transit_distribution': distribution,
+        'system_status': status,
+        'modes': modes
+    }
\ No newline at end of file
@@ -0,0 +1,212 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PROFILE_PATH = os.path.join(BACKEND_ROOT, 'instance', 'profiles')
+
+MAX_PROFILE_SECONDS = 120
+PROFILE_ID = re.compile(r'^[\w.-]+$')
+
+def frame_label(code):
+    """Name a code object as path:qualname, with backend files relative to the backend root"""
+    filename = code.co_filename
+    if filename.startswith(BACKEND_ROOT):
+        filename = os.path.relpath(filename, BACKEND_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{getattr(code, 'co_qualname', code.co_name)}"
+
+class SamplingProfiler:
+    """Statistical CPU profiler sampling the Python stacks of running threads
+
+    A background thread reads sys._current_frames() every interval and
+    counts each distinct stack, so the profiled code runs unmodified and
+    the overhead stays proportional to the sampling rate. Results are
+    folded stacks (one 'root;...;leaf count' line per stack), the input
+    format of flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval=0.01, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, duration=None):
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._deadline = self._started + duration if duration else None
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                self.counts[(names.get(thread_id, str(thread_id)), tuple(codes))] += 1
+            self.samples += 1
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                break
+            self._stop.wait(self.interval)
+        self.elapsed = time.perf_counter() - self._started
+
+    def folded(self):
+        """Get the collapsed stacks, root first, heaviest first"""
+        labels = {}
+        lines = Counter()
+        for (thread_name, codes), count in self.counts.items():
+            frames = [labels.get(code) or labels.setdefault(code, frame_label(code)) for code in reversed(codes)]
+            lines[';'.join([f'thread:{thread_name}', *frames])] += count
+        return ''.join(f"{stack} {count}\n" for stack, count in lines.most_common())
+
+class ProfileStore:
+    """Profiles and tracemalloc snapshots saved as files
+
+    Files are shared by every worker on the host, so a profile captured in
+    one worker can be listed and downloaded through any other.
+    """
+
+    def __init__(self, path=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path or os.environ.get('PROFILE_PATH', DEFAULT_PROFILE_PATH)
+        self.lock = threading.Lock()
+        self.active = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def _new_id(self, kind):
+        return f"{datetime.now():%Y%m%dT%H%M%S%f}-{os.getpid()}-{kind}"
+
+    def file_for(self, profile_id, extension):
+        if not PROFILE_ID.match(profile_id):
+            raise ValueError(f"Invalid profile id: {profile_id}")
+        return os.path.join(self.path, f'{profile_id}.{extension}')
+
+    def save_folded(self, profiler, kind, meta='', profile_id=None):
+        """Write a finished profiler's folded stacks; returns the profile id"""
+        profile_id = profile_id or self._new_id(kind)
+        header = (
+            f"# pid={os.getpid()} started={profiler.started_at.isoformat()} "
+            f"seconds={profiler.elapsed:.3f} samples={profiler.samples} "
+            f"interval_ms={profiler.interval * 1000:g} {meta}".rstrip() + '\n'
+        )
+        with open(self.file_for(profile_id, 'folded'), 'w') as handle:
+            handle.write(header + profiler.folded())
+        return profile_id
+
+    def start_sampling(self, seconds, interval):
+        """Profile every thread of this worker for seconds in the background; None if one is running"""
+        seconds = min(max(float(seconds), 0.1), MAX_PROFILE_SECONDS)
+        with self.lock:
+            if self.active is not None and self.active.running:
+                return None
+            profiler = SamplingProfiler(interval=interval).start(seconds)
+            profile_id = self._new_id('sampling')
+            self.active = profiler
+
+        def run():
+            profiler._thread.join()
+            self.save_folded(profiler, 'sampling', profile_id=profile_id)
+            self.logger.info(f"Saved CPU profile {profile_id} ({profiler.samples} samples)")
+
+        threading.Thread(target=run, name='profile-writer', daemon=True).start()
+        return profile_id
+
+    def list(self, kind=None):
+        """List saved profiles and snapshots, newest first"""
+        entries = []
+        for name in os.listdir(self.path):
+            profile_id, _, extension = name.rpartition('.')
+            if extension not in ('folded', 'tracemalloc'):
+                continue
+            _, pid, profile_kind = profile_id.split('-', 2)
+            if kind and profile_kind != kind:
+                continue
+            stat = os.stat(os.path.join(self.path, name))
+            entries.append({
+                'id': profile_id,
+                'kind': profile_kind,
+                'pid': int(pid),
+                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'bytes': stat.st_size
+            })
+        return sorted(entries, key=lambda entry: entry['id'], reverse=True)
+
+    def read_folded(self, profile_id):
+        path = self.file_for(profile_id, 'folded')
+        if not os.path.exists(path):
+            return None
+        with open(path) as handle:
+            return handle.read()
+
+    def take_snapshot(self):
+        """Dump a tracemalloc snapshot of this worker; None when tracing is off"""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        profile_id = self._new_id('memory')
+        snapshot.dump(self.file_for(profile_id, 'tracemalloc'))
+        return profile_id, snapshot
+
+    def load_snapshot(self, profile_id):
+        path = self.file_for(profile_id, 'tracemalloc')
+        return tracemalloc.Snapshot.load(path) if os.path.exists(path) else None
+
+def format_stats(stats, limit):
+    """Turn tracemalloc Statistic/StatisticDiff entries into JSON-friendly dicts"""
+    results = []
+    for stat in stats[:limit]:
+        entry = {
+            'location': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        }
+        if hasattr(stat, 'size_diff'):
+            entry['size_diff_kb'] = round(stat.size_diff / 1024, 1)
+            entry['count_diff'] = stat.count_diff
+        results.append(entry)
+    return results
+
+def tracemalloc_status():
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'pid': os.getpid(),
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit(),
+        'traced_kb': round(current / 1024, 1),
+        'peak_kb': round(peak / 1024, 1)
+    }
\ No newline at end of file
@@ -0,0 +1,110 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+class ProviderAggregator:
+    """Fan-out search across providers through a bounded thread pool
+
+    Every provider runs concurrently under its own timeout, so a search
+    costs about as long as the slowest provider within its deadline rather
+    than the sum of all providers. Providers may opt into hedging: if the
+    first call has not answered after hedge_after seconds a duplicate call
+    is issued and whichever finishes first wins. Slow or failing providers
+    are reported in the status map and their results are left out.
+    """
+
+    def __init__(self, max_workers=8):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='provider')
+        self.providers = {}
+
+    def register(self, name, func, timeout=2.0, hedge_after=None):
+        """Register a provider callable taking the search arguments"""
+        self.providers[name] = {'func': func, 'timeout': timeout, 'hedge_after': hedge_after}
+
+    def search(self, *args, providers=None, wrap=None, **kwargs):
+        """Query providers concurrently and return (results, status)
+
+        wrap, when given, decorates each provider call (e.g. to push a Flask
+        app context into the worker thread).
+        """
+        names = [name for name in (providers or self.providers) if name in self.providers]
+        started = time.monotonic()
+        pending = {}
+        calls = {}
+        status = {}
+
+        for name in names:
+            calls[name] = 1
+            pending[self._submit(name, wrap, args, kwargs)] = name
+
+        results = {}
+        while pending:
+            now = time.monotonic() - started
+            deadlines = self._next_events(names, results, status, calls, now)
+            if not deadlines:
+                break
+
+            done, _ = wait(list(pending), timeout=max(0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                if name in results or name in status:
+                    continue
+                elapsed = round((time.monotonic() - started) * 1000, 1)
+                error = future.exception()
+                if error is not None:
+                    self.logger.error(f"Provider {name} failed: {error}")
+                    if not any(n == name for n in pending.values()):
+                        status[name] = {'status': 'error', 'latency_ms': elapsed, 'calls': calls[name]}
+                    continue
+                results[name] = future.result() or []
+                status[name] = {'status': 'ok', 'latency_ms': elapsed,
+                                'count': len(results[name]), 'calls': calls[name]}
+
+            now = time.monotonic() - started
+            for name in names:
+                if name in status:
+                    continue
+                config = self.providers[name]
+                if now >= config['timeout']:
+                    status[name] = {'status': 'timeout', 'latency_ms': round(now * 1000, 1), 'calls': calls[name]}
+                    self.logger.warning(f"Provider {name} timed out after {config['timeout']}s")
+                elif config['hedge_after'] is not None and calls[name] == 1 and now >= config['hedge_after']:
+                    calls[name] = 2
+                    pending[self._submit(name, wrap, args, kwargs)] = name
+
+            pending = {future: name for future, name in pending.items() if name not in status}
+
+        for name in names:
+            status.setdefault(name, {'status': 'timeout', 'calls': calls[name]})
+
+        combined = []
+        for name in names:
+            for item in results.get(name, []):
+                combined.append({**item, 'source': item.get('source', name)})
+        return combined, status
+
+    def _submit(self, name, wrap, args, kwargs):
+        """Submit one provider call to the pool"""
+        func = self.providers[name]['func']
+        if wrap is not None:
+            func = wrap(func)
+        return self.executor.submit(func, *args, **kwargs)
+
+    def _next_events(self, names, results, status, calls, now):
+        """Get upcoming timeout and hedge instants (seconds since start)"""
+        events = []
+        for name in names:
+            if name in status:
+                continue
+            config = self.providers[name]
+            events.append(config['timeout'])
+            if config['hedge_after'] is not None and calls[name] == 1:
+                events.append(config['hedge_after'])
+        return [event for event in events if event >= now] or ([now] if events else [])
+
+    def shutdown(self):
+        """Stop accepting work without waiting for in-flight calls"""
+        self.executor.shutdown(wait=False)
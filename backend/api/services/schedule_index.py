@@ -0,0 +1,224 @@
+import logging
+from datetime import datetime
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# Service-day bitmasks (bit 0 = Monday, matching datetime.weekday())
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = (1 << day for day in range(7))
+WEEKDAYS = MONDAY | TUESDAY | WEDNESDAY | THURSDAY | FRIDAY
+WEEKENDS = SATURDAY | SUNDAY
+DAILY = WEEKDAYS | WEEKENDS
+
+def parse_clock(value):
+    """Convert an 'HH:MM' or 'HH:MM:SS' string into seconds since midnight"""
+    parts = [int(part) for part in value.strip().split(':')]
+    while len(parts) < 3:
+        parts.append(0)
+    hours, minutes, seconds = parts
+    return hours * 3600 + minutes * 60 + seconds
+
+def seconds_since_midnight(dt):
+    """Get seconds since midnight for a datetime"""
+    return dt.hour * 3600 + dt.minute * 60 + dt.second
+
+def generate_headway_trips(station_ids, first_departure, last_departure, headway_seconds,
+                           hop_seconds=120, service_days=DAILY, bidirectional=True):
+    """Generate trips for a line operated on a fixed headway
+
+    Each trip is a (station_ids, stop_times, service_days) tuple where
+    stop_times is an int32 array of seconds since midnight, one per station.
+    """
+    if not station_ids or headway_seconds <= 0:
+        return []
+
+    start = parse_clock(first_departure) if isinstance(first_departure, str) else int(first_departure)
+    end = parse_clock(last_departure) if isinstance(last_departure, str) else int(last_departure)
+
+    # Trip start times x stop offsets, built in one broadcast
+    starts = np.arange(start, end + 1, headway_seconds, dtype=np.int32)
+    offsets = np.arange(len(station_ids), dtype=np.int32) * np.int32(hop_seconds)
+    stop_times = starts[:, None] + offsets[None, :]
+
+    directions = [tuple(station_ids)]
+    if bidirectional and len(station_ids) > 1:
+        directions.append(tuple(reversed(station_ids)))
+
+    trips = []
+    for stations in directions:
+        for row in stop_times:
+            trips.append((stations, row, service_days))
+    return trips
+
+class ScheduleIndex:
+    """Per-station sorted departure index for fast next-arrival queries
+
+    Departures are stored per station as sorted int32 seconds-since-midnight
+    arrays with a parallel uint8 service-day mask and a parallel int16 code
+    for the terminus each departure is heading to. After build(), a flattened
+    per-weekday key array lets next_arrivals_for_all() answer every station
+    with a single vectorized searchsorted pass.
+    """
+
+    # Keys are station_position * stride + departure; stride spans two days so
+    # that after-midnight departures (e.g. 24:30) stay inside their row
+    _KEY_STRIDE = 2 * SECONDS_PER_DAY
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._pending = {}
+        self.station_ids = []
+        self._departures = {}
+        self._service_days = {}
+        self._termini = {}
+        self.terminus_ids = []
+        self._terminus_codes = {}
+        self._day_keys = []
+        self._day_bounds = []
+
+    def _terminus_code(self, terminus):
+        if terminus is None:
+            return -1
+        if terminus not in self._terminus_codes:
+            self._terminus_codes[terminus] = len(self.terminus_ids)
+            self.terminus_ids.append(terminus)
+        return self._terminus_codes[terminus]
+
+    def add_departures(self, station_id, departures, service_days=DAILY, terminus=None):
+        """Queue departures (seconds since midnight) for a station"""
+        times = np.asarray(departures, dtype=np.int32).ravel()
+        masks = np.broadcast_to(np.asarray(service_days, dtype=np.uint8), times.shape)
+        termini = np.full(times.shape, self._terminus_code(terminus), dtype=np.int16)
+        self._pending.setdefault(station_id, []).append((times, masks, termini))
+
+    def add_trip(self, station_ids, stop_times, service_days=DAILY):
+        """Queue every stop of a trip except the last as a departure towards its terminus
+
+        The final stop is an arrival only, so it is not offered as a departure.
+        """
+        terminus = station_ids[-1] if len(station_ids) else None
+        for station_id, stop_time in zip(station_ids[:-1], stop_times[:-1]):
+            self.add_departures(station_id, [stop_time], service_days, terminus)
+
+    def build(self):
+        """Sort queued departures and build the bulk lookup structures"""
+        self.station_ids = sorted(self._pending)
+        self._departures = {}
+        self._service_days = {}
+        self._termini = {}
+
+        for station_id in self.station_ids:
+            chunks = self._pending[station_id]
+            times = np.concatenate([chunk[0] for chunk in chunks])
+            masks = np.concatenate([chunk[1] for chunk in chunks])
+            termini = np.concatenate([chunk[2] for chunk in chunks])
+            order = np.argsort(times, kind='stable')
+            self._departures[station_id] = times[order]
+            self._service_days[station_id] = masks[order]
+            self._termini[station_id] = termini[order]
+
+        self._build_day_keys()
+        self._pending = {}
+        self.logger.info(f"Schedule index built for {len(self.station_ids)} stations")
+        return self
+
+    def _build_day_keys(self):
+        """Build one flattened, globally sorted key array per weekday"""
+        self._day_keys = []
+        self._day_bounds = []
+        for day in range(7):
+            bit = np.uint8(1 << day)
+            keys = []
+            bounds = np.zeros(len(self.station_ids) + 1, dtype=np.int64)
+            for position, station_id in enumerate(self.station_ids):
+                active = self._departures[station_id][(self._service_days[station_id] & bit) != 0]
+                keys.append(active.astype(np.int64) + position * self._KEY_STRIDE)
+                bounds[position + 1] = bounds[position] + len(active)
+            self._day_keys.append(np.concatenate(keys) if keys else np.empty(0, dtype=np.int64))
+            self._day_bounds.append(bounds)
+
+    def departures(self, station_id):
+        """Get the sorted departure array for a station"""
+        return self._departures.get(station_id, np.empty(0, dtype=np.int32))
+
+    def next_departures(self, station_id, when=None, count=3):
+        """Get the next N departures at a station after a given time
+
+        Returns (seconds, terminus_id) tuples, where seconds is counted from
+        midnight of the queried day (departures on the following service day
+        are reported past SECONDS_PER_DAY) and terminus_id is the last stop of
+        the trip, or None when the departure was added without one.
+        """
+        when = when or datetime.now()
+        times = self._departures.get(station_id)
+        if times is None or count <= 0:
+            return []
+
+        masks = self._service_days[station_id]
+        termini = self._termini[station_id]
+        now = seconds_since_midnight(when)
+        weekday = when.weekday()
+        results = []
+
+        for day_offset in (0, 1):
+            bit = 1 << ((weekday + day_offset) % 7)
+            after = now if day_offset == 0 else 0
+            start = int(np.searchsorted(times, after, side='left'))
+            for i in range(start, len(times)):
+                if masks[i] & bit:
+                    code = int(termini[i])
+                    terminus = self.terminus_ids[code] if code >= 0 else None
+                    results.append((int(times[i]) + day_offset * SECONDS_PER_DAY, terminus))
+                    if len(results) == count:
+                        return results
+        return results
+
+    def next_arrival(self, station_id, when=None):
+        """Get seconds until the next departure at a station, or None"""
+        when = when or datetime.now()
+        upcoming = self.next_departures(station_id, when, count=1)
+        if not upcoming:
+            return None
+        return upcoming[0][0] - seconds_since_midnight(when)
+
+    def next_arrivals_for_all(self, when=None):
+        """Get seconds until the next departure for every station in one pass
+
+        Stations with no further service today fall through to the first
+        departure of the next service day. Returns a dict of
+        station_id -> seconds, or None when a station has no service at all.
+        """
+        when = when or datetime.now()
+        if not self.station_ids:
+            return {}
+
+        now = seconds_since_midnight(when)
+        today = when.weekday()
+        upcoming = self._bulk_lookup(today, now)
+        waits = np.where(upcoming >= 0, upcoming - now, -1)
+
+        missing = waits < 0
+        if missing.any():
+            tomorrow = self._bulk_lookup((today + 1) % 7, 0)
+            waits = np.where(missing & (tomorrow >= 0), tomorrow + SECONDS_PER_DAY - now, waits)
+
+        return {
+            station_id: (int(wait) if wait >= 0 else None)
+            for station_id, wait in zip(self.station_ids, waits)
+        }
+
+    def _bulk_lookup(self, weekday, after):
+        """Get the first departure at or after a time for every station, or -1"""
+        keys = self._day_keys[weekday]
+        bounds = self._day_bounds[weekday]
+        rows = np.arange(len(self.station_ids), dtype=np.int64)
+        if not len(keys):
+            return np.full(len(rows), -1, dtype=np.int64)
+
+        queries = rows * self._KEY_STRIDE + after
+        positions = np.searchsorted(keys, queries, side='left')
+        has_next = positions < bounds[1:]
+        safe = np.minimum(positions, len(keys) - 1)
+        return np.where(has_next, keys[safe] - rows * self._KEY_STRIDE, -1)
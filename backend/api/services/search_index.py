@@ -0,0 +1,203 @@
+import logging
+import math
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from api.services.spatial_processing import haversine_km
+from utils.geocoding import normalize_place_name
+
+logger = logging.getLogger(__name__)
+
+# Field weights for scoring; list fields are joined before tokenizing
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'category': 2.0,
+    'cuisine': 2.0,
+    'facilities': 1.0,
+    'address': 1.0,
+}
+
+def levenshtein(a, b):
+    """Edit distance between two strings"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class BKTree:
+    """Burkhard-Keller tree over words for edit-distance lookups"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = levenshtein(word, node[0])
+            if distance == 0:
+                return
+            if distance not in node[1]:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = node[1][distance]
+
+    def search(self, word, max_distance):
+        """Get (word, distance) pairs within max_distance"""
+        if self.root is None:
+            return []
+        results = []
+        stack = [self.root]
+        while stack:
+            candidate, children = stack.pop()
+            distance = levenshtein(word, candidate)
+            if distance <= max_distance:
+                results.append((candidate, distance))
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in children.items() if low <= d <= high)
+        return results
+
+class AttractionSearchIndex:
+    """Inverted index with typo-tolerant, prefix and geo-boosted search
+
+    Tokens from the weighted fields map to per-document weights. Query
+    tokens match exactly, by prefix (for the token being typed) or within
+    an edit distance via a BK-tree over the vocabulary; scores combine
+    field weight, idf and match quality, then get a distance boost when a
+    location is given. Documents can be added, updated and removed at any
+    time.
+    """
+
+    def __init__(self, fuzzy_penalty=0.7, prefix_penalty=0.8):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.fuzzy_penalty = fuzzy_penalty
+        self.prefix_penalty = prefix_penalty
+        self.documents = {}
+        self.postings = defaultdict(dict)
+        self._doc_tokens = {}
+        self._bk_tree = BKTree()
+        self._vocabulary = []
+        self._vocabulary_sorted = True
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _tokenize(self, document):
+        """Get {token: weight} for a document's searchable fields"""
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = document.get(field)
+            if not value:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(str(item) for item in value)
+            for token in normalize_place_name(str(value)).split():
+                weights[token] = max(weights[token], weight)
+        return weights
+
+    def add(self, document):
+        """Add or replace a document keyed by its id"""
+        with self.lock:
+            doc_id = document['id']
+            if doc_id in self.documents:
+                self.remove(doc_id)
+            tokens = self._tokenize(document)
+            self.documents[doc_id] = document
+            self._doc_tokens[doc_id] = tokens
+            for token, weight in tokens.items():
+                if token not in self.postings:
+                    self._bk_tree.add(token)
+                    self._vocabulary.append(token)
+                    self._vocabulary_sorted = False
+                self.postings[token][doc_id] = weight
+
+    def add_many(self, documents):
+        for document in documents:
+            self.add(document)
+        return self
+
+    def remove(self, doc_id):
+        """Remove a document; vocabulary words without postings are skipped at query time"""
+        with self.lock:
+            self.documents.pop(doc_id, None)
+            for token in self._doc_tokens.pop(doc_id, {}):
+                self.postings.get(token, {}).pop(doc_id, None)
+
+    def _expand(self, token, allow_prefix):
+        """Get (vocabulary token, quality) matches for a query token"""
+        matches = {}
+        if self.postings.get(token):
+            matches[token] = 1.0
+
+        if allow_prefix and len(token) >= 2:
+            if not self._vocabulary_sorted:
+                self._vocabulary.sort()
+                self._vocabulary_sorted = True
+            for i in range(bisect_left(self._vocabulary, token), len(self._vocabulary)):
+                word = self._vocabulary[i]
+                if not word.startswith(token):
+                    break
+                if word not in matches and self.postings.get(word):
+                    matches[word] = self.prefix_penalty
+
+        if len(token) >= 4:
+            max_distance = 1 if len(token) <= 5 else 2
+            for word, distance in self._bk_tree.search(token, max_distance):
+                if word not in matches and self.postings.get(word):
+                    matches[word] = self.fuzzy_penalty ** distance
+        return matches
+
+    def search(self, query, lat=None, lng=None, radius_km=5.0, limit=20, prefix=True):
+        """Search documents; returns (document, score) pairs best first"""
+        tokens = normalize_place_name(query or '').split()
+        if not tokens:
+            return []
+
+        with self.lock:
+            total = max(len(self.documents), 1)
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+            for position, token in enumerate(tokens):
+                # Only the token being typed is expanded by prefix
+                expansions = self._expand(token, prefix and position == len(tokens) - 1)
+                for word, quality in expansions.items():
+                    postings = self.postings[word]
+                    idf = math.log(1 + total / len(postings))
+                    for doc_id, weight in postings.items():
+                        scores[doc_id] += weight * idf * quality
+                for doc_id in {d for word in expansions for d in self.postings[word]}:
+                    matched[doc_id] += 1
+
+            # Favour documents matching every query token
+            results = []
+            for doc_id, score in scores.items():
+                document = self.documents[doc_id]
+                score *= matched[doc_id] / len(tokens)
+                if lat is not None and lng is not None:
+                    distance = float(haversine_km(lat, lng, document['latitude'], document['longitude']))
+                    score *= 1 + math.exp(-distance / max(radius_km, 0.1))
+                results.append((document, score))
+
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
+
+    def autocomplete(self, prefix, lat=None, lng=None, radius_km=5.0, limit=10):
+        """Suggest document names for a partially typed query"""
+        return [
+            {'id': document['id'], 'name': document['name'], 'category': document.get('category')}
+            for document, _ in self.search(prefix, lat, lng, radius_km, limit=limit, prefix=True)
+        ]
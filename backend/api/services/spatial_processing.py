@@ -1,10 +1,21 @@
 import logging
 import math
-from geopy.distance import geodesic
-from collections import defaultdict
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088
+# Derived from the haversine radius so cell spans never undercount it
+KM_PER_DEGREE_LAT = EARTH_RADIUS_KM * math.pi / 180
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Vectorized great-circle distance in kilometers (scalars or NumPy arrays)"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
 class SpatialProcessor:
     """Service for processing spatial/geographic data"""
     
@@ -14,6 +25,7 @@ class SpatialProcessor:
     def calculate_distance(self, lat1, lon1, lat2, lon2, unit='km'):
         """Calculate distance between two geographic points"""
         try:
+            from geopy.distance import geodesic
             point1 = (lat1, lon1)
             point2 = (lat2, lon2)
             
@@ -244,4 +256,138 @@ class SpatialProcessor:
             
         except Exception as e:
             self.logger.error(f"Error calculating area: {e}")
-            return 0
\ No newline at end of file
+            return 0
+
+class SpatialIndex:
+    """Uniform grid index over points for fast radius and pair queries
+
+    Points are bucketed into square cells of cell_size degrees, so a radius
+    query only computes distances for points in the neighbouring cells.
+    Cells are stored as sorted cell keys with offsets into one position
+    array rather than a dict of arrays, so a preloaded index is plain NumPy
+    buffers that forked workers share without copying.
+    """
+    
+    # Packs (row, col) into one int64 key; fits any cell_size down to ~1e-4 degrees
+    _KEY_OFFSET = 1 << 21
+    _KEY_STRIDE = 1 << 23
+    
+    def __init__(self, cell_size=0.01):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cell_size = cell_size
+        self.ids = []
+        self.lats = np.empty(0, dtype=np.float64)
+        self.lngs = np.empty(0, dtype=np.float64)
+        self._cell_keys = np.empty(0, dtype=np.int64)
+        self._cell_starts = np.zeros(1, dtype=np.int64)
+        self._cell_positions = np.empty(0, dtype=np.int64)
+    
+    @classmethod
+    def from_locations(cls, locations, id_key='id', cell_size=0.01):
+        """Build an index from dicts with latitude/longitude keys"""
+        index = cls(cell_size=cell_size)
+        index.build(
+            [location[id_key] for location in locations],
+            [location['latitude'] for location in locations],
+            [location['longitude'] for location in locations]
+        )
+        return index
+    
+    def build(self, ids, lats, lngs):
+        """Bucket points into grid cells"""
+        self.ids = list(ids)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        
+        keys = self._cell_key(*self._cell_of(self.lats, self.lngs))
+        self._cell_positions = np.argsort(keys, kind='stable')
+        self._cell_keys, counts = np.unique(keys[self._cell_positions], return_counts=True)
+        self._cell_starts = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return self
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def _cell_of(self, lats, lngs):
+        """Get grid cell coordinates for points"""
+        return (np.floor(np.asarray(lats) / self.cell_size).astype(np.int64),
+                np.floor(np.asarray(lngs) / self.cell_size).astype(np.int64))
+    
+    def _cell_span(self, radius_km, lat):
+        """Number of cells to search in each direction for a radius"""
+        lat_span = int(math.ceil(radius_km / (KM_PER_DEGREE_LAT * self.cell_size)))
+        # Degrees of longitude shrink towards the poles, so size them at the radius edge furthest from the equator
+        edge_lat = min(abs(lat) + radius_km / KM_PER_DEGREE_LAT, 90.0)
+        lng_km = KM_PER_DEGREE_LAT * self.cell_size * max(math.cos(math.radians(edge_lat)), 0.01)
+        return lat_span, int(math.ceil(radius_km / lng_km))
+    
+    def _cell_key(self, rows, cols):
+        return (np.asarray(rows, dtype=np.int64) + self._KEY_OFFSET) * self._KEY_STRIDE + \
+            (np.asarray(cols, dtype=np.int64) + self._KEY_OFFSET)
+    
+    def _candidates(self, row, col, lat_span, lng_span):
+        """Collect point positions from the cells around a cell"""
+        rows = np.arange(row - lat_span, row + lat_span + 1)
+        cols = np.arange(col - lng_span, col + lng_span + 1)
+        wanted = self._cell_key(rows[:, None], cols[None, :]).ravel()
+        slots = np.searchsorted(self._cell_keys, wanted)
+        present = slots < len(self._cell_keys)
+        present[present] = self._cell_keys[slots[present]] == wanted[present]
+        slots = slots[present]
+        found = [self._cell_positions[self._cell_starts[slot]:self._cell_starts[slot + 1]] for slot in slots]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+    
+    def query_radius(self, lat, lng, radius_km):
+        """Get (positions, distances_km) of points within a radius, nearest first"""
+        if not len(self.ids):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        row, col = (int(v) for v in self._cell_of(lat, lng))
+        candidates = self._candidates(row, col, *self._cell_span(radius_km, lat))
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        within = distances <= radius_km
+        candidates, distances = candidates[within], distances[within]
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+    
+    def nearest(self, lat, lng, radius_km=5.0, limit=None):
+        """Get (id, distance_km) tuples for points near a location"""
+        positions, distances = self.query_radius(lat, lng, radius_km)
+        if limit is not None:
+            positions, distances = positions[:limit], distances[:limit]
+        return [(self.ids[p], float(d)) for p, d in zip(positions, distances)]
+    
+    def pairs_within(self, radius_km, other=None):
+        """Get all point pairs within a radius as (left, right, distances_km) arrays
+
+        With other=None, pairs are taken within this index (i < j). Otherwise
+        left positions refer to this index and right positions to other.
+        Distances are only computed between neighbouring cells.
+        """
+        target = self if other is None else other
+        lefts, rights, dists = [], [], []
+        
+        for slot, key in enumerate(self._cell_keys.tolist()):
+            row, col = key // self._KEY_STRIDE - self._KEY_OFFSET, key % self._KEY_STRIDE - self._KEY_OFFSET
+            positions = self._cell_positions[self._cell_starts[slot]:self._cell_starts[slot + 1]]
+            lat = float(self.lats[positions[0]])
+            candidates = target._candidates(row, col, *target._cell_span(radius_km, lat)) \
+                if target.cell_size == self.cell_size else np.arange(len(target.ids))
+            if not len(candidates):
+                continue
+            
+            distances = haversine_km(
+                self.lats[positions][:, None], self.lngs[positions][:, None],
+                target.lats[candidates][None, :], target.lngs[candidates][None, :]
+            )
+            mask = distances <= radius_km
+            if other is None:
+                mask &= positions[:, None] < candidates[None, :]
+            left, right = np.nonzero(mask)
+            lefts.append(positions[left])
+            rights.append(candidates[right])
+            dists.append(distances[left, right])
+        
+        if not lefts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(lefts), np.concatenate(rights), np.concatenate(dists)
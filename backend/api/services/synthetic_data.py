@@ -0,0 +1,374 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 1440
+EPOCH = datetime(1970, 1, 1)
+
+# Klang Valley bounding box (south, west, north, east)
+KLANG_VALLEY = (2.85, 101.35, 3.30, 101.85)
+
+# Peak-minute passenger count range per station type
+STATION_BASE_RANGES = {
+    'lrt': (200, 1200),
+    'mrt': (300, 1100),
+    'brt': (100, 500),
+    'ktm': (150, 750),
+}
+
+# Hourly demand shape (0-1) for weekdays and weekends; hours not listed are 0
+DEMAND_PROFILES = {
+    'commuter': (
+        {0: .02, 1: .01, 2: .01, 3: .01, 4: .02, 5: .10, 6: .45, 7: .85, 8: 1.0, 9: .70, 10: .45, 11: .40,
+         12: .45, 13: .45, 14: .40, 15: .45, 16: .60, 17: .85, 18: .95, 19: .70, 20: .45, 21: .30, 22: .18, 23: .08},
+        {0: .02, 1: .01, 2: .01, 3: .01, 4: .01, 5: .04, 6: .12, 7: .22, 8: .32, 9: .42, 10: .50, 11: .55,
+         12: .58, 13: .60, 14: .60, 15: .58, 16: .55, 17: .52, 18: .50, 19: .45, 20: .38, 21: .28, 22: .16, 23: .07},
+    ),
+    'mall': (
+        {10: .20, 11: .30, 12: .45, 13: .50, 14: .40, 15: .38, 16: .42, 17: .50, 18: .62, 19: .70, 20: .68,
+         21: .45, 22: .10},
+        {10: .35, 11: .55, 12: .75, 13: .85, 14: .90, 15: .92, 16: .95, 17: 1.0, 18: .98, 19: .95, 20: .85,
+         21: .55, 22: .12},
+    ),
+    'dining': (
+        {7: .05, 8: .08, 9: .05, 10: .08, 11: .35, 12: .85, 13: .80, 14: .35, 15: .15, 16: .15, 17: .30,
+         18: .65, 19: .95, 20: .90, 21: .55, 22: .25, 23: .08},
+        {8: .10, 9: .15, 10: .20, 11: .45, 12: .90, 13: .90, 14: .55, 15: .35, 16: .35, 17: .45, 18: .75,
+         19: 1.0, 20: .95, 21: .65, 22: .30, 23: .10},
+    ),
+    'leisure': (
+        {10: .15, 11: .20, 12: .25, 13: .30, 14: .35, 15: .35, 16: .40, 17: .45, 18: .60, 19: .75, 20: .85,
+         21: .80, 22: .55, 23: .20},
+        {10: .35, 11: .45, 12: .60, 13: .70, 14: .75, 15: .78, 16: .80, 17: .82, 18: .88, 19: .95, 20: 1.0,
+         21: .90, 22: .60, 23: .25},
+    ),
+    'sightseeing': (
+        {8: .10, 9: .30, 10: .50, 11: .65, 12: .65, 13: .60, 14: .65, 15: .65, 16: .55, 17: .40, 18: .25,
+         19: .12, 20: .05},
+        {8: .15, 9: .40, 10: .70, 11: .85, 12: .90, 13: .85, 14: .88, 15: .90, 16: .80, 17: .60, 18: .40,
+         19: .20, 20: .08},
+    ),
+}
+
+# Demand multiplier per calendar month: year-end and school holidays
+SEASONALITY = {
+    'station': (1.02, 1.00, 1.01, 1.00, 0.99, 0.94, 0.97, 0.98, 1.00, 1.01, 1.00, 0.93),
+    'attraction': (1.12, 1.10, 1.02, 0.98, 0.97, 1.05, 1.08, 1.06, 0.98, 0.97, 1.00, 1.15),
+}
+
+# Metrics written per entity kind, in archive/JSONL column order
+METRICS = {
+    'station': ('passenger_count', 'delay_minutes'),
+    'attraction': ('current_occupancy', 'popularity_score'),
+}
+
+def stable_hash(*parts):
+    """64-bit hash of the parts that is the same in every process (unlike the salted hash())"""
+    digest = hashlib.blake2b('|'.join(str(part) for part in parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def stable_unit(*parts):
+    """Deterministic float in [0, 1) derived from the parts"""
+    return stable_hash(*parts) / 2 ** 64
+
+def seeded_offset(key, bucket, low, high):
+    """Deterministic integer offset in [low, high) for one time bucket
+
+    The same bucket always gets the same offset, so series recomputed in
+    another worker or on the next request agree on their shared points.
+    """
+    return low + stable_hash(key, bucket) % (high - low)
+
+def profile_for_category(category):
+    """Pick the demand profile for an attraction category"""
+    category = (category or '').lower()
+    if 'mall' in category or 'shopping' in category:
+        return 'mall'
+    if any(word in category for word in ('dining', 'cuisine', 'restaurant', 'cafe', 'food')):
+        return 'dining'
+    if any(word in category for word in ('cinema', 'aquarium', 'theme', 'entertainment', 'park', 'zoo')):
+        return 'leisure'
+    return 'sightseeing'
+
+def _minute_curve(hourly):
+    """Interpolate a 24-point hourly profile (values at hh:30) to 1440 minutes, wrapping at midnight"""
+    points = np.array([hourly.get(hour, 0.0) for hour in range(24)])
+    hours = np.arange(-1, 25) + 0.5
+    values = np.concatenate([points[-1:], points, points[:1]])
+    return np.interp(np.arange(MINUTES_PER_DAY) / 60, hours, values)
+
+class DemandSimulator:
+    """Seeded, vectorized simulator of per-minute station and attraction demand
+
+    Each day is generated as an (entities, 1440) block from generators
+    seeded with (seed, day, kind), so a day's values do not depend on the
+    requested range or on the process generating them, and entities added
+    after the catalog ones leave the catalog entities' values unchanged.
+    Demand follows weekday/weekend hourly profiles, monthly seasonality,
+    a per-entity daily level and per-minute noise; stations also get
+    occasional delay incidents.
+    """
+
+    def __init__(self, stations, attractions, seed=0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.seed = int(seed)
+        self.stations = list(stations)
+        self.attractions = list(attractions)
+        self.curves = {
+            name: (_minute_curve(weekday), _minute_curve(weekend))
+            for name, (weekday, weekend) in DEMAND_PROFILES.items()
+        }
+        self.entities = {
+            'station': self._station_params(),
+            'attraction': self._attraction_params(),
+        }
+        self._day_cache = {}
+
+    @classmethod
+    def with_synthetic_entities(cls, stations, attractions, extra_stations=0, extra_attractions=0, seed=0):
+        """Build a simulator over the catalog plus generated stations and attractions around it"""
+        rng = np.random.default_rng([seed, 0])
+        south, west, north, east = KLANG_VALLEY
+        stations, attractions = list(stations), list(attractions)
+
+        anchors = rng.integers(0, len(stations), extra_stations) if stations and extra_stations else []
+        offsets = rng.normal(0, 0.04, (extra_stations, 2))
+        for i, anchor in enumerate(anchors):
+            source = stations[anchor]
+            station_type = source['id'].split('_')[0]
+            stations.append({
+                'id': f'{station_type}_syn{i:06d}',
+                'name': f"{source['line']} Station {i}",
+                'latitude': float(np.clip(source['latitude'] + offsets[i, 0], south, north)),
+                'longitude': float(np.clip(source['longitude'] + offsets[i, 1], west, east)),
+                'line': source['line']
+            })
+
+        anchors = rng.integers(0, len(attractions), extra_attractions) if attractions and extra_attractions else []
+        offsets = rng.normal(0, 0.03, (extra_attractions, 2))
+        for i, anchor in enumerate(anchors):
+            source = attractions[anchor]
+            attractions.append({
+                'id': f'attr_syn{i:06d}',
+                'name': f"{source['category']} {i}",
+                'category': source['category'],
+                'latitude': float(np.clip(source['latitude'] + offsets[i, 0], south, north)),
+                'longitude': float(np.clip(source['longitude'] + offsets[i, 1], west, east)),
+            })
+        return cls(stations, attractions, seed=seed)
+
+    def _station_params(self):
+        bases = []
+        for station in self.stations:
+            low, high = STATION_BASE_RANGES.get(station['id'].split('_')[0], (150, 750))
+            bases.append(low + (high - low) * stable_unit(self.seed, 'base', station['id']))
+        return {
+            'ids': [station['id'] for station in self.stations],
+            'base': np.array(bases, dtype=np.float64),
+            'profiles': np.zeros(len(self.stations), dtype=np.int64),
+            'profile_names': ['commuter'],
+        }
+
+    def _attraction_params(self):
+        names = sorted(DEMAND_PROFILES)
+        profiles = [names.index(profile_for_category(a.get('category'))) for a in self.attractions]
+        return {
+            'ids': [attraction['id'] for attraction in self.attractions],
+            # Peak occupancy in percent
+            'base': np.array([60 + 38 * stable_unit(self.seed, 'peak', a['id']) for a in self.attractions]),
+            'popularity': np.array([
+                a.get('popularity_score') or 40 + 50 * stable_unit(self.seed, 'popularity', a['id'])
+                for a in self.attractions
+            ], dtype=np.float64),
+            'profiles': np.array(profiles, dtype=np.int64),
+            'profile_names': names,
+        }
+
+    def ids(self, kind):
+        return self.entities[kind]['ids']
+
+    def _shape(self, kind, day_start):
+        """(entities, 1440) demand shape for one day"""
+        params = self.entities[kind]
+        weekend = day_start.weekday() >= 5
+        curves = np.stack([self.curves[name][weekend] for name in params['profile_names']])
+        return curves[params['profiles']] * SEASONALITY[kind][day_start.month - 1]
+
+    def day(self, kind, day_start):
+        """Generate {metric: (entities, 1440) float32} for the day starting at day_start"""
+        day_start = day_start.replace(hour=0, minute=0, second=0, microsecond=0)
+        key = (kind, day_start)
+        cached = self._day_cache.get(key)
+        if cached is not None:
+            return cached
+
+        day_index = (day_start - EPOCH).days
+        kind_code = 1 if kind == 'station' else 2
+        params = self.entities[kind]
+        n = len(params['ids'])
+        # Independent streams, so appending entities leaves earlier rows unchanged
+        level = np.random.default_rng([self.seed, day_index, kind_code, 0]).normal(1.0, 0.06, n)
+        noise = np.random.default_rng([self.seed, day_index, kind_code, 1]).normal(0.0, 0.08, (n, MINUTES_PER_DAY))
+        shape = self._shape(kind, day_start) * level[:, None]
+        demand = shape * (1 + noise)
+
+        if kind == 'station':
+            passengers = np.maximum(np.rint(params['base'][:, None] * demand), 0)
+            jitter = np.random.default_rng([self.seed, day_index, kind_code, 2]).exponential(0.5, (n, MINUTES_PER_DAY))
+            delays = 0.3 + 2.2 * np.clip(shape, 0, None) ** 2 + jitter
+            # About one incident per station-month: 30-90 minutes of 8-25 extra minutes
+            events = np.random.default_rng([self.seed, day_index, kind_code, 3]).random((n, 4))
+            for row in np.flatnonzero(events[:, 0] < 1 / 30):
+                start = 360 + int(events[row, 1] * 960)
+                delays[row, start:start + 30 + int(events[row, 2] * 61)] += 8 + 17 * events[row, 3]
+            result = {'passenger_count': passengers, 'delay_minutes': np.round(delays, 1)}
+        else:
+            occupancy = np.clip(np.rint(params['base'][:, None] * demand), 0, 100)
+            popularity = np.clip(np.rint(params['popularity'][:, None] * (0.75 + 0.35 * shape)), 0, 100)
+            result = {'current_occupancy': occupancy, 'popularity_score': popularity}
+
+        result = {metric: values.astype(np.float32) for metric, values in result.items()}
+        # Keep the latest day per kind, enough for per-request lookups
+        self._day_cache = {k: v for k, v in self._day_cache.items() if k[0] != kind}
+        self._day_cache[key] = result
+        return result
+
+    def days(self, kind, start, count):
+        """Yield (day_start, {metric: block}) for count days from start's midnight"""
+        first = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(count):
+            day_start = first + timedelta(days=offset)
+            yield day_start, self.day(kind, day_start)
+
+    def values_at(self, kind, timestamp):
+        """Get {metric: {entity_id: value}} for the minute containing timestamp"""
+        minute = timestamp.hour * 60 + timestamp.minute
+        return {
+            metric: dict(zip(self.ids(kind), block[:, minute].tolist()))
+            for metric, block in self.day(kind, timestamp).items()
+        }
+
+class ArchiveSink:
+    """Writes simulated days into the time series archive, one block per metric"""
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    def write(self, kind, entity_ids, day_start, metrics):
+        for metric, block in metrics.items():
+            self.archive.append_block(metric, entity_ids, day_start, block)
+        return len(entity_ids) * MINUTES_PER_DAY
+
+class DatabaseSink:
+    """Bulk-inserts simulated observations into the real-time tables every `every` minutes
+
+    Timestamps are naive server-local time, the same convention the data
+    collectors and model defaults use, so generated and collected rows line up.
+    """
+
+    def __init__(self, session, every=15, batch_size=50000):
+        from models.database import AttractionRealTime, TransitRealTime
+        self.session = session
+        self.every = every
+        self.batch_size = batch_size
+        self.tables = {'station': TransitRealTime.__table__, 'attraction': AttractionRealTime.__table__}
+
+    def register_entities(self, simulator):
+        """Insert simulator stations and attractions missing from the catalog tables"""
+        from models.database import Attraction, TransitStation
+
+        known = {row[0] for row in self.session.query(TransitStation.id).all()}
+        rows = [
+            {'id': s['id'], 'name': s['name'], 'latitude': s['latitude'], 'longitude': s['longitude'],
+             'line': s['line'], 'station_type': s['id'].split('_')[0], 'status': 'operational'}
+            for s in simulator.stations if s['id'] not in known
+        ]
+        if rows:
+            self.session.execute(TransitStation.__table__.insert(), rows)
+
+        known = {row[0] for row in self.session.query(Attraction.id).all()}
+        rows = [
+            {'id': a['id'], 'name': a['name'], 'category': a['category'], 'latitude': a['latitude'],
+             'longitude': a['longitude'], 'address': a.get('address'), 'rating': a.get('rating'),
+             'operating_hours': a.get('operating_hours'), 'facilities': a.get('facilities', [])}
+            for a in simulator.attractions if a['id'] not in known
+        ]
+        if rows:
+            self.session.execute(Attraction.__table__.insert(), rows)
+        self.session.commit()
+
+    def write(self, kind, entity_ids, day_start, metrics):
+        minutes = range(0, MINUTES_PER_DAY, self.every)
+        stamps = [day_start + timedelta(minutes=minute) for minute in minutes]
+        if kind == 'station':
+            passengers = metrics['passenger_count'][:, ::self.every].tolist()
+            delays = metrics['delay_minutes'][:, ::self.every].astype(np.float64).round(1).tolist()
+            rows = [
+                {'station_id': entity_id, 'timestamp': stamp, 'passenger_count': int(count),
+                 'delay_minutes': delay, 'next_arrival': None, 'occupancy_percentage': 0.0}
+                for entity_id, counts, delay_row in zip(entity_ids, passengers, delays)
+                for stamp, count, delay in zip(stamps, counts, delay_row)
+            ]
+        else:
+            occupancy = metrics['current_occupancy'][:, ::self.every].tolist()
+            popularity = metrics['popularity_score'][:, ::self.every].tolist()
+            rows = [
+                {'attraction_id': entity_id, 'timestamp': stamp, 'popularity_score': int(score),
+                 'current_occupancy': occupied, 'estimated_wait_time': int(max(occupied - 55, 0) * 0.6)}
+                for entity_id, occupied_row, scores in zip(entity_ids, occupancy, popularity)
+                for stamp, occupied, score in zip(stamps, occupied_row, scores)
+            ]
+        for offset in range(0, len(rows), self.batch_size):
+            self.session.execute(self.tables[kind].insert(), rows[offset:offset + self.batch_size])
+        self.session.commit()
+        return len(rows)
+
+class JSONLSink:
+    """Writes one JSON object per entity and minute to a file handle, every `every` minutes"""
+
+    def __init__(self, handle, every=1):
+        from utils.fast_json import dumps
+        self.handle = handle
+        self.every = every
+        self.dumps = dumps
+
+    def write(self, kind, entity_ids, day_start, metrics):
+        names = list(metrics)
+        # float32 -> float64 round trip keeps 0.6 from serializing as 0.6000000238418579
+        columns = [metrics[name][:, ::self.every].astype(np.float64).round(1).tolist() for name in names]
+        stamps = [
+            (day_start + timedelta(minutes=minute)).isoformat()
+            for minute in range(0, MINUTES_PER_DAY, self.every)
+        ]
+        integral = {'passenger_count', 'current_occupancy', 'popularity_score'}
+        dumps = self.dumps
+        lines = []
+        for row, entity_id in enumerate(entity_ids):
+            series = [column[row] for column in columns]
+            for slot, stamp in enumerate(stamps):
+                record = {'timestamp': stamp, 'entity_type': kind, 'entity_id': entity_id}
+                for name, values in zip(names, series):
+                    value = values[slot]
+                    record[name] = int(value) if name in integral else value
+                lines.append(dumps(record))
+        self.handle.write('\n'.join(lines) + '\n')
+        return len(lines)
+
+def generate(simulator, start, days, sinks, progress=None):
+    """Simulate days of both entity kinds and feed each day to every sink; returns rows per sink"""
+    written = [0] * len(sinks)
+    for offset in range(days):
+        day_start = start.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=offset)
+        for kind in METRICS:
+            entity_ids = simulator.ids(kind)
+            if not entity_ids:
+                continue
+            metrics = simulator.day(kind, day_start)
+            for i, sink in enumerate(sinks):
+                written[i] += sink.write(kind, entity_ids, day_start, metrics)
+        if progress is not None:
+            progress(day_start, written)
+    return written
\ No newline at end of file
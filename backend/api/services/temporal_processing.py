@@ -1,9 +1,10 @@
 import logging
 from datetime import datetime, timedelta
 from collections import defaultdict
-import pandas as pd
 import numpy as np
 
+from api.services.time_series_archive import month_start, next_month
+
 logger = logging.getLogger(__name__)
 
 class TemporalProcessor:
@@ -16,6 +17,7 @@ class TemporalProcessor:
         """Process time series data for trend analysis"""
         try:
             # Convert to DataFrame for easier processing
+            import pandas as pd
             df = pd.DataFrame(data)
             df[time_column] = pd.to_datetime(df[time_column])
             df = df.sort_values(time_column)
@@ -70,6 +72,7 @@ class TemporalProcessor:
     def calculate_peak_hours(self, data, time_column, value_column):
         """Calculate peak hours from time series data"""
         try:
+            import pandas as pd
             df = pd.DataFrame(data)
             df[time_column] = pd.to_datetime(df[time_column])
             df['hour'] = df[time_column].dt.hour
@@ -114,6 +117,7 @@ class TemporalProcessor:
     def aggregate_by_period(self, data, time_column, value_column, period='hour'):
         """Aggregate data by time period"""
         try:
+            import pandas as pd
             df = pd.DataFrame(data)
             df[time_column] = pd.to_datetime(df[time_column])
             
@@ -122,15 +126,16 @@ class TemporalProcessor:
             elif period == 'day':
                 df['period'] = df[time_column].dt.floor('D')
             elif period == 'week':
-                df['period'] = df[time_column].dt.floor('W')
+                # Weeks and months are not fixed frequencies, so floor() rejects them
+                df['period'] = df[time_column].dt.to_period('W').dt.start_time
             elif period == 'month':
-                df['period'] = df[time_column].dt.floor('M')
+                df['period'] = df[time_column].dt.to_period('M').dt.start_time
             else:
                 raise ValueError(f"Unsupported period: {period}")
             
             # Aggregate values
             grouped = df.groupby('period')[value_column].agg(['mean', 'sum', 'count']).reset_index()
-            grouped['period'] = grouped['period'].dt.isoformat()
+            grouped['period'] = grouped['period'].map(lambda value: value.isoformat())
             
             return grouped.to_dict('records')
             
@@ -164,4 +169,70 @@ class TemporalProcessor:
             
         except Exception as e:
             self.logger.error(f"Error detecting anomalies: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    def slice_archive(self, archive, metric, entity_id, start, end):
+        """Get zero-copy views of one entity's archived series
+
+        Returns (chunk_start, resolution_seconds, view) tuples, one per month
+        file; each view is a slice of the memory-mapped archive.
+        """
+        try:
+            return list(archive.chunks(metric, start, end, entity_id))
+            
+        except Exception as e:
+            self.logger.error(f"Error slicing archive {metric}/{entity_id}: {e}")
+            return []
+    
+    def aggregate_archive(self, archive, metric, start, end, period='day', how='sum', entity_ids=None):
+        """Aggregate archived values per period across entities
+
+        Streams month by month over memory-mapped views, keeping only the
+        per-period totals. Returns (period_starts, values) where values is
+        a NumPy array with NaN for periods without data.
+        """
+        try:
+            if period == 'month':
+                starts = []
+                current = month_start(start)
+                while current < end:
+                    starts.append(current)
+                    current = next_month(current)
+                start = starts[0] if starts else start
+            elif period in ('hour', 'day'):
+                step = 3600 if period == 'hour' else 86400
+                start = start.replace(minute=0, second=0, microsecond=0)
+                if period == 'day':
+                    start = start.replace(hour=0)
+                count = int(np.ceil((end - start).total_seconds() / step))
+                starts = [start + timedelta(seconds=step * i) for i in range(count)]
+            else:
+                raise ValueError(f"Unsupported period: {period}")
+            
+            totals = np.zeros(len(starts))
+            counts = np.zeros(len(starts), dtype=np.int64)
+            for chunk_start, resolution, view in archive.chunks(metric, start, end, entity_ids):
+                values = np.atleast_2d(view)
+                valid = ~np.isnan(values)
+                slot_totals = np.where(valid, values, 0).sum(axis=0, dtype=np.float64)
+                slot_counts = valid.sum(axis=0)
+                
+                if period == 'month':
+                    position = starts.index(month_start(chunk_start))
+                    totals[position] += slot_totals.sum()
+                    counts[position] += slot_counts.sum()
+                else:
+                    # Chunks start on month (or window) boundaries, so periods align
+                    first = int((chunk_start - start).total_seconds() // step)
+                    bounds = np.arange(0, len(slot_totals), step // resolution)
+                    last = min(first + len(bounds), len(starts))
+                    totals[first:last] += np.add.reduceat(slot_totals, bounds)[:last - first]
+                    counts[first:last] += np.add.reduceat(slot_counts, bounds)[:last - first]
+            
+            values = totals if how == 'sum' else totals / np.maximum(counts, 1)
+            values[counts == 0] = np.nan
+            return starts, values
+            
+        except Exception as e:
+            self.logger.error(f"Error aggregating archive {metric} by {period}: {e}")
+            return [], np.empty(0)
\ No newline at end of file
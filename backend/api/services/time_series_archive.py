@@ -0,0 +1,272 @@
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'archive')
+
+def month_start(timestamp):
+    """Get the first instant of a timestamp's month"""
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(timestamp):
+    """Get the first instant of the following month"""
+    start = month_start(timestamp)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+class MonthSegment:
+    """One metric-month: a (capacity, slots) float32 memmap plus its sidecar
+
+    Rows are entities and columns are fixed-resolution time slots from the
+    start of the month, so one entity over a time range is a contiguous
+    slice of a single row. Missing values are NaN.
+    """
+
+    def __init__(self, array, meta, mtime):
+        self.array = array
+        self.meta = meta
+        self.mtime = mtime
+        self.start = datetime.fromisoformat(meta['start'])
+        self.resolution = meta['resolution']
+        self.entities = meta['entities']
+        self.rows = {entity_id: row for row, entity_id in enumerate(self.entities)}
+
+    def slot_of(self, timestamp):
+        """Get the slot index of a timestamp, clamped to the month"""
+        slot = int((timestamp - self.start).total_seconds() // self.resolution)
+        return min(max(slot, 0), self.array.shape[1])
+
+class TimeSeriesArchive:
+    """Append-only columnar archive of per-entity metric time series
+
+    Each metric has one memory-mapped .npy file per month with a JSON
+    sidecar holding the time index (month start and slot resolution) and
+    the entity row order. Reads return NumPy views into the mapped files,
+    so long-range queries only page in the months and rows they touch.
+    """
+
+    def __init__(self, path=None, resolution_seconds=60, initial_capacity=64):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path or os.environ.get('ARCHIVE_PATH', DEFAULT_ARCHIVE_PATH)
+        self.resolution = resolution_seconds
+        self.initial_capacity = initial_capacity
+        self._segments = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _paths(self, metric, start):
+        base = os.path.join(self.path, metric, start.strftime('%Y-%m'))
+        return base + '.npy', base + '.json'
+
+    def metrics(self):
+        return sorted(name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name)))
+
+    def months(self, metric):
+        """Get the month starts stored for a metric, oldest first"""
+        directory = os.path.join(self.path, metric)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            datetime.strptime(name[:-len('.json')], '%Y-%m')
+            for name in os.listdir(directory) if name.endswith('.json')
+        )
+
+    def segment(self, metric, start, create=False):
+        """Get the segment for the month containing start, or None"""
+        start = month_start(start)
+        array_path, meta_path = self._paths(metric, start)
+        key = (metric, start)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            if not create:
+                return None
+            return self._create_segment(metric, start)
+
+        # Reopen when another process rewrote the sidecar (new entities or growth)
+        segment = self._segments.get(key)
+        if segment is None or segment.mtime != mtime:
+            with open(meta_path) as handle:
+                meta = json.load(handle)
+            segment = MonthSegment(np.load(array_path, mmap_mode='r+'), meta, mtime)
+            self._segments[key] = segment
+        return segment
+
+    def _create_segment(self, metric, start):
+        array_path, meta_path = self._paths(metric, start)
+        os.makedirs(os.path.dirname(array_path), exist_ok=True)
+        slots = int((next_month(start) - start).total_seconds() // self.resolution)
+        array = np.lib.format.open_memmap(
+            array_path, mode='w+', dtype=np.float32, shape=(self.initial_capacity, slots)
+        )
+        array[:] = np.nan
+        array.flush()
+        meta = {'start': start.isoformat(), 'resolution': self.resolution, 'entities': []}
+        return self._write_meta(metric, start, array, meta)
+
+    def _write_meta(self, metric, start, array, meta):
+        """Atomically replace the sidecar and refresh the cached segment"""
+        _, meta_path = self._paths(metric, start)
+        temp_path = meta_path + '.tmp'
+        with open(temp_path, 'w') as handle:
+            json.dump(meta, handle)
+        os.replace(temp_path, meta_path)
+        segment = MonthSegment(array, meta, os.stat(meta_path).st_mtime_ns)
+        self._segments[(metric, start)] = segment
+        return segment
+
+    def _row_for(self, metric, segment, entity_id):
+        """Get the row of an entity, registering it (and growing the file) if new"""
+        segment, rows = self._rows_for(metric, segment, [entity_id])
+        return segment, rows[0]
+
+    def _rows_for(self, metric, segment, entity_ids):
+        """Get the rows of entities, registering new ones with one sidecar write and at most one growth"""
+        missing = [entity_id for entity_id in dict.fromkeys(entity_ids) if entity_id not in segment.rows]
+        if missing:
+            meta = dict(segment.meta, entities=segment.entities + missing)
+            array = segment.array
+            capacity = array.shape[0]
+            while capacity < len(meta['entities']):
+                capacity *= 2
+            if capacity > array.shape[0]:
+                # Grow by doubling: copy into a new file, then swap it in
+                array_path, _ = self._paths(metric, segment.start)
+                grown = np.lib.format.open_memmap(
+                    array_path + '.tmp', mode='w+', dtype=np.float32, shape=(capacity, array.shape[1])
+                )
+                grown[:array.shape[0]] = array
+                grown[array.shape[0]:] = np.nan
+                grown.flush()
+                del grown
+                os.replace(array_path + '.tmp', array_path)
+                array = np.load(array_path, mmap_mode='r+')
+            segment = self._write_meta(metric, segment.start, array, meta)
+        return segment, [segment.rows[entity_id] for entity_id in entity_ids]
+
+    def append(self, metric, timestamp, values):
+        """Record {entity_id: value} observed at one timestamp"""
+        with self.lock:
+            segment = self.segment(metric, timestamp, create=True)
+            slot = segment.slot_of(timestamp)
+            for entity_id, value in values.items():
+                segment, row = self._row_for(metric, segment, str(entity_id))
+                segment.array[row, slot] = value
+            segment.array.flush()
+
+    def append_series(self, metric, entity_id, timestamps, values):
+        """Bulk-record one entity's series (e.g. a backfill), vectorized per month"""
+        stamps = np.asarray(timestamps, dtype='datetime64[s]')
+        values = np.asarray(values, dtype=np.float32)
+        months = stamps.astype('datetime64[M]')
+        with self.lock:
+            for month in np.unique(months):
+                start = month.astype(datetime)
+                start = datetime(start.year, start.month, 1)
+                segment = self.segment(metric, start, create=True)
+                segment, row = self._row_for(metric, segment, str(entity_id))
+                mask = months == month
+                slots = ((stamps[mask] - np.datetime64(start, 's')).astype(np.int64) // segment.resolution)
+                segment.array[row, slots] = values[mask]
+                segment.array.flush()
+
+    def append_block(self, metric, entity_ids, start, values):
+        """Bulk-record an (entities, slots) block of values starting at start
+
+        Slots follow the archive resolution. The block is split at month
+        boundaries and each part is written with a single slice assignment,
+        so generated or backfilled data goes in at memory bandwidth.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        entity_ids = [str(entity_id) for entity_id in entity_ids]
+        if values.shape[0] != len(entity_ids):
+            raise ValueError(f"Expected {len(entity_ids)} rows, got {values.shape[0]}")
+        offset = 0
+        current = start
+        with self.lock:
+            while offset < values.shape[1]:
+                segment = self.segment(metric, current, create=True)
+                segment, rows = self._rows_for(metric, segment, entity_ids)
+                first = segment.slot_of(current)
+                count = min(values.shape[1] - offset, segment.array.shape[1] - first)
+                part = values[:, offset:offset + count]
+                if rows == list(range(rows[0], rows[0] + len(rows))):
+                    segment.array[rows[0]:rows[0] + len(rows), first:first + count] = part
+                else:
+                    segment.array[np.asarray(rows)[:, None], np.arange(first, first + count)] = part
+                segment.array.flush()
+                offset += count
+                current = next_month(current)
+
+    def chunks(self, metric, start, end, entity_ids=None):
+        """Yield (chunk_start, resolution, view) per month overlapping [start, end)
+
+        view is (entities, slots) for the requested entities, or for all
+        entities when entity_ids is None. A single entity yields a 1-D
+        zero-copy view; a contiguous all-entity read is a 2-D zero-copy
+        view; other entity subsets are gathered per month.
+        """
+        current = month_start(start)
+        while current < end:
+            segment = self.segment(metric, current)
+            if segment is not None and segment.entities:
+                first, last = segment.slot_of(max(start, current)), segment.slot_of(end)
+                chunk_start = segment.start + timedelta(seconds=first * segment.resolution)
+                if entity_ids is None:
+                    view = segment.array[:len(segment.entities), first:last]
+                elif isinstance(entity_ids, str):
+                    row = segment.rows.get(entity_ids)
+                    view = segment.array[row, first:last] if row is not None else None
+                else:
+                    rows = [segment.rows[e] for e in entity_ids if e in segment.rows]
+                    view = segment.array[rows, first:last] if rows else None
+                if view is not None and first < last:
+                    yield chunk_start, segment.resolution, view
+            current = next_month(current)
+
+    def matrix(self, metric, entity_ids, start, end, resolution_seconds=None, row_block=128):
+        """Get an (entities, periods) matrix of mean values per period over [start, end)
+
+        Periods are resolution_seconds wide from start; missing data is NaN.
+        Rows are gathered in blocks so memory stays bounded per month.
+        """
+        resolution = resolution_seconds or self.resolution
+        periods = int(math.ceil((end - start).total_seconds() / resolution))
+        sums = np.zeros((len(entity_ids), periods))
+        counts = np.zeros((len(entity_ids), periods), dtype=np.int64)
+        positions = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+
+        current = month_start(start)
+        while current < end:
+            segment = self.segment(metric, current)
+            current = next_month(current)
+            if segment is None:
+                continue
+            pairs = sorted((positions[e], row) for e, row in segment.rows.items() if e in positions)
+            first, last = segment.slot_of(max(start, segment.start)), segment.slot_of(end)
+            if not pairs or first >= last:
+                continue
+
+            # Map slots to output periods; periods are non-decreasing, so reduce by runs
+            offset = (segment.start - start).total_seconds() + first * segment.resolution
+            period_index = ((offset + np.arange(last - first) * segment.resolution) // resolution).astype(np.int64)
+            boundaries = np.flatnonzero(np.diff(period_index, prepend=-1))
+            targets = period_index[boundaries]
+
+            out_rows, segment_rows = (np.array(column) for column in zip(*pairs))
+            for block in range(0, len(out_rows), row_block):
+                rows = slice(block, block + row_block)
+                values = segment.array[segment_rows[rows], first:last]
+                valid = ~np.isnan(values)
+                index = np.ix_(out_rows[rows], targets)
+                sums[index] += np.add.reduceat(np.where(valid, values, 0), boundaries, axis=1)
+                counts[index] += np.add.reduceat(valid, boundaries, axis=1)
+
+        result = np.full(sums.shape, np.nan)
+        np.divide(sums, counts, out=result, where=counts > 0)
+        return result
\ No newline at end of file
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CUBE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'instance', 'usage_cube')
+
+AXES = ('month', 'dow', 'hour')
+CELLS = 12 * 7 * 24
+COUNT, SUM, SUMSQ = 0, 1, 2
+
+def time_cells(timestamps):
+    """Get (month 0-11, day of week Monday=0, hour) index arrays for timestamps"""
+    stamps = np.asarray(timestamps, dtype='datetime64[m]')
+    days = stamps.astype('datetime64[D]')
+    months = stamps.astype('datetime64[M]').astype(np.int64) % 12
+    dows = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    hours = (stamps - days).astype('timedelta64[h]').astype(np.int64)
+    return months, dows, hours
+
+def mean_std(stats):
+    """Get (mean, std) arrays from [..., count/sum/sumsq] stats; NaN where empty"""
+    count, total, squares = stats[..., COUNT], stats[..., SUM], stats[..., SUMSQ]
+    mean = np.full(count.shape, np.nan)
+    np.divide(total, count, out=mean, where=count > 0)
+    variance = np.full(count.shape, np.nan)
+    np.divide(squares, count, out=variance, where=count > 0)
+    return mean, np.sqrt(np.maximum(variance - mean ** 2, 0))
+
+class CubeSegment:
+    """One metric's (capacity, month, dow, hour, stat) float64 memmap plus its sidecar"""
+
+    def __init__(self, array, meta, mtime):
+        self.array = array
+        self.meta = meta
+        self.mtime = mtime
+        self.entities = meta['entities']
+        self.groups = meta['groups']
+        self.rows = {entity_id: row for row, entity_id in enumerate(self.entities)}
+
+class UsageCube:
+    """Pre-aggregated entity × month × day-of-week × hour usage statistics
+
+    Each metric is one memory-mapped array holding count, sum and sum of
+    squares per cell, updated incrementally as observations are ingested.
+    Entities carry a group label (station line, attraction category), so
+    any combination of entity, group, month and day filters reduces to a
+    row selection and a sum over at most 2016 cells per entity, without
+    touching raw observations.
+    """
+
+    def __init__(self, path=None, initial_capacity=64):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path or os.environ.get('USAGE_CUBE_PATH', DEFAULT_CUBE_PATH)
+        self.initial_capacity = initial_capacity
+        self._segments = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def _paths(self, metric):
+        base = os.path.join(self.path, metric)
+        return base + '.npy', base + '.json'
+
+    def metrics(self):
+        return sorted(name[:-len('.json')] for name in os.listdir(self.path) if name.endswith('.json'))
+
+    def segment(self, metric, create=False):
+        """Get the cube for a metric, or None"""
+        array_path, meta_path = self._paths(metric)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            if not create:
+                return None
+            array = np.lib.format.open_memmap(
+                array_path, mode='w+', dtype=np.float64, shape=(self.initial_capacity, 12, 7, 24, 3)
+            )
+            array.flush()
+            return self._write_meta(metric, array, {'entities': [], 'groups': []})
+
+        # Reopen when another process rewrote the sidecar (new entities or growth)
+        segment = self._segments.get(metric)
+        if segment is None or segment.mtime != mtime:
+            with open(meta_path) as handle:
+                meta = json.load(handle)
+            segment = CubeSegment(np.load(array_path, mmap_mode='r+'), meta, mtime)
+            self._segments[metric] = segment
+        return segment
+
+    def _write_meta(self, metric, array, meta):
+        """Atomically replace the sidecar and refresh the cached segment"""
+        _, meta_path = self._paths(metric)
+        temp_path = meta_path + '.tmp'
+        with open(temp_path, 'w') as handle:
+            json.dump(meta, handle)
+        os.replace(temp_path, meta_path)
+        segment = CubeSegment(array, meta, os.stat(meta_path).st_mtime_ns)
+        self._segments[metric] = segment
+        return segment
+
+    def _rows_for(self, metric, segment, entity_ids, groups):
+        """Get the rows of entities, registering new ones (and growing the file) in one step"""
+        groups = groups or {}
+        new = [entity_id for entity_id in dict.fromkeys(entity_ids) if entity_id not in segment.rows]
+        changed = [
+            entity_id for entity_id in entity_ids
+            if entity_id in segment.rows and entity_id in groups
+            and segment.groups[segment.rows[entity_id]] != groups[entity_id]
+        ]
+        if new or changed:
+            entities = segment.entities + new
+            labels = segment.groups + [groups.get(entity_id) for entity_id in new]
+            for entity_id in changed:
+                labels[segment.rows[entity_id]] = groups[entity_id]
+            array = segment.array
+            if len(entities) > array.shape[0]:
+                # Grow to fit: copy into a new file, then swap it in
+                array_path, _ = self._paths(metric)
+                capacity = max(array.shape[0] * 2, len(entities))
+                grown = np.lib.format.open_memmap(
+                    array_path + '.tmp', mode='w+', dtype=np.float64, shape=(capacity,) + array.shape[1:]
+                )
+                grown[:array.shape[0]] = array
+                grown.flush()
+                del grown
+                os.replace(array_path + '.tmp', array_path)
+                array = np.load(array_path, mmap_mode='r+')
+            segment = self._write_meta(metric, array, {'entities': entities, 'groups': labels})
+        return segment, np.array([segment.rows[entity_id] for entity_id in entity_ids], dtype=np.int64)
+
+    def add(self, metric, timestamp, values, groups=None):
+        """Ingest {entity_id: value} observed at one timestamp; groups maps entity_id to its label"""
+        values = {str(entity_id): value for entity_id, value in values.items() if value is not None}
+        if not values:
+            return
+        groups = {str(entity_id): group for entity_id, group in (groups or {}).items()}
+        month, dow, hour = (int(index[0]) for index in time_cells([timestamp]))
+        with self.lock:
+            segment = self.segment(metric, create=True)
+            segment, rows = self._rows_for(metric, segment, list(values), groups)
+            observed = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+            segment.array[rows, month, dow, hour] += np.column_stack(
+                (np.ones_like(observed), observed, observed * observed)
+            )
+            segment.array.flush()
+
+    def add_series(self, metric, entity_ids, timestamps, matrix, groups=None):
+        """Ingest an (entities, timestamps) matrix of observations (e.g. a backfill); NaN is skipped"""
+        entity_ids = [str(entity_id) for entity_id in entity_ids]
+        groups = {str(entity_id): group for entity_id, group in (groups or {}).items()}
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(len(entity_ids), -1)
+        months, dows, hours = time_cells(timestamps)
+        cells = months * 168 + dows * 24 + hours
+
+        # One bincount per stat over (local row, cell) ids
+        valid = ~np.isnan(matrix)
+        local_rows, positions = np.nonzero(valid)
+        ids = local_rows * CELLS + cells[positions]
+        observed = matrix[valid]
+        size = len(entity_ids) * CELLS
+        stats = np.stack([
+            np.bincount(ids, minlength=size),
+            np.bincount(ids, weights=observed, minlength=size),
+            np.bincount(ids, weights=observed * observed, minlength=size)
+        ], axis=-1).reshape(len(entity_ids), 12, 7, 24, 3)
+
+        with self.lock:
+            segment = self.segment(metric, create=True)
+            segment, rows = self._rows_for(metric, segment, entity_ids, groups)
+            segment.array[rows] += stats
+            segment.array.flush()
+
+    def backfill(self, archive, metric, start, end, groups=None):
+        """Ingest a metric's archived series over [start, end), one month segment at a time"""
+        for month in archive.months(metric):
+            segment = archive.segment(metric, month)
+            first, last = segment.slot_of(max(start, segment.start)), segment.slot_of(end)
+            if not segment.entities or first >= last:
+                continue
+            slots = np.arange(first, last)
+            timestamps = np.datetime64(segment.start, 's') + slots * np.timedelta64(segment.resolution, 's')
+            self.add_series(
+                metric, segment.entities, timestamps, segment.array[:len(segment.entities), first:last], groups
+            )
+
+    def reset(self, metric):
+        """Drop a metric's cube"""
+        with self.lock:
+            for path in self._paths(metric):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._segments.pop(metric, None)
+
+    def groups(self, metric):
+        """Get the distinct group labels of a metric's entities"""
+        segment = self.segment(metric)
+        return sorted({group for group in segment.groups if group}) if segment else []
+
+    def query(self, metric, keep=('dow', 'hour'), entity_ids=None, groups=None, months=None, days=None):
+        """Sum stats over the selected entities and cells, keeping the named axes
+
+        months (1-12) and days (0=Monday) restrict cells. Returns an array of
+        shape (*kept axes, 3) holding count/sum/sumsq, or None when the
+        metric or selection is empty.
+        """
+        segment = self.segment(metric)
+        if segment is None:
+            return None
+        selected = np.ones(len(segment.entities), dtype=bool)
+        if entity_ids is not None:
+            selected &= np.isin(np.array(segment.entities, dtype=object), [str(e) for e in entity_ids])
+        if groups is not None:
+            selected &= np.isin(np.array(segment.groups, dtype=object), list(groups))
+        rows = np.flatnonzero(selected)
+        if not len(rows):
+            return None
+
+        cube = segment.array[rows]
+        if months is not None:
+            cube = cube[:, [month - 1 for month in months]]
+        if days is not None:
+            cube = cube[:, :, list(days)]
+        drop = (0,) + tuple(axis + 1 for axis, name in enumerate(AXES) if name not in keep)
+        return cube.sum(axis=drop)
+
+    def query_by_group(self, metric, keep=('dow', 'hour'), entity_ids=None, groups=None, months=None, days=None):
+        """Run query() once per group label, as {group: stats}"""
+        results = {}
+        for group in self.groups(metric):
+            if groups is not None and group not in groups:
+                continue
+            stats = self.query(metric, keep, entity_ids, [group], months, days)
+            if stats is not None:
+                results[group] = stats
+        return results
\ No newline at end of file
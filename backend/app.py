@@ -1,105 +1,324 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
+from flask.cli import with_appcontext
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+import click
 import logging
+import multiprocessing
 from datetime import datetime
 import os
+import time
 
-# Import API routes
-from api.routes.transit_routes import transit_bp
-from api.routes.attraction_routes import attraction_bp
-from api.routes.analysis_routes import analysis_bp
-from api.routes.dashboard_routes import dashboard_bp
-
-# Import external API services
-from external_apis.grab_api import GrabAPIService
-from external_apis.google_places import GooglePlacesService
-from external_apis.foursquare_api import FoursquareService
-from external_apis.osm_api import OpenStreetMapService
-
-# Import database and caching
+# Route modules, provider services and the data stack are imported inside
+# create_app and the CLI commands, so importing this module stays cheap.
 from models.database import db, init_db
+from api.services.catalog import catalog
 from utils.data_cache import cache_manager
+from utils.fast_json import FastJSONProvider
+from utils.request_logging import configure_logging, RequestMetrics, RequestSampler
+
+def create_app(config=None, start_jobs=None):
+    """Create and configure the Flask application
+
+    Background collection jobs start unless start_jobs is False; by default
+    they are skipped when the app is loaded for a flask CLI command other
+    than `run`, so init-db, export-data, etc. do not collect concurrently.
+    """
+    configure_logging()
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    # Configuration
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'klang-valley-transit-secret-key')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///klang_valley.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JSON_SORT_KEYS'] = False
+    if config:
+        app.config.update(config)
+
+    # Enable CORS for React frontend
+    CORS(app, origins=[
+        "http://localhost:3000",
+        "http://127.0.0.1:3000",
+        os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+    ])
+
+    # Initialize database; tables are created by `flask --app app init-db`, not on every worker boot
+    db.init_app(app)
+    if os.environ.get('AUTO_MIGRATE', 'false').lower() == 'true':
+        with app.app_context():
+            init_db()
+
+    # Import and register API blueprints
+    from api.routes.transit_routes import transit_bp
+    from api.routes.attraction_routes import attraction_bp
+    from api.routes.analysis_routes import analysis_bp
+    from api.routes.dashboard_routes import dashboard_bp
+    from api.routes.admin_routes import admin_bp
+
+    app.register_blueprint(transit_bp, url_prefix='/api/transit')
+    app.register_blueprint(attraction_bp, url_prefix='/api/attractions')
+    app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+    for command in (init_db_command, export_data, rebuild_usage_cubes, generate_data):
+        app.cli.add_command(command)
+
+    # With gunicorn --preload (see gunicorn.conf.py) the catalog is built here in the
+    # master and background jobs are started per worker after the fork
+    app.extensions['data_collector'] = None
+    if os.environ.get('PRELOAD_CATALOG', 'false').lower() == 'true':
+        with app.app_context():
+            catalog.warm()
+    if start_jobs is None:
+        start_jobs = not loaded_for_cli_command()
+    if start_jobs and os.environ.get('DEFER_BACKGROUND_JOBS', 'false').lower() != 'true':
+        start_background_jobs(app)
+
+    # Health check endpoint
+    @app.route('/health')
+    def health_check():
+        """Health check endpoint"""
+        data_collector = app.extensions['data_collector']
+        return jsonify({
+            'status': 'healthy',
+            'timestamp': datetime.now().isoformat(),
+            'version': '1.0.0',
+            'pid': os.getpid(),
+            'cache': 'redis' if cache_manager.redis_client is not None else 'memory',
+            'catalog': catalog.status(),
+            'data_collection': data_collector.status() if data_collector else None
+        })
+
+    # Root endpoint
+    @app.route('/')
+    def root():
+        """Root endpoint with API information"""
+        return jsonify({
+            'message': 'Klang Valley Transit & Attractions API',
+            'version': '1.0.0',
+            'endpoints': {
+                'transit': '/api/transit',
+                'attractions': '/api/attractions',
+                'analysis': '/api/analysis',
+                'dashboard': '/api/dashboard',
+                'health': '/health'
+            },
+            'timestamp': datetime.now().isoformat()
+        })
+
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({'error': 'Endpoint not found'}), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
+    # Request timing: per-route latency histograms for every request, access log lines sampled
+    request_metrics = app.extensions['request_metrics'] = RequestMetrics()
+    sampler = RequestSampler()
+    access_logger = logging.getLogger('access')
+
+    @app.route('/metrics/routes')
+    def route_metrics():
+        """Latency and status counts per route for this worker process"""
+        return jsonify(request_metrics.snapshot(sort=request.args.get('sort', 'total_ms')))
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
 
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configuration
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'klang-valley-transit-secret-key')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///klang_valley.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JSON_SORT_KEYS'] = False
-
-# Enable CORS for React frontend
-CORS(app, origins=[
-    "http://localhost:3000",
-    "http://127.0.0.1:3000",
-    os.environ.get('FRONTEND_URL', 'http://localhost:3000')
-])
-
-# Initialize database
-db.init_app(app)
-with app.app_context():
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration_ms = (time.perf_counter() - started) * 1000
+        request_metrics.observe(request.endpoint, response.status_code, duration_ms)
+        if sampler.should_log(response.status_code, duration_ms):
+            access_logger.info('request', extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'remote_addr': request.remote_addr,
+                'sampled': response.status_code < 500 and duration_ms < sampler.slow_ms
+            })
+        return response
+
+    @app.after_request
+    def after_request(response):
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
+        return response
+
+    return app
+
+def loaded_for_cli_command():
+    """Whether the app is being built for a flask CLI command that does not serve requests"""
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.info_name != 'run'
+
+def start_background_jobs(app):
+    """Start background provider refreshes
+
+    Leader election keeps them to one worker, and spawned process pool
+    workers never start them.
+    """
+    if (os.environ.get('DATA_COLLECTION_ENABLED', 'true').lower() != 'true' or app.config.get('TESTING')
+            or multiprocessing.parent_process() is not None or app.extensions.get('data_collector')):
+        return
+    from api.services.data_collectors import create_scheduler
+    data_collector = create_scheduler(app, cache_manager.get_redis)
+    data_collector.start()
+    app.extensions['data_collector'] = data_collector
+
+def init_worker(app):
+    """Per-worker setup after forking from a preloaded master"""
+    with app.app_context():
+        # Pooled database connections opened in the master must not be shared
+        db.engine.dispose(close=False)
+    app.extensions['request_metrics'].reset()
+    start_background_jobs(app)
+
+# Schema migration, run once per deploy: flask --app app init-db
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database tables"""
     init_db()
 
-# Register API blueprints
-app.register_blueprint(transit_bp, url_prefix='/api/transit')
-app.register_blueprint(attraction_bp, url_prefix='/api/attractions')
-app.register_blueprint(analysis_bp, url_prefix='/api/analysis')
-app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
-
-# Health check endpoint
-@app.route('/health')
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
-    })
-
-# Root endpoint
-@app.route('/')
-def root():
-    """Root endpoint with API information"""
-    return jsonify({
-        'message': 'Klang Valley Transit & Attractions API',
-        'version': '1.0.0',
-        'endpoints': {
-            'transit': '/api/transit',
-            'attractions': '/api/attractions',
-            'analysis': '/api/analysis',
-            'dashboard': '/api/dashboard',
-            'health': '/health'
-        },
-        'timestamp': datetime.now().isoformat()
-    })
-
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({'error': 'Endpoint not found'}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    db.session.rollback()
-    return jsonify({'error': 'Internal server error'}), 500
-
-# Request logging middleware
-@app.before_request
-def log_request():
-    app.logger.info(f"{request.method} {request.path} - {request.remote_addr}")
-
-@app.after_request
-def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
-    return response
+# Bulk export command: flask --app app export-data transit_realtime -o out.parquet
+@click.command('export-data')
+@click.argument('table')
+@click.option('--output', '-o', required=True, type=click.Path(dir_okay=False), help='Output file')
+@click.option('--format', 'export_format', default='parquet', help='parquet, arrow or csv')
+@click.option('--columns', default=None, help='Comma-separated columns to export')
+@click.option('--start', type=click.DateTime(), default=None, help='Include rows at or after this time')
+@click.option('--end', type=click.DateTime(), default=None, help='Include rows before this time')
+@click.option('--entity', multiple=True, help='Entity id to include (repeatable)')
+@click.option('--batch-size', default=10000, show_default=True)
+@with_appcontext
+def export_data(table, output, export_format, columns, start, end, entity, batch_size):
+    """Export a table to a file in constant memory"""
+    from api.services.data_export import DataExporter, ExportError
+
+    exporter = DataExporter(batch_size=batch_size)
+    columns = columns.split(',') if columns else None
+    try:
+        chunks = exporter.stream(table, export_format, columns, start, end, list(entity) or None)
+    except ExportError as e:
+        raise click.ClickException(str(e))
+    written = 0
+    with open(output, 'wb') as handle:
+        for chunk in chunks:
+            handle.write(chunk)
+            written += len(chunk)
+    click.echo(f"Wrote {written} bytes to {output}")
+
+@click.command('rebuild-usage-cubes')
+@click.option('--start', type=click.DateTime(), default=None, help='Include archived data at or after this time')
+@click.option('--end', type=click.DateTime(), default=None, help='Include archived data before this time')
+@with_appcontext
+def rebuild_usage_cubes(start, end):
+    """Rebuild the hour-of-day usage cubes from the time series archive"""
+    from api.routes.transit_routes import get_all_station_data
+    from api.routes.attraction_routes import get_all_attractions
+    from api.routes.analysis_routes import get_archive, get_usage_cube, TRANSIT_USAGE_METRIC, ATTRACTION_USAGE_METRIC
+
+    start = start or datetime.min
+    end = end or datetime.max
+    archive, cube = get_archive(), get_usage_cube()
+    sources = (
+        (TRANSIT_USAGE_METRIC, {s['id']: s.get('line') for s in get_all_station_data()}),
+        (ATTRACTION_USAGE_METRIC, {a['id']: a.get('category') for a in get_all_attractions()})
+    )
+    for metric, groups in sources:
+        cube.reset(metric)
+        cube.backfill(archive, metric, start, end, groups)
+        stats = cube.query(metric, ())
+        click.echo(f"{metric}: {int(stats[0]) if stats is not None else 0} observations")
+
+# Scale-test data: flask --app app generate-data --start 2024-01-01 --days 90 --stations 2000
+@click.command('generate-data')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), required=True, help='First simulated day')
+@click.option('--days', default=30, show_default=True, type=click.IntRange(min=1))
+@click.option('--stations', default=0, show_default=True, type=click.IntRange(min=0),
+              help='Synthetic stations added around the catalog ones')
+@click.option('--attractions', default=0, show_default=True, type=click.IntRange(min=0),
+              help='Synthetic attractions added around the catalog ones')
+@click.option('--seed', default=0, show_default=True, type=click.IntRange(min=0))
+@click.option('--archive/--no-archive', default=True, show_default=True, help='Write per-minute values to the archive')
+@click.option('--db-every', default=0, show_default=True, type=click.IntRange(min=0, max=1440),
+              help='Insert real-time rows every N minutes (0 skips the database)')
+@click.option('--jsonl', type=click.Path(dir_okay=False), default=None, help='Also write JSON lines to this file')
+@click.option('--jsonl-every', default=1, show_default=True, type=click.IntRange(min=1, max=1440))
+@click.option('--batch-size', default=50000, show_default=True)
+@with_appcontext
+def generate_data(start, days, stations, attractions, seed, archive, db_every, jsonl, jsonl_every, batch_size):
+    """Generate deterministic per-minute station and attraction data"""
+    from api.services.synthetic_data import DemandSimulator, ArchiveSink, DatabaseSink, JSONLSink, generate
+    from api.routes.transit_routes import get_all_station_data
+    from api.routes.attraction_routes import get_all_attractions
+    from api.routes.analysis_routes import get_archive
+
+    simulator = DemandSimulator.with_synthetic_entities(
+        get_all_station_data(), get_all_attractions(), stations, attractions, seed=seed
+    )
+    sinks, labels = [], []
+    if archive:
+        sinks.append(ArchiveSink(get_archive()))
+        labels.append('archive')
+    if db_every:
+        sink = DatabaseSink(db.session, every=db_every, batch_size=batch_size)
+        sink.register_entities(simulator)
+        sinks.append(sink)
+        labels.append('database')
+    handle = open(jsonl, 'w') if jsonl else None
+    if handle is not None:
+        sinks.append(JSONLSink(handle, every=jsonl_every))
+        labels.append('jsonl')
+    if not sinks:
+        raise click.UsageError('Nothing to write: enable --archive, --db-every or --jsonl')
+
+    click.echo(f"Simulating {len(simulator.stations)} stations and {len(simulator.attractions)} "
+               f"attractions for {days} days from {start:%Y-%m-%d} (seed {seed})")
+    started = time.perf_counter()
+
+    def progress(day_start, written):
+        elapsed = time.perf_counter() - started
+        counts = ', '.join(f"{label} {count:,}" for label, count in zip(labels, written))
+        click.echo(f"{day_start:%Y-%m-%d}: {counts} rows ({sum(written) / elapsed:,.0f} rows/s)")
+
+    try:
+        written = generate(simulator, start, days, sinks, progress)
+    finally:
+        if handle is not None:
+            handle.close()
+    elapsed = time.perf_counter() - started
+    click.echo(f"Wrote {sum(written):,} rows in {elapsed:.1f} s; run rebuild-usage-cubes to refresh the cubes")
+
+_app = None
+
+def __getattr__(name):
+    # `gunicorn app:app` and `from app import app` build the application on first access
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
     # Development server
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(
         host='0.0.0.0',
         port=5000,
@@ -0,0 +1,217 @@
+"""Microbenchmarks for the processing kernels at 1k / 100k / 1M points
+
+Covers CacheManager (memory fallback and Redis, via the in-process Redis
+stand-in unless --redis-url is given), TemporalProcessor and
+SpatialProcessor/SpatialIndex. Inputs are generated from a fixed seed.
+A size is skipped when extrapolating from the previous size (or from a
+calibration run at a tenth of the smallest size) says one run would take
+longer than --budget seconds, e.g. the pairwise proximity grouping. Results are written as JSON; compare two runs with
+benchmarks/results.py.
+
+Usage (from backend/): python benchmarks/bench_kernels.py [--sizes 1000,100000,1000000]
+    [--only spatial] [--repeat 3] [--budget 30] [--output FILE]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from api.services.spatial_processing import SpatialIndex, SpatialProcessor, haversine_km
+from api.services.temporal_processing import TemporalProcessor
+from utils.data_cache import CacheManager
+
+import results
+from stubs import KLANG_VALLEY, StubRedis
+
+SEED = 20240601
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records; the processors log and swallow their exceptions"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def make_series(n, seed=SEED):
+    """Per-minute observations with a daily cycle, as the dicts the processors take"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 6, 1)
+    minutes = np.arange(n)
+    hours = (minutes // 60) % 24
+    values = 100 + 60 * np.exp(-((hours - 8) ** 2) / 4) + 50 * np.exp(-((hours - 18) ** 2) / 4)
+    values = values + rng.normal(0, 10, n)
+    stamps = [(start + timedelta(minutes=int(m))).isoformat() for m in minutes]
+    return [{'timestamp': stamp, 'value': float(value)} for stamp, value in zip(stamps, values)]
+
+def make_points(n, seed=SEED):
+    rng = np.random.default_rng(seed)
+    south, west, north, east = KLANG_VALLEY
+    lats = rng.uniform(south, north, n)
+    lngs = rng.uniform(west, east, n)
+    return lats, lngs
+
+def point_dicts(lats, lngs):
+    return [{'id': f'p{i}', 'latitude': float(lat), 'longitude': float(lng)} for i, (lat, lng) in enumerate(zip(lats, lngs))]
+
+class Kernel:
+    """One benchmarked function: setup(size) builds its input, run(input) is timed
+
+    complexity is the exponent used to extrapolate runtime to the next size.
+    """
+
+    def __init__(self, name, setup, run, complexity=1.0):
+        self.name = name
+        self.group = name.split('.')[0]
+        self.setup = setup
+        self.run = run
+        self.complexity = complexity
+
+def kernels(redis_url):
+    temporal = TemporalProcessor()
+    spatial = SpatialProcessor()
+    bounds = KLANG_VALLEY
+
+    def cache_setup(url):
+        def setup(n):
+            cache = CacheManager(url, connect=url is not None, max_memory_entries=max(n, 1))
+            if url is not None and not cache.wait_ready(5):
+                raise RuntimeError(f"Redis at {url} is not reachable")
+            keys = [f'bench:{i}' for i in range(n)]
+            return cache, keys
+        return setup
+
+    def cache_run(state):
+        cache, keys = state
+        for key in keys:
+            cache.set(key, {'value': 1}, timeout=600)
+        for key in keys:
+            cache.get(key)
+
+    def index_query(state):
+        index, lats, lngs = state
+        for lat, lng in zip(lats, lngs):
+            index.query_radius(lat, lng, 1.0)
+
+    def index_setup(n):
+        lats, lngs = make_points(n)
+        index = SpatialIndex(cell_size=0.01)
+        index.build(range(n), lats, lngs)
+        query_lats, query_lngs = make_points(1000, SEED + 1)
+        return index, query_lats.tolist(), query_lngs.tolist()
+
+    def index_build(points):
+        lats, lngs = points
+        SpatialIndex(cell_size=0.01).build(range(len(lats)), lats, lngs)
+
+    return [
+        Kernel('cache.memory_set_get', cache_setup(None), cache_run),
+        Kernel('cache.redis_set_get', cache_setup(redis_url), cache_run),
+        Kernel('temporal.process_time_series', make_series,
+               lambda data: temporal.process_time_series(data, 'timestamp', 'value')),
+        Kernel('temporal.calculate_peak_hours', make_series,
+               lambda data: temporal.calculate_peak_hours(data, 'timestamp', 'value')),
+        Kernel('temporal.aggregate_by_hour', make_series,
+               lambda data: temporal.aggregate_by_period(data, 'timestamp', 'value', 'hour')),
+        Kernel('temporal.detect_anomalies', make_series,
+               lambda data: temporal.detect_anomalies(data, 'value')),
+        Kernel('spatial.haversine_vectorized', make_points,
+               lambda points: haversine_km(3.1478, 101.6953, *points)),
+        Kernel('spatial.index_build', make_points, index_build),
+        Kernel('spatial.index_query_radius_x1000', index_setup, index_query, complexity=0.5),
+        Kernel('spatial.find_nearest_locations', lambda n: point_dicts(*make_points(n)),
+               lambda points: spatial.find_nearest_locations(3.1478, 101.6953, points, 5.0)),
+        Kernel('spatial.spatial_statistics', lambda n: point_dicts(*make_points(n)),
+               spatial.calculate_spatial_statistics),
+        Kernel('spatial.spatial_density', lambda n: point_dicts(*make_points(n)),
+               lambda points: spatial.calculate_spatial_density(points, bounds, 0.01)),
+        Kernel('spatial.group_by_proximity', lambda n: point_dicts(*make_points(n)),
+               lambda points: spatial.group_by_proximity(points, 0.5), complexity=2.0),
+    ]
+
+def measure(kernel, size, repeat, errors):
+    state = kernel.setup(size)
+    timings = []
+    errors.count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        kernel.run(state)
+        timings.append(time.perf_counter() - started)
+        # A single slow run is representative enough
+        if timings[-1] > 5:
+            break
+    return {
+        'name': f'{kernel.name}[{size}]',
+        'kernel': kernel.name,
+        'group': kernel.group,
+        'size': size,
+        'runs': len(timings),
+        'best_s': min(timings),
+        'mean_s': sum(timings) / len(timings),
+        'per_item_us': min(timings) / size * 1e6,
+        'errors_logged': errors.count
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000')
+    parser.add_argument('--only', default=None, help='Comma-separated kernel name prefixes, e.g. cache,spatial.index')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=30.0, help='Skip sizes estimated to take longer (seconds)')
+    parser.add_argument('--redis-url', default=None, help='Use this Redis instead of the in-process stand-in')
+    parser.add_argument('--output', default=None, help='JSON file (default benchmarks/results/kernels-<time>.json)')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    prefixes = args.only.split(',') if args.only else None
+    logging.getLogger().setLevel(logging.ERROR)
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    stub = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        stub = StubRedis().start()
+        redis_url = stub.url
+
+    runs = []
+    try:
+        for kernel in kernels(redis_url):
+            if prefixes and not any(kernel.name.startswith(prefix) for prefix in prefixes):
+                continue
+            calibration = max(sizes[0] // 10, 10)
+            previous = measure(kernel, calibration, 1, errors) if calibration < sizes[0] else None
+            for size in sizes:
+                if previous is not None:
+                    estimate = previous['best_s'] * (size / previous['size']) ** kernel.complexity
+                    if estimate > args.budget:
+                        print(f"{kernel.name:<40} {size:>9}   skipped (estimated {estimate:,.0f} s)")
+                        runs.append({'name': f'{kernel.name}[{size}]', 'kernel': kernel.name, 'group': kernel.group,
+                                     'size': size, 'skipped': f'estimated {estimate:.0f} s over budget'})
+                        continue
+                result = measure(kernel, size, args.repeat, errors)
+                flag = f"  ({result['errors_logged']} errors logged)" if result['errors_logged'] else ''
+                print(f"{kernel.name:<40} {size:>9} {result['best_s'] * 1000:11.1f} ms "
+                      f"{result['per_item_us']:9.3f} us/item{flag}")
+                runs.append(result)
+                previous = result
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    path = results.save('kernels', {
+        'sizes': sizes, 'repeat': args.repeat, 'budget_s': args.budget, 'only': args.only,
+        'redis': 'stub' if stub is not None else 'external', 'seed': SEED
+    }, runs, args.output)
+    print(f"\nwrote {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""End-to-end load test: the app under gunicorn, driven by concurrent clients
+
+The server runs with the production gunicorn.conf.py against a throwaway
+sqlite database, the in-process Redis stand-in (or --redis-url) and stub
+Google Places / Foursquare / Nominatim / Grab servers with a fixed
+latency, so provider-backed routes exercise the real HTTP transport
+without leaving the machine. Closed-loop clients each keep one request in
+flight, picking routes from a weighted mix with a seeded generator; the
+first --warmup seconds are not measured. Per-route and overall latency
+percentiles, throughput and error rates are written as JSON; compare two
+runs with benchmarks/results.py.
+
+Usage (from backend/): python benchmarks/bench_load.py [--duration 30] [--concurrency 16]
+    [--workers 2] [--threads 4] [--provider-latency-ms 50] [--collect] [--output FILE]
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+import results
+from bench_startup import BACKEND, probe_env
+from stubs import StubProviders, StubRedis, stub_environment
+
+# (name, weight, path); {station}, {place} and {other} are filled from the station list
+MIX = (
+    ('transit.stations', 8, '/api/transit/stations'),
+    ('transit.real_time', 10, '/api/transit/real-time'),
+    ('transit.status', 4, '/api/transit/status'),
+    ('transit.departures', 6, '/api/transit/stations/{station}/departures'),
+    ('transit.journey', 5, '/api/transit/journey?from={place}&to={other}'),
+    ('transit.demand_heatmap', 3, '/api/transit/demand/heatmap'),
+    ('attractions.search', 8, '/api/attractions/search?q={query}'),
+    ('attractions.autocomplete', 10, '/api/attractions/autocomplete?q={prefix}'),
+    ('attractions.active', 5, '/api/attractions/active'),
+    ('attractions.popularity', 3, '/api/attractions/popularity'),
+    ('analysis.trends', 5, '/api/analysis/trends'),
+    ('analysis.patterns', 3, '/api/analysis/patterns'),
+    ('analysis.correlations', 2, '/api/analysis/correlations'),
+    ('dashboard.stats', 10, '/api/dashboard/stats'),
+    ('dashboard.alerts', 3, '/api/dashboard/alerts'),
+)
+
+QUERIES = ('mall', 'museum', 'park', 'temple', 'market', 'klcc', 'bukit bintang', 'petaling street')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(args, env, port):
+    if args.server == 'gunicorn':
+        command = [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+            '--workers', str(args.workers), '--threads', str(args.threads),
+            '--bind', f'127.0.0.1:{port}', 'app:create_app()'
+        ]
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--with-threads',
+                   '--no-reload', '--host', '127.0.0.1', '--port', str(port)]
+    log = open(os.path.join(env['BENCH_WORKDIR'], 'server.log'), 'w')
+    return subprocess.Popen(command, cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def wait_healthy(base_url, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with {server.returncode}")
+        try:
+            if requests.get(f'{base_url}/health', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"Server not healthy after {timeout} s")
+
+def build_requests(base_url):
+    """Expand the mix into concrete URLs using the server's own stations"""
+    stations = requests.get(f'{base_url}/api/transit/stations', timeout=30).json()['stations']
+    if len(stations) < 2:
+        raise SystemExit('Need at least two stations for the journey route')
+    expanded = []
+    for name, weight, path in MIX:
+        variants = []
+        for i in range(8):
+            station, other = stations[i % len(stations)], stations[(i * 5 + 3) % len(stations)]
+            if other['id'] == station['id']:
+                other = stations[(i + 1) % len(stations)]
+            query = QUERIES[i % len(QUERIES)]
+            variants.append(base_url + path.format(
+                station=station['id'], place=station['name'], other=other['name'],
+                query=query, prefix=query[:2 + i % 3]
+            ))
+        expanded.append((name, weight, variants))
+    return expanded
+
+def drive(request_mix, concurrency, duration, warmup, seed):
+    """Run closed-loop clients; returns {name: [(latency_s, status), ...]} for the measured window"""
+    names = [name for name, _, _ in request_mix]
+    weights = [weight for _, weight, _ in request_mix]
+    variants = {name: urls for name, _, urls in request_mix}
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        local = []
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            url = rng.choice(variants[name])
+            try:
+                status = session.get(url, timeout=60).status_code
+            except requests.RequestException:
+                status = 0
+            finished = time.monotonic()
+            if now >= measure_from and finished <= stop_at:
+                local.append((name, finished - now, status))
+        with lock:
+            for name, latency, status in local:
+                samples[name].append((latency, status))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+def summarize(name, observations, duration):
+    latencies = np.array([latency for latency, _ in observations]) * 1000
+    statuses = np.array([status for _, status in observations])
+    count = len(observations)
+    errors = int(((statuses >= 500) | (statuses == 0)).sum()) if count else 0
+    result = {
+        'name': name,
+        'count': count,
+        'throughput_rps': count / duration,
+        'errors': errors,
+        'client_errors': int(((statuses >= 400) & (statuses < 500)).sum()) if count else 0,
+        'error_rate': errors / count if count else 0.0,
+    }
+    if count:
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        result.update({
+            'mean_ms': float(latencies.mean()), 'p50_ms': float(p50), 'p90_ms': float(p90),
+            'p99_ms': float(p99), 'max_ms': float(latencies.max())
+        })
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--server', choices=('gunicorn', 'flask'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker')
+    parser.add_argument('--provider-latency-ms', type=float, default=50.0)
+    parser.add_argument('--error-every', type=int, default=0, help='Fail every Nth provider request with a 503')
+    parser.add_argument('--redis-url', default=None, help='Use this Redis instead of the in-process stand-in')
+    parser.add_argument('--collect', action='store_true', help='Run the background provider collectors too')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help='JSON file (default benchmarks/results/load-<time>.json)')
+    args = parser.parse_args()
+
+    redis = None if args.redis_url else StubRedis().start()
+    providers = StubProviders(latency_ms=args.provider_latency_ms, error_every=args.error_every).start()
+    server = None
+    with tempfile.TemporaryDirectory() as workdir:
+        env = probe_env(workdir)
+        env.update(stub_environment(redis, providers))
+        env.update({
+            'BENCH_WORKDIR': workdir,
+            'REDIS_URL': args.redis_url or redis.url,
+            'DATA_COLLECTION_ENABLED': 'true' if args.collect else 'false',
+            'COLLECTOR_LOCK_PATH': os.path.join(workdir, 'collector.lock'),
+            'PROFILE_PATH': os.path.join(workdir, 'profiles'),
+            'LOG_LEVEL': 'WARNING',
+            'REQUEST_LOG_SAMPLE_RATE': '0',
+        })
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                       cwd=BACKEND, env=env, check=True, capture_output=True)
+
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            server = start_server(args, env, port)
+            wait_healthy(base_url, server)
+            request_mix = build_requests(base_url)
+            print(f"driving {base_url} with {args.concurrency} clients for {args.warmup:g}+{args.duration:g} s")
+            samples = drive(request_mix, args.concurrency, args.duration, args.warmup, args.seed)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+            providers.stop()
+            if redis is not None:
+                redis.stop()
+
+    runs = [summarize(name, observations, args.duration) for name, observations in samples.items()]
+    runs.append(summarize('total', [item for observations in samples.values() for item in observations], args.duration))
+    runs[-1]['provider_requests'] = dict(providers.requests)
+    if redis is not None:
+        runs[-1]['redis_commands'] = redis.commands
+
+    print(f"\n{'route':<28} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for run in runs:
+        print(f"{run['name']:<28} {run['count']:>7} {run['throughput_rps']:8.1f} {run.get('p50_ms', 0):9.1f} "
+              f"{run.get('p90_ms', 0):9.1f} {run.get('p99_ms', 0):9.1f} {run['errors']:>7}")
+
+    params = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"\nwrote {results.save('load', params, runs, args.output)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Per-row serialization cost: ORM to_dict() + json vs. projection + fast encoder
+
+Usage (from backend/): python benchmarks/bench_serialization.py [--rows 50000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from models.database import TransitStation, db
+from models.serialization import Projection
+from utils.fast_json import dumps
+
+def build_app(rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        now = datetime.now()
+        db.session.execute(TransitStation.__table__.insert(), [
+            {
+                'id': f'st_{i:07d}', 'name': f'Station {i}', 'latitude': 3.0 + i * 1e-6, 'longitude': 101.5,
+                'line': f'Line {i % 12}', 'station_type': 'lrt', 'status': 'operational',
+                'facilities': ['parking', 'wifi', 'elevator', 'toilet'], 'created_at': now, 'updated_at': now
+            }
+            for i in range(rows)
+        ])
+        db.session.commit()
+    return app
+
+def timed(label, rows, func, repeat=3):
+    best = min(_run(func) for _ in range(repeat))
+    print(f"{label:<42} {best * 1000:9.1f} ms  {best / rows * 1e6:7.2f} us/row")
+    return best
+
+def _run(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    app = build_app(args.rows)
+    projection = Projection(
+        TransitStation,
+        json_fields=('facilities',),
+        static_fields=('name', 'latitude', 'longitude', 'line', 'station_type', 'facilities'),
+        version_field='updated_at',
+        cache_size=args.rows
+    )
+
+    with app.app_context():
+        def orm_path():
+            db.session.expunge_all()
+            json.dumps([station.to_dict() for station in TransitStation.query.all()])
+
+        def projection_path():
+            dumps(list(projection.serialize_all(db.session.execute(projection.select()))))
+
+        def cold_projection_path():
+            projection._static_cache.clear()
+            projection_path()
+
+        before = timed('ORM objects + to_dict() + json.dumps', args.rows, orm_path)
+        timed('projection, cold static cache', args.rows, cold_projection_path)
+        after = timed('projection, warm static cache', args.rows, projection_path)
+        print(f"speedup (warm): {before / after:.1f}x")
+
+if __name__ == '__main__':
+    main()
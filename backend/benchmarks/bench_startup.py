@@ -0,0 +1,86 @@
+"""Cold start cost: importing app, building it with create_app() and serving the first request
+
+Each run is a fresh interpreter, so nothing is warm in sys.modules. Data
+collection is disabled and the database is a throwaway sqlite file.
+
+Usage (from backend/): python benchmarks/bench_startup.py [--runs 7] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/health')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(imported - started, created - imported, served - created)
+"""
+
+def probe_env(workdir):
+    env = dict(os.environ)
+    env.update({
+        'DATA_COLLECTION_ENABLED': 'false',
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'GEOCODE_CACHE_PATH': os.path.join(workdir, 'geocode_cache.db'),
+        'ARCHIVE_PATH': os.path.join(workdir, 'archive'),
+        'DEMAND_GRID_PATH': os.path.join(workdir, 'demand_grid'),
+        'USAGE_CUBE_PATH': os.path.join(workdir, 'usage_cube'),
+        'FORECAST_PATH': os.path.join(workdir, 'forecasts'),
+    })
+    return env
+
+def run_probe(env, flags=()):
+    result = subprocess.run(
+        [sys.executable, *flags, '-c', PROBE], cwd=BACKEND, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    return result
+
+def top_imports(env, top):
+    """Largest cumulative import times of modules imported by `import app`, from -X importtime"""
+    stderr = run_probe(env, ('-X', 'importtime')).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)', line)
+        if match and len(match.group(3)) <= 3:
+            rows.append((int(match.group(2)), match.group(4)))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15, help='Show the slowest top-level imports (0 to skip)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = probe_env(workdir)
+        timings = []
+        for _ in range(args.runs):
+            stdout = run_probe(env).stdout.strip().splitlines()[-1]
+            timings.append([float(value) for value in stdout.split()])
+
+        print(f"median of {args.runs} cold starts")
+        for label, column in (('import app', 0), ('create_app()', 1), ('first request', 2)):
+            print(f"{label:<16} {statistics.median(row[column] for row in timings) * 1000:8.1f} ms")
+        print(f"{'total':<16} {statistics.median(sum(row) for row in timings) * 1000:8.1f} ms")
+
+        if args.top:
+            print("\nslowest imports (cumulative, first run of the probe)")
+            for micros, module in top_imports(env, args.top):
+                print(f"{module:<48} {micros / 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
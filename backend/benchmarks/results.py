@@ -0,0 +1,125 @@
+"""Benchmark results as JSON files, and a comparison between two of them
+
+Every run records its parameters and the environment (commit, Python,
+NumPy, CPU count) next to the measurements, so a regression can be told
+apart from a different machine or a different workload.
+
+Usage (from backend/): python benchmarks/results.py BASE.json NEW.json [--threshold 0.1]
+exits non-zero when a metric got worse by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Compared metrics: -1 when lower is better, +1 when higher is better
+METRICS = {
+    'best_s': -1,
+    'p50_ms': -1,
+    'p90_ms': -1,
+    'p99_ms': -1,
+    'throughput_rps': 1,
+    'error_rate': -1,
+}
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'numpy': numpy_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def save(suite, params, results, output=None):
+    """Write a run to output, by default results/<suite>-<timestamp>.json; returns the path"""
+    started = datetime.now()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}-{started:%Y%m%dT%H%M%S}.json")
+    with open(output, 'w') as handle:
+        json.dump({
+            'suite': suite,
+            'created_at': started.isoformat(timespec='seconds'),
+            'environment': environment(),
+            'params': params,
+            'results': results
+        }, handle, indent=2)
+    return output
+
+def load(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+def compare(base, new, threshold=0.1):
+    """Compare matching results by name; returns (rows, regressions)
+
+    A row is (name, metric, base, new, relative_change); the change is
+    signed so that positive always means better.
+    """
+    base_results = {result['name']: result for result in base['results']}
+    rows, regressions = [], []
+    for result in new['results']:
+        previous = base_results.get(result['name'])
+        if previous is None:
+            continue
+        for metric, direction in METRICS.items():
+            before, after = previous.get(metric), result.get(metric)
+            if before is None or after is None:
+                continue
+            if before == 0:
+                change = 0.0 if after == 0 else -direction * float('inf')
+            else:
+                change = direction * (after - before) / before
+            row = (result['name'], metric, before, after, change)
+            rows.append(row)
+            if change < -threshold:
+                regressions.append(row)
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed relative slowdown (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    if base['suite'] != new['suite']:
+        raise SystemExit(f"Cannot compare {base['suite']} with {new['suite']}")
+    if base['params'] != new['params']:
+        print(f"warning: parameters differ\n  base: {base['params']}\n  new:  {new['params']}")
+    for label, run in (('base', base), ('new', new)):
+        env = run['environment']
+        print(f"{label:<5} {run['created_at']}  commit {env['commit']}{' (dirty)' if env['dirty'] else ''}  "
+              f"python {env['python']}  cpus {env['cpu_count']}")
+
+    rows, regressions = compare(base, new, args.threshold)
+    print(f"\n{'result':<44} {'metric':<15} {'base':>11} {'new':>11} {'change':>8}")
+    for name, metric, before, after, change in rows:
+        flag = '  REGRESSION' if change < -args.threshold else ''
+        print(f"{name:<44} {metric:<15} {before:11.4g} {after:11.4g} {change:+8.1%}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) worse by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""Local stand-ins for Redis and the external providers, for benchmarks and load tests
+
+StubRedis speaks enough of the Redis protocol (RESP) for redis-py and the
+commands this app sends: strings with TTLs, hashes, lists, MULTI/EXEC
+pipelines, pub/sub and the leader election EVAL scripts. StubProviders
+serves Google Places, Foursquare, Nominatim and Grab responses with fixed
+latency and deterministic payloads, so runs are comparable across
+machines and never touch a real API.
+
+Usage (from backend/): python benchmarks/stubs.py [--provider-latency-ms 50]
+prints the environment to point the app at the stubs and serves until ^C.
+"""
+import argparse
+import json
+import re
+import socketserver
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Klang Valley bounding box (south, west, north, east)
+KLANG_VALLEY = (2.85, 101.35, 3.30, 101.85)
+
+PLACE_TYPES = ('shopping_mall', 'museum', 'park', 'restaurant', 'tourist_attraction', 'place_of_worship')
+
+class RedisError(Exception):
+    """Sent back to the client as a RESP error"""
+
+class StubRedis:
+    """Threaded in-process Redis stand-in on a loopback port"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.data = {}
+        self.expires = {}
+        self.channels = {}
+        self.commands = 0
+        self.lock = threading.RLock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub._serve(self.rfile, self.wfile)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"redis://{host}:{self.server.server_address[1]}/0"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='stub-redis', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Protocol
+
+    def _serve(self, rfile, wfile):
+        queued = None
+        subscriber = None
+        try:
+            while True:
+                command = self._read_command(rfile)
+                if command is None:
+                    return
+                name = command[0].decode().upper()
+                args = command[1:]
+                if name in ('SUBSCRIBE', 'UNSUBSCRIBE'):
+                    subscriber = subscriber or _Subscriber(wfile)
+                    self._subscription(subscriber, name, args)
+                    continue
+                if name == 'MULTI':
+                    queued = []
+                    self._write(wfile, 'OK')
+                elif name == 'EXEC':
+                    with self.lock:
+                        replies = [self._call(queued_name, queued_args) for queued_name, queued_args in queued or []]
+                    queued = None
+                    self._write(wfile, replies)
+                elif name == 'DISCARD':
+                    queued = None
+                    self._write(wfile, 'OK')
+                elif queued is not None:
+                    queued.append((name, args))
+                    self._write(wfile, 'QUEUED')
+                else:
+                    with self.lock:
+                        reply = self._call(name, args)
+                    self._write(wfile, reply)
+        except (ConnectionError, OSError):
+            return
+        finally:
+            if subscriber is not None:
+                with self.lock:
+                    for members in self.channels.values():
+                        members.discard(subscriber)
+
+    def _read_command(self, rfile):
+        line = rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command, e.g. from redis-cli or telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(rfile.readline()[1:])
+            args.append(rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, value):
+        if isinstance(value, RedisError):
+            return f"-ERR {value}\r\n".encode()
+        if value is None:
+            return b'$-1\r\n'
+        if value == 'OK' or value == 'QUEUED' or value == 'PONG':
+            return f"+{value}\r\n".encode()
+        if isinstance(value, bool):
+            return f":{int(value)}\r\n".encode()
+        if isinstance(value, int):
+            return f":{value}\r\n".encode()
+        if isinstance(value, (list, tuple)):
+            return b''.join([f"*{len(value)}\r\n".encode(), *(self._encode(item) for item in value)])
+        if isinstance(value, str):
+            value = value.encode()
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def _write(self, wfile, value):
+        wfile.write(self._encode(value))
+        wfile.flush()
+
+    def _subscription(self, subscriber, name, channels):
+        with self.lock:
+            for channel in channels:
+                members = self.channels.setdefault(channel, set())
+                if name == 'SUBSCRIBE':
+                    members.add(subscriber)
+                    subscriber.channels.add(channel)
+                else:
+                    members.discard(subscriber)
+                    subscriber.channels.discard(channel)
+                kind = name.lower().encode()
+                subscriber.send(self._encode([kind, channel, len(subscriber.channels)]))
+
+    # Commands
+
+    def _call(self, name, args):
+        self.commands += 1
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return RedisError(f"unknown command '{name}'")
+        try:
+            return handler(*args)
+        except RedisError as e:
+            return e
+        except (TypeError, ValueError) as e:
+            return RedisError(f"wrong arguments for '{name}': {e}")
+
+    def _live(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def _typed(self, key, kind):
+        value = self._live(key)
+        if value is None:
+            value = self.data[key] = kind()
+        elif not isinstance(value, kind):
+            raise RedisError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def cmd_ping(self, *args):
+        return args[0] if args else 'PONG'
+
+    def cmd_client(self, *args):
+        return 'OK'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_flushdb(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return 'OK'
+
+    cmd_flushall = cmd_flushdb
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self.data) if self._live(key) is not None)
+
+    def cmd_get(self, key):
+        value = self._live(key)
+        if value is not None and not isinstance(value, bytes):
+            raise RedisError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def cmd_set(self, key, value, *options):
+        flags, ttl = set(), None
+        options = iter(options)
+        for option in options:
+            option = option.decode().upper()
+            if option == 'EX':
+                ttl = float(next(options))
+            elif option == 'PX':
+                ttl = float(next(options)) / 1000
+            else:
+                flags.add(option)
+        exists = self._live(key) is not None
+        if ('NX' in flags and exists) or ('XX' in flags and not exists):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if ttl is not None:
+            self.expires[key] = time.monotonic() + ttl
+        return 'OK'
+
+    def cmd_setex(self, key, seconds, value):
+        return self.cmd_set(key, value, b'EX', seconds)
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self.data[key]
+                removed += 1
+            self.expires.pop(key, None)
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, float(seconds) * 1000)
+
+    def cmd_pexpire(self, key, milliseconds):
+        if self._live(key) is None:
+            return 0
+        self.expires[key] = time.monotonic() + float(milliseconds) / 1000
+        return 1
+
+    def cmd_ttl(self, key):
+        if self._live(key) is None:
+            return -2
+        deadline = self.expires.get(key)
+        return -1 if deadline is None else int(deadline - time.monotonic())
+
+    def cmd_hset(self, key, *pairs):
+        fields = self._typed(key, dict)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def cmd_hget(self, key, field):
+        return (self._live(key) or {}).get(field)
+
+    def cmd_hgetall(self, key):
+        return [item for pair in (self._live(key) or {}).items() for item in pair]
+
+    def cmd_hvals(self, key):
+        return list((self._live(key) or {}).values())
+
+    def cmd_hlen(self, key):
+        return len(self._live(key) or {})
+
+    def cmd_hdel(self, key, *fields):
+        hash_ = self._live(key) or {}
+        return sum(1 for field in fields if hash_.pop(field, None) is not None)
+
+    def cmd_hincrby(self, key, field, amount):
+        fields = self._typed(key, dict)
+        value = int(fields.get(field, b'0')) + int(amount)
+        fields[field] = str(value).encode()
+        return value
+
+    def cmd_lpush(self, key, *values):
+        items = self._typed(key, list)
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def cmd_lrange(self, key, start, stop):
+        items = self._live(key) or []
+        start, stop = int(start), int(stop)
+        stop = len(items) if stop == -1 else stop + 1
+        return items[start:stop]
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self._live(key)
+        if items is not None:
+            start, stop = int(start), int(stop)
+            items[:] = items[start:(len(items) if stop == -1 else stop + 1)]
+        return 'OK'
+
+    def cmd_publish(self, channel, message):
+        members = list(self.channels.get(channel, ()))
+        for subscriber in members:
+            subscriber.send(self._encode([b'message', channel, message]))
+        return len(members)
+
+    def cmd_eval(self, script, numkeys, *args):
+        """Compare-and-act scripts: 'if get(KEYS[1]) == ARGV[1] then <pexpire|del> ...'"""
+        numkeys = int(numkeys)
+        keys, argv = args[:numkeys], args[numkeys:]
+        script = script.decode()
+        if not re.search(r"redis\.call\('get', KEYS\[1\]\) == ARGV\[1\]", script):
+            raise RedisError('only compare-and-act scripts are supported by the stub')
+        if self._live(keys[0]) != argv[0]:
+            return 0
+        if "'pexpire'" in script:
+            return self.cmd_pexpire(keys[0], argv[1])
+        if "'del'" in script:
+            return self.cmd_del(keys[0])
+        raise RedisError('unsupported script action')
+
+class _Subscriber:
+    """A pub/sub connection; writes are serialized across publishing threads"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.channels = set()
+        self.lock = threading.Lock()
+
+    def send(self, payload):
+        with self.lock:
+            try:
+                self.wfile.write(payload)
+                self.wfile.flush()
+            except OSError:
+                pass
+
+def _rng(*parts):
+    # Seeded from the request itself so every run returns the same payload
+    import random
+    return random.Random(zlib.crc32('|'.join(str(part) for part in parts).encode()))
+
+def fake_places(query, count, seed=''):
+    """Deterministic pseudo-random places around the Klang Valley for a query"""
+    rng = _rng(seed, query)
+    south, west, north, east = KLANG_VALLEY
+    title = query.strip().title() or 'Place'
+    return [
+        {
+            'id': f"stub_{zlib.crc32(f'{seed}{query}{i}'.encode()):08x}",
+            'name': f"{title} {rng.choice(('Central', 'Square', 'Gardens', 'Point', 'Heights', 'Plaza'))} {i + 1}",
+            'lat': round(rng.uniform(south, north), 6),
+            'lng': round(rng.uniform(west, east), 6),
+            'rating': round(rng.uniform(3.0, 5.0), 1),
+            'type': rng.choice(PLACE_TYPES),
+            'address': f"{rng.randint(1, 300)}, Jalan {title}, Kuala Lumpur"
+        }
+        for i in range(count)
+    ]
+
+class StubProviders:
+    """Threaded HTTP server impersonating the external place and ride-hailing APIs
+
+    Each provider lives under its own path prefix, matching the
+    <NAME>_BASE_URL overrides read by external_apis.http_client. Every
+    response waits latency_ms; every error_every-th request fails with a
+    503 to exercise the transport's retries and circuit breaker.
+    """
+
+    PROVIDERS = ('google_places', 'foursquare', 'nominatim', 'grab')
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50.0, error_every=0, results=10):
+        self.latency_ms = latency_ms
+        self.error_every = error_every
+        self.results = results
+        self.requests = {name: 0 for name in self.PROVIDERS}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        ThreadingHTTPServer.allow_reuse_address = True
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='stub-providers', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def base_urls(self):
+        return {name: f"{self.url}/{name}" for name in self.PROVIDERS}
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        provider, _, endpoint = url.path.lstrip('/').partition('/')
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if provider not in self.requests:
+            return self._send(handler, 404, {'error': f'unknown provider {provider}'})
+
+        with self.lock:
+            self.requests[provider] += 1
+            count = self.requests[provider]
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.error_every and count % self.error_every == 0:
+            return self._send(handler, 503, {'error': 'stub outage'})
+
+        body = getattr(self, f'_{provider}')(endpoint, params)
+        if body is None:
+            return self._send(handler, 404, {'error': f'unknown endpoint {endpoint}'})
+        self._send(handler, 200, body)
+
+    def _send(self, handler, status, body):
+        payload = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _google_places(self, endpoint, params):
+        if endpoint != 'textsearch/json':
+            return None
+        return {'status': 'OK', 'results': [
+            {
+                'place_id': place['id'],
+                'name': place['name'],
+                'geometry': {'location': {'lat': place['lat'], 'lng': place['lng']}},
+                'rating': place['rating'],
+                'formatted_address': place['address'],
+                'types': [place['type'], 'point_of_interest']
+            }
+            for place in fake_places(params.get('query', ''), self.results, 'google')
+        ]}
+
+    def _foursquare(self, endpoint, params):
+        if endpoint != 'venues/search':
+            return None
+        return {'meta': {'code': 200}, 'response': {'venues': [
+            {
+                'id': place['id'],
+                'name': place['name'],
+                'location': {'lat': place['lat'], 'lng': place['lng'], 'address': place['address']},
+                'categories': [{'name': place['type'].replace('_', ' ').title()}]
+            }
+            for place in fake_places(params.get('query', ''), self.results, 'foursquare')
+        ]}}
+
+    def _nominatim(self, endpoint, params):
+        if endpoint != 'search':
+            return None
+        return [
+            {
+                'osm_id': zlib.crc32(place['id'].encode()),
+                'name': place['name'],
+                'lat': str(place['lat']),
+                'lon': str(place['lng']),
+                'display_name': f"{place['name']}, {place['address']}, Malaysia",
+                'type': place['type']
+            }
+            for place in fake_places(params.get('q', ''), min(int(params.get('limit', 10)), self.results), 'nominatim')
+        ]
+
+    def _grab(self, endpoint, params):
+        rng = _rng('grab', endpoint)
+        return {
+            'active_drivers': rng.randint(800, 1600),
+            'active_passengers': rng.randint(2000, 5000),
+            'average_wait_time': round(rng.uniform(2, 8), 1)
+        }
+
+def stub_environment(redis=None, providers=None):
+    """Environment variables that point the app at running stubs"""
+    env = {}
+    if redis is not None:
+        env['REDIS_URL'] = redis.url
+    if providers is not None:
+        env.update({f"{name.upper()}_BASE_URL": url for name, url in providers.base_urls().items()})
+        env.update({
+            'GOOGLE_PLACES_API_KEY': 'stub',
+            'FOURSQUARE_CLIENT_ID': 'stub',
+            'FOURSQUARE_CLIENT_SECRET': 'stub',
+            'GRAB_API_KEY': 'stub',
+            'NOMINATIM_ENABLED': 'true'
+        })
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--redis-port', type=int, default=0)
+    parser.add_argument('--provider-port', type=int, default=0)
+    parser.add_argument('--provider-latency-ms', type=float, default=50.0)
+    parser.add_argument('--error-every', type=int, default=0, help='Fail every Nth provider request with a 503')
+    args = parser.parse_args()
+
+    redis = StubRedis(port=args.redis_port).start()
+    providers = StubProviders(port=args.provider_port, latency_ms=args.provider_latency_ms,
+                              error_every=args.error_every).start()
+    for key, value in stub_environment(redis, providers).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
-import requests
 import logging
 import os
 from datetime import datetime
 
+from external_apis.http_client import get_transport, provider_base_url
+
 logger = logging.getLogger(__name__)
 
 class FoursquareService:
@@ -11,7 +12,9 @@ class FoursquareService:
     def __init__(self):
         self.client_id = os.environ.get('FOURSQUARE_CLIENT_ID')
         self.client_secret = os.environ.get('FOURSQUARE_CLIENT_SECRET')
-        self.base_url = 'https://api.foursquare.com/v2'
+        self.base_url = provider_base_url('foursquare', 'https://api.foursquare.com/v2')
+        self.api_version = '20231101'
+        self.http = get_transport('foursquare')
     
     def search_venues(self, query, lat=None, lng=None, radius=5000):
         """Search for venues using Foursquare API"""
@@ -20,12 +23,40 @@ class FoursquareService:
             return self._generate_mock_venues(query)
         
         try:
-            # Actual Foursquare API call would go here
-            return self._generate_mock_venues(query)
+            params = {
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'v': self.api_version,
+                'query': query,
+                'radius': radius,
+                'limit': 50
+            }
+            if lat and lng:
+                params['ll'] = f"{lat},{lng}"
+            else:
+                params['near'] = 'Kuala Lumpur, Malaysia'
+            
+            response = self.http.get(f"{self.base_url}/venues/search", params=params)
+            response.raise_for_status()
+            venues = response.json().get('response', {}).get('venues', [])
+            return [self._parse_venue(venue) for venue in venues]
         except Exception as e:
             logger.error(f"Error searching venues: {e}")
             return self._generate_mock_venues(query)
     
+    def _parse_venue(self, venue):
+        """Convert a Foursquare venue into the attraction format"""
+        location = venue.get('location', {})
+        categories = venue.get('categories') or [{'name': 'Venue'}]
+        return {
+            'venue_id': venue.get('id'),
+            'name': venue.get('name'),
+            'latitude': location.get('lat'),
+            'longitude': location.get('lng'),
+            'address': location.get('address'),
+            'category': categories[0].get('name')
+        }
+    
     def _generate_mock_venues(self, query):
         """Generate mock venues data"""
         return []
@@ -1,8 +1,9 @@
-import requests
 import logging
 import os
 from datetime import datetime
 
+from external_apis.http_client import get_transport, provider_base_url
+
 logger = logging.getLogger(__name__)
 
 class GooglePlacesService:
@@ -10,7 +11,8 @@ class GooglePlacesService:
     
     def __init__(self):
         self.api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
-        self.base_url = 'https://maps.googleapis.com/maps/api/place'
+        self.base_url = provider_base_url('google_places', 'https://maps.googleapis.com/maps/api/place')
+        self.http = get_transport('google_places')
     
     def search_places(self, query, lat=None, lng=None, radius=5000):
         """Search for places using Google Places API"""
@@ -19,13 +21,32 @@ class GooglePlacesService:
             return self._generate_mock_places(query)
         
         try:
-            # Actual Google Places API call would go here
-            # For now, returning mock data
-            return self._generate_mock_places(query)
+            params = {'query': query, 'key': self.api_key}
+            if lat and lng:
+                params['location'] = f"{lat},{lng}"
+                params['radius'] = radius
+            
+            response = self.http.get(f"{self.base_url}/textsearch/json", params=params)
+            response.raise_for_status()
+            return [self._parse_place(place) for place in response.json().get('results', [])]
         except Exception as e:
             logger.error(f"Error searching places: {e}")
             return self._generate_mock_places(query)
     
+    def _parse_place(self, place):
+        """Convert a Places API result into the attraction format"""
+        location = place.get('geometry', {}).get('location', {})
+        types = place.get('types') or ['place']
+        return {
+            'place_id': place.get('place_id'),
+            'name': place.get('name'),
+            'latitude': location.get('lat'),
+            'longitude': location.get('lng'),
+            'rating': place.get('rating'),
+            'address': place.get('formatted_address'),
+            'category': types[0].replace('_', ' ').title()
+        }
+    
     def _generate_mock_places(self, query):
         """Generate mock places data"""
         if 'mall' in query.lower():
@@ -1,8 +1,9 @@
-import requests
 import logging
 import os
 from datetime import datetime
 
+from external_apis.http_client import get_transport, provider_base_url
+
 logger = logging.getLogger(__name__)
 
 class GrabAPIService:
@@ -10,8 +11,9 @@ class GrabAPIService:
     
     def __init__(self):
         self.api_key = os.environ.get('GRAB_API_KEY')
-        self.base_url = 'https://api.grab.com/v1'
+        self.base_url = provider_base_url('grab', 'https://api.grab.com/v1')
         self.rate_limit_delay = 1  # seconds between requests
+        self.http = get_transport('grab', rate=1.0 / self.rate_limit_delay, burst=1)
     
     def get_ride_hailing_data(self, region='kl'):
         """Get ride-hailing data for Klang Valley region"""
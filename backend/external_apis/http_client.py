@@ -0,0 +1,212 @@
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class TransportError(Exception):
+    """Base error raised by the shared provider transport"""
+
+class RateLimitExceeded(TransportError):
+    """Raised when a request cannot get a rate limit token in time"""
+
+class CircuitOpenError(TransportError):
+    """Raised when a provider's circuit breaker is open"""
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, timeout=None):
+        """Take one token, waiting up to timeout seconds; returns success"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Check whether a request may be sent"""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                # Let a single probe through
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+class ProviderTransport:
+    """Pooled keep-alive HTTP transport for one external provider
+
+    Wraps a requests.Session with a sized connection pool, a token bucket
+    rate limiter, retries with jittered exponential backoff and a circuit
+    breaker, so a dead upstream fails fast instead of stalling workers.
+    """
+
+    def __init__(self, name, rate=10.0, burst=None, pool_size=10, timeout=(3.05, 10),
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 failure_threshold=5, reset_timeout=30.0, max_queue_wait=5.0, headers=None):
+        self.logger = logging.getLogger(f"{self.__class__.__name__}.{name}")
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.circuit_breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.pool_size = pool_size
+        self.headers = headers
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Built on first use so importing provider services stays cheap
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    if self.headers:
+                        session.headers.update(self.headers)
+                    self._session = session
+        return self._session
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the rate limiter, retries and circuit breaker"""
+        import requests
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+
+        while True:
+            # Take the token first: a half-open probe admitted by allow() must
+            # always end in record_success() or record_failure()
+            if not self.rate_limiter.acquire(timeout=self.max_queue_wait):
+                raise RateLimitExceeded(f"Rate limit exceeded for {self.name}")
+            if not self.circuit_breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self.name}")
+
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.circuit_breaker.record_success()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} from {self.name}", response=response)
+                retry_after = self._retry_after(response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except BaseException:
+                # Not retryable, but the provider still failed to answer
+                self.circuit_breaker.record_failure()
+                raise
+
+            self.circuit_breaker.record_failure()
+            if attempt >= self.max_retries:
+                raise error
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            self.logger.warning(f"Retrying {method} {url} in {delay:.2f}s after: {error}")
+            time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        """Parse a Retry-After header given in seconds"""
+        try:
+            return min(float(response.headers['Retry-After']), self.backoff_max)
+        except (KeyError, ValueError):
+            return None
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+# Per-provider transport settings; rates are requests per second
+PROVIDER_SETTINGS = {
+    'google_places': {'rate': 10.0, 'burst': 20},
+    'foursquare': {'rate': 10.0, 'burst': 20},
+    'grab': {'rate': 1.0, 'burst': 1},
+    # Nominatim usage policy: at most 1 request per second, no bursts
+    'nominatim': {'rate': 1.0, 'burst': 1, 'pool_size': 2,
+                  'headers': {'User-Agent': 'KlangValleyVisualization/1.0'}},
+}
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+def get_transport(name, **overrides):
+    """Get the shared transport for a provider, creating it on first use"""
+    with _transports_lock:
+        if name not in _transports:
+            settings = {**PROVIDER_SETTINGS.get(name, {}), **overrides}
+            _transports[name] = ProviderTransport(name, **settings)
+        return _transports[name]
+
+def provider_base_url(name, default):
+    """Get a provider base URL, overridable via <NAME>_BASE_URL (e.g. for stub servers)"""
+    return os.environ.get(f"{name.upper()}_BASE_URL", default)
@@ -1,26 +1,79 @@
-import requests
 import logging
 import os
 from datetime import datetime
 
+from external_apis.http_client import get_transport, provider_base_url
+
 logger = logging.getLogger(__name__)
 
 class OpenStreetMapService:
     """Service for OpenStreetMap Nominatim API"""
     
     def __init__(self):
-        self.base_url = 'https://nominatim.openstreetmap.org'
+        self.base_url = provider_base_url('nominatim', 'https://nominatim.openstreetmap.org')
         self.user_agent = 'KlangValleyVisualization/1.0'
+        # Nominatim is opt-in: its usage policy forbids heavy or autocomplete use
+        self.enabled = os.environ.get('NOMINATIM_ENABLED', 'false').lower() == 'true'
+        self.http = get_transport('nominatim', headers={'User-Agent': self.user_agent})
     
     def geocode(self, query):
         """Geocode a location query"""
-        try:
-            # Actual Nominatim API call would go here
+        if not self.enabled:
             return self._generate_mock_geocoding(query)
+        
+        try:
+            return self.lookup(query)
         except Exception as e:
             logger.error(f"Error geocoding: {e}")
             return self._generate_mock_geocoding(query)
     
+    def lookup(self, query):
+        """Geocode via Nominatim, raising on transport errors; None if not found"""
+        results = self._search(query, limit=1)
+        if not results:
+            return None
+        return {
+            'lat': float(results[0]['lat']),
+            'lng': float(results[0]['lon']),
+            'display_name': results[0].get('display_name')
+        }
+    
+    def search_pois(self, query, lat=None, lng=None, radius=5000):
+        """Search points of interest by name"""
+        if not self.enabled:
+            return self._generate_mock_pois(query)
+        
+        try:
+            return [
+                {
+                    'osm_id': result.get('osm_id'),
+                    'name': result.get('name') or result.get('display_name', '').split(',')[0],
+                    'latitude': float(result['lat']),
+                    'longitude': float(result['lon']),
+                    'address': result.get('display_name'),
+                    'category': result.get('type', 'place').replace('_', ' ').title()
+                }
+                for result in self._search(query, limit=10)
+            ]
+        except Exception as e:
+            logger.error(f"Error searching POIs: {e}")
+            return self._generate_mock_pois(query)
+    
+    def _search(self, query, limit=10):
+        """Call the Nominatim search endpoint restricted to Malaysia"""
+        response = self.http.get(f"{self.base_url}/search", params={
+            'q': query,
+            'format': 'json',
+            'limit': limit,
+            'countrycodes': 'my'
+        })
+        response.raise_for_status()
+        return response.json()
+    
+    def _generate_mock_pois(self, query):
+        """Generate mock POI data"""
+        return []
+    
     def _generate_mock_geocoding(self, query):
         """Generate mock geocoding data"""
         return {
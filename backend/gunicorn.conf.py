@@ -0,0 +1,42 @@
+"""Gunicorn settings for preloaded workers
+
+    flask --app app init-db
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+The master builds the read-only catalog once and forks workers from it, so
+each worker shares those pages instead of building its own copy. Send
+SIGHUP to the master to rebuild the catalog and replace the workers.
+"""
+import gc
+import os
+
+from api.services.catalog import freeze_for_fork
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+# Threaded workers: /api/dashboard/alerts/stream holds a thread, not a whole worker
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+preload_app = True
+
+# Read by create_app() in the master
+os.environ.setdefault('PRELOAD_CATALOG', 'true')
+os.environ.setdefault('DEFER_BACKGROUND_JOBS', 'true')
+
+def pre_fork(server, worker):
+    freeze_for_fork()
+
+def post_fork(server, worker):
+    from app import init_worker
+    init_worker(server.app.wsgi())
+
+def on_reload(server):
+    from api.services.catalog import catalog
+    app = server.app.wsgi()
+    # Let the previous generation be collected once nothing references it
+    gc.unfreeze()
+    try:
+        with app.app_context():
+            catalog.reload()
+    except Exception as e:
+        server.log.error(f"Catalog reload failed, keeping generation {catalog.generation}: {e}")
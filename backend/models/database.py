@@ -1,9 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import json
 
 db = SQLAlchemy()
 
+# All timestamps, observations and created_at/updated_at alike, are naive
+# server-local time, like the archive, usage cubes and KPIs
+
 class TransitStation(db.Model):
     """Model for transit stations"""
     __tablename__ = 'transit_stations'
@@ -15,9 +17,9 @@ class TransitStation(db.Model):
     line = db.Column(db.String(100), nullable=False)
     station_type = db.Column(db.String(50))  # lrt, mrt, brt, ktm
     status = db.Column(db.String(50), default='operational')
-    facilities = db.Column(db.Text)  # JSON array of facilities
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    facilities = db.Column(db.JSON)  # array of facilities
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     # Real-time data (separate table for performance)
     real_time_data = db.relationship('TransitRealTime', backref='station', lazy=True)
@@ -31,7 +33,7 @@ class TransitStation(db.Model):
             'line': self.line,
             'station_type': self.station_type,
             'status': self.status,
-            'facilities': json.loads(self.facilities) if self.facilities else [],
+            'facilities': self.facilities or [],
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -42,7 +44,7 @@ class TransitRealTime(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     station_id = db.Column(db.String(50), db.ForeignKey('transit_stations.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now)
     passenger_count = db.Column(db.Integer, default=0)
     delay_minutes = db.Column(db.Float, default=0)
     next_arrival = db.Column(db.String(50))
@@ -71,9 +73,9 @@ class Attraction(db.Model):
     address = db.Column(db.Text)
     rating = db.Column(db.Float)
     operating_hours = db.Column(db.String(200))
-    facilities = db.Column(db.Text)  # JSON array of facilities
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    facilities = db.Column(db.JSON)  # array of facilities
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     # Real-time data
     real_time_data = db.relationship('AttractionRealTime', backref='attraction', lazy=True)
@@ -88,7 +90,7 @@ class Attraction(db.Model):
             'address': self.address,
             'rating': self.rating,
             'operating_hours': self.operating_hours,
-            'facilities': json.loads(self.facilities) if self.facilities else [],
+            'facilities': self.facilities or [],
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -99,7 +101,7 @@ class AttractionRealTime(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     attraction_id = db.Column(db.String(50), db.ForeignKey('attractions.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now)
     popularity_score = db.Column(db.Integer, default=50)  # 0-100
     current_occupancy = db.Column(db.Float, default=0)  # 0-100
     estimated_wait_time = db.Column(db.Integer, default=0)  # minutes
@@ -124,10 +126,10 @@ class TransitRoute(db.Model):
     status = db.Column(db.String(50), default='operational')
     frequency = db.Column(db.String(50))  # e.g., "3-5 min"
     operating_hours = db.Column(db.String(100))
-    station_ids = db.Column(db.Text)  # JSON array of station IDs
-    coordinates = db.Column(db.Text)  # JSON array of coordinate pairs
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    station_ids = db.Column(db.JSON)  # array of station IDs
+    coordinates = db.Column(db.JSON)  # array of coordinate pairs
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     def to_dict(self):
         return {
@@ -137,8 +139,8 @@ class TransitRoute(db.Model):
             'status': self.status,
             'frequency': self.frequency,
             'operating_hours': self.operating_hours,
-            'station_ids': json.loads(self.station_ids) if self.station_ids else [],
-            'coordinates': json.loads(self.coordinates) if self.coordinates else [],
+            'station_ids': self.station_ids or [],
+            'coordinates': self.coordinates or [],
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -152,7 +154,7 @@ class TrendAnalysis(db.Model):
     entity_id = db.Column(db.String(50), nullable=False)
     time_period = db.Column(db.String(50), nullable=False)  # hour, day, week, month
     metric_type = db.Column(db.String(50), nullable=False)  # passenger_count, popularity_score, etc.
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.now)
     value = db.Column(db.Float, nullable=False)
     
     def to_dict(self):
@@ -166,6 +168,29 @@ class TrendAnalysis(db.Model):
             'value': self.value
         }
 
+class EntityLink(db.Model):
+    """Model for entity resolution decisions linking provider POIs to canonical entities"""
+    __tablename__ = 'entity_links'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False)  # google_places, foursquare, osm, local
+    source_id = db.Column(db.String(200), nullable=False)
+    entity_id = db.Column(db.String(50), nullable=False, index=True)
+    match_score = db.Column(db.Float)  # None for singletons
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    
+    __table_args__ = (db.UniqueConstraint('source', 'source_id', name='uq_entity_link_source'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'source_id': self.source_id,
+            'entity_id': self.entity_id,
+            'match_score': self.match_score,
+            'created_at': self.created_at.isoformat()
+        }
+
 def init_db():
     """Initialize database tables"""
     try:
@@ -0,0 +1,86 @@
+import logging
+import threading
+
+from sqlalchemy import select, cast, Text
+
+from utils.fast_json import loads
+
+logger = logging.getLogger(__name__)
+
+class Projection:
+    """Precomputed column projection for serializing rows without ORM objects
+
+    Selects only the named columns as plain tuples. JSON columns are
+    fetched as raw text and decoded only on a cache miss: the decoded
+    static fields of each entity are cached by (key, version), so rows
+    whose entity has not changed skip decoding entirely. Datetimes are
+    left as-is for the fast JSON encoder to format.
+    """
+
+    def __init__(self, model, fields=None, json_fields=(), static_fields=(), key_field='id',
+                 version_field=None, cache_size=10000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        table = model.__table__
+        self.model = model
+        self.fields = list(fields or [column.name for column in table.columns])
+        self.json_fields = [field for field in self.fields if field in json_fields]
+        self.columns = [
+            cast(table.c[field], Text).label(field) if field in json_fields else table.c[field]
+            for field in self.fields
+        ]
+
+        self.static_fields = [field for field in self.fields if field in static_fields]
+        self.key_position = self.fields.index(key_field)
+        self.version_position = self.fields.index(version_field) if version_field in self.fields else None
+        self.static_positions = [(field, self.fields.index(field)) for field in self.static_fields]
+        self.json_positions = [(field, self.fields.index(field)) for field in self.json_fields]
+        self.dynamic_json_positions = [
+            (field, position) for field, position in self.json_positions if field not in self.static_fields
+        ]
+        self.cache_size = cache_size
+        self._static_cache = {}
+        self.lock = threading.Lock()
+
+    def select(self):
+        """Get a select() of the projected columns"""
+        return select(*self.columns)
+
+    def _decode_json(self, text):
+        return loads(text) if text else []
+
+    def _static_values(self, row):
+        """Get the decoded static fields of a row, cached per entity version"""
+        cache_key = (row[self.key_position], row[self.version_position])
+        values = self._static_cache.get(cache_key)
+        if values is None:
+            values = {
+                field: self._decode_json(row[position]) if field in self.json_fields else row[position]
+                for field, position in self.static_positions
+            }
+            if cache_key[1] is None:
+                # Unversioned rows cannot be invalidated, so are not cached
+                return values
+            with self.lock:
+                if len(self._static_cache) >= self.cache_size:
+                    # Drop the oldest entry (dicts keep insertion order)
+                    self._static_cache.pop(next(iter(self._static_cache)), None)
+                self._static_cache[cache_key] = values
+        return values
+
+    def serialize(self, row):
+        """Convert one projected row tuple into a dict"""
+        result = dict(zip(self.fields, row))
+        if self.version_position is not None and self.static_fields:
+            result.update(self._static_values(row))
+            json_positions = self.dynamic_json_positions
+        else:
+            json_positions = self.json_positions
+        for field, position in json_positions:
+            result[field] = self._decode_json(row[position])
+        return result
+
+    def serialize_all(self, rows):
+        """Lazily convert projected row tuples into dicts"""
+        serialize = self.serialize
+        for row in rows:
+            yield serialize(row)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Circuit breaker transitions of ProviderTransport against a local stub server"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from external_apis.http_client import (
+    CircuitBreaker, CircuitOpenError, ProviderTransport, RateLimitExceeded, TokenBucket
+)
+
+class StubServer:
+    """Answers every GET with the current status code"""
+
+    def __init__(self):
+        self.status = 200
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+def make_transport(**overrides):
+    settings = {'rate': 1000.0, 'burst': 1000, 'max_retries': 0, 'failure_threshold': 2,
+                'reset_timeout': 0.2, 'max_queue_wait': 0.0}
+    return ProviderTransport('test', **{**settings, **overrides})
+
+def open_circuit(transport, stub):
+    stub.status = 503
+    for _ in range(transport.circuit_breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            transport.get(stub.url)
+    assert transport.circuit_breaker.state == CircuitBreaker.OPEN
+
+def test_open_circuit_fails_fast(stub):
+    transport = make_transport()
+    open_circuit(transport, stub)
+    sent = stub.requests
+    with pytest.raises(CircuitOpenError):
+        transport.get(stub.url)
+    assert stub.requests == sent
+
+def test_successful_probe_closes_circuit(stub):
+    transport = make_transport()
+    open_circuit(transport, stub)
+    time.sleep(0.25)
+    stub.status = 200
+    assert transport.get(stub.url).status_code == 200
+    assert transport.circuit_breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_circuit(stub):
+    transport = make_transport()
+    open_circuit(transport, stub)
+    time.sleep(0.25)
+    with pytest.raises(requests.HTTPError):
+        transport.get(stub.url)
+    assert transport.circuit_breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        transport.get(stub.url)
+
+def test_probe_raising_other_errors_reopens_circuit(stub):
+    transport = make_transport()
+    open_circuit(transport, stub)
+    time.sleep(0.25)
+    stub.status = 200
+    with pytest.raises(requests.exceptions.InvalidSchema):
+        transport.get('foo://not-http')
+    assert transport.circuit_breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.25)
+    assert transport.get(stub.url).status_code == 200
+    assert transport.circuit_breaker.state == CircuitBreaker.CLOSED
+
+def test_rate_limited_request_does_not_consume_probe(stub):
+    transport = make_transport()
+    open_circuit(transport, stub)
+    time.sleep(0.25)
+    transport.rate_limiter = TokenBucket(1.0, 1)
+    transport.rate_limiter.tokens = 0
+    with pytest.raises(RateLimitExceeded):
+        transport.get(stub.url)
+    assert transport.circuit_breaker.state == CircuitBreaker.OPEN
+    transport.rate_limiter.tokens = 1
+    stub.status = 200
+    assert transport.get(stub.url).status_code == 200
+    assert transport.circuit_breaker.state == CircuitBreaker.CLOSED
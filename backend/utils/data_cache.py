@@ -1,34 +1,119 @@
-import redis
 import json
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
+from itertools import islice
 import os
 
 logger = logging.getLogger(__name__)
 
+# Filled with redis' connection errors once the client library is imported
+CONNECTION_ERRORS = ()
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'snapshots')
+
 class CacheManager:
-    def __init__(self):
-        self.redis_client = None
-        self.memory_cache = {}  # Fallback to memory cache
+    """Redis-backed cache with an in-memory fallback
+
+    The Redis connection is made by a background thread, so creating the
+    manager (at import, in every worker) never blocks on the network. Until
+    Redis answers, and after it drops, callers transparently use the memory
+    cache while the thread reconnects with exponential backoff.
+    """
+
+    def __init__(self, redis_url=None, connect_timeout=1.0, socket_timeout=5.0, max_backoff=30.0, connect=True,
+                 max_memory_entries=None):
+        self.redis_url = redis_url or os.environ.get('REDIS_URL', 'redis://localhost:6379')
+        self.connect_timeout = connect_timeout
+        self.socket_timeout = socket_timeout
+        self.max_backoff = max_backoff
+        self.memory_cache = {}  # Fallback to memory cache, oldest write first
+        self.max_memory_entries = int(max_memory_entries or os.environ.get('MEMORY_CACHE_MAX_ENTRIES', 5000))
         self.default_timeout = 300  # 5 minutes default
-        
-        # Try to initialize Redis connection
-        try:
-            redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379')
-            self.redis_client = redis.from_url(redis_url, decode_responses=True)
-            # Test connection
-            self.redis_client.ping()
-            logger.info("Redis cache initialized successfully")
-        except Exception as e:
-            logger.warning(f"Redis cache not available, using memory cache: {e}")
-            self.redis_client = None
+        self._client = None
+        self._connector = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        if connect:
+            self.connect()
+        # Forked workers (e.g. gunicorn --preload) must not share the parent's sockets or thread
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def redis_client(self):
+        """The Redis client while connected, otherwise None"""
+        return self._client
+
+    def get_redis(self):
+        """Get the current Redis client or None; pass this to services that outlive reconnects"""
+        return self._client
+
+    def connect(self):
+        """Start connecting to Redis in the background unless already connected or connecting"""
+        with self._lock:
+            if self._client is not None or (self._connector is not None and self._connector.is_alive()):
+                return
+            self._ready.clear()
+            self._connector = threading.Thread(target=self._connect_loop, name='cache-connect', daemon=True)
+            self._connector.start()
+
+    def _connect_loop(self):
+        global CONNECTION_ERRORS
+        delay = 0.5
+        warned = False
+        while True:
+            try:
+                import redis
+                CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+                client = redis.from_url(
+                    self.redis_url, decode_responses=True,
+                    socket_connect_timeout=self.connect_timeout, socket_timeout=self.socket_timeout
+                )
+                client.ping()
+                self._client = client
+                logger.info("Redis cache initialized successfully")
+                self._ready.set()
+                return
+            except Exception as e:
+                if not warned:
+                    logger.warning(f"Redis cache not available, using memory cache: {e}")
+                    warned = True
+                    # Callers waiting for the first attempt can go ahead with the memory cache
+                    self._ready.set()
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def wait_ready(self, timeout=None):
+        """Wait for the first connection attempt; returns whether Redis is available"""
+        self._ready.wait(timeout)
+        return self._client is not None
+
+    def _disconnected(self, error):
+        """Drop a failed client and reconnect in the background"""
+        logger.warning(f"Lost Redis connection, using memory cache: {error}")
+        self._client = None
+        self.connect()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        connecting = self._connector is not None
+        self._connector = None
+        if self._client is not None:
+            # Drop connections inherited from the parent; the pool reconnects lazily
+            self._client.connection_pool.reset()
+        elif connecting:
+            # The parent's connect thread does not survive the fork
+            self.connect()
 
     def get(self, key):
         """Get data from cache"""
         try:
-            if self.redis_client:
+            client = self.redis_client
+            if client:
                 # Try Redis first
-                value = self.redis_client.get(key)
+                value = client.get(key)
                 if value:
                     return json.loads(value)
             else:
@@ -43,6 +128,8 @@ class CacheManager:
                         del self.memory_cache[key]
             
             return None
+        except CONNECTION_ERRORS as e:
+            self._disconnected(e)
         except Exception as e:
             logger.error(f"Cache get error: {e}")
             return None
@@ -53,51 +140,65 @@ class CacheManager:
             if timeout is None:
                 timeout = self.default_timeout
             
-            if self.redis_client:
+            client = self.redis_client
+            if client:
                 # Use Redis
-                self.redis_client.setex(key, timeout, json.dumps(value, default=str))
+                client.setex(key, timeout, json.dumps(value, default=str))
             else:
                 # Use memory cache
                 expires_at = datetime.now() + timedelta(seconds=timeout)
+                # Re-insert so the dict stays ordered by last write
+                self.memory_cache.pop(key, None)
                 self.memory_cache[key] = {
                     'data': value,
                     'expires_at': expires_at
                 }
-                # Clean up old entries occasionally
-                if len(self.memory_cache) > 1000:
+                if len(self.memory_cache) > self.max_memory_entries:
                     self._cleanup_memory_cache()
                     
             logger.debug(f"Cache set: {key}")
+        except CONNECTION_ERRORS as e:
+            self._disconnected(e)
         except Exception as e:
             logger.error(f"Cache set error: {e}")
 
     def delete(self, key):
         """Delete data from cache"""
         try:
-            if self.redis_client:
-                self.redis_client.delete(key)
+            client = self.redis_client
+            if client:
+                client.delete(key)
             else:
                 if key in self.memory_cache:
                     del self.memory_cache[key]
                     
             logger.debug(f"Cache deleted: {key}")
+        except CONNECTION_ERRORS as e:
+            self._disconnected(e)
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
 
     def flush(self):
         """Clear all cache"""
         try:
-            if self.redis_client:
-                self.redis_client.flushdb()
+            client = self.redis_client
+            if client:
+                client.flushdb()
             else:
                 self.memory_cache.clear()
                 
             logger.info("Cache flushed")
+        except CONNECTION_ERRORS as e:
+            self._disconnected(e)
         except Exception as e:
             logger.error(f"Cache flush error: {e}")
 
     def _cleanup_memory_cache(self):
-        """Clean up expired items from memory cache"""
+        """Drop expired items, then the oldest writes, down to three quarters of the cap
+
+        Trimming below the cap means the full scan runs once per batch of
+        writes rather than on every write once the cache is full.
+        """
         now = datetime.now()
         expired_keys = [
             key for key, item in self.memory_cache.items()
@@ -105,9 +206,70 @@ class CacheManager:
         ]
         for key in expired_keys:
             del self.memory_cache[key]
-        
-        if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired cache items")
+
+        excess = len(self.memory_cache) - self.max_memory_entries * 3 // 4
+        evicted = list(islice(self.memory_cache, max(excess, 0)))
+        for key in evicted:
+            del self.memory_cache[key]
+
+        if expired_keys or evicted:
+            logger.debug(f"Cleaned up {len(expired_keys)} expired and evicted {len(evicted)} cache items")
+
+class SharedSnapshots:
+    """Latest outputs of the collection jobs, readable from every worker
+
+    The collecting leader writes each snapshot to the cache and to a JSON
+    file under SNAPSHOT_PATH (replaced atomically). Readers use the cache
+    and fall back to the file, so without Redis the other workers on the
+    host still see what the leader collected instead of their own empty
+    memory cache.
+    """
+
+    def __init__(self, cache, path=None):
+        self.cache = cache
+        self.path = path or os.environ.get('SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+        self._parsed = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name.replace(':', '_')}.json")
+
+    def set(self, name, value, timeout):
+        from utils.fast_json import dumps
+
+        self.cache.set(name, value, timeout)
+        path = self._file(name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(temp_path, 'w') as handle:
+                handle.write(dumps({'expires_at': time.time() + timeout, 'value': value}))
+            os.replace(temp_path, path)
+        except (OSError, TypeError) as e:
+            logger.error(f"Failed to write snapshot {name}: {e}")
+
+    def get(self, name):
+        """Get a snapshot from the cache, else from its file; None when missing or expired"""
+        from utils.fast_json import loads
+
+        value = self.cache.get(name)
+        if value is not None:
+            return value
+        path = self._file(name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            parsed = self._parsed.get(name)
+            # Parse each written version once per process
+            if parsed is None or parsed[0] != mtime:
+                with open(path, 'rb') as handle:
+                    data = loads(handle.read())
+                parsed = self._parsed[name] = (mtime, data['expires_at'], data['value'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to read snapshot {name}: {e}")
+            return None
+        return parsed[2] if parsed[1] > time.time() else None
 
 # Global cache manager instance
-cache_manager = CacheManager()
\ No newline at end of file
+cache_manager = CacheManager()
+shared_snapshots = SharedSnapshots(cache_manager)
\ No newline at end of file
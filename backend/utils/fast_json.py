@@ -0,0 +1,56 @@
+import json
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+def _default(value):
+    """Encode values the fast encoder does not handle natively"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value, default=_default):
+    """Encode to a JSON string; datetimes become ISO 8601 strings"""
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=_OPTIONS).decode('utf-8')
+    return json.dumps(value, default=default, separators=(',', ':'))
+
+def loads(value):
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding responses with orjson when available
+
+    Datetimes are passed through to Flask's default handling so response
+    formats are unchanged.
+    """
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('separators', None)
+        if orjson is None or kwargs:
+            return super().dumps(obj, indent=indent, **kwargs)
+        option = _OPTIONS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
\ No newline at end of file
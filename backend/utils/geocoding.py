@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'geocode_cache.db')
+
+def normalize_place_name(value):
+    """Normalize a place name for matching: lowercase ASCII words"""
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', ' ', value.lower()).strip()
+
+def trigrams(value):
+    """Get the set of padded character trigrams of a normalized name"""
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class Gazetteer:
+    """In-memory place name index with exact, prefix and trigram lookup"""
+
+    def __init__(self, min_similarity=0.5):
+        self.min_similarity = min_similarity
+        self.entries = []
+        self._exact = {}
+        self._sorted_keys = []
+        self._postings = {}
+        self._gram_counts = []
+        self._keys_sorted = True
+
+    def add(self, name, lat, lng, kind='place', source='catalog'):
+        """Add a named place; the first entry for a name wins"""
+        key = normalize_place_name(name)
+        if not key or key in self._exact:
+            return
+        entry = {'name': name, 'lat': float(lat), 'lng': float(lng), 'type': kind, 'source': source}
+        position = len(self.entries)
+        self.entries.append(entry)
+        self._exact[key] = position
+        self._sorted_keys.append(key)
+        self._keys_sorted = False
+        grams = trigrams(key)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(position)
+
+    def add_locations(self, locations, kind):
+        """Add dicts with name/latitude/longitude keys"""
+        for location in locations:
+            self.add(location['name'], location['latitude'], location['longitude'], kind)
+
+    def load_extract(self, path):
+        """Load a JSON-lines OSM extract of {name, lat, lon, type} records"""
+        count = 0
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.add(record['name'], record['lat'], record['lon'], record.get('type', 'place'), 'osm_extract')
+                count += 1
+        logger.info(f"Loaded {count} gazetteer entries from {path}")
+        return count
+
+    def lookup(self, query):
+        """Find the best entry for a query, or None"""
+        key = normalize_place_name(query)
+        if not key:
+            return None
+        if key in self._exact:
+            return self.entries[self._exact[key]]
+        return self._prefix_match(key) or self._fuzzy_match(key)
+
+    def complete(self, prefix, limit=10):
+        """Get entries whose normalized name starts with a prefix"""
+        key = normalize_place_name(prefix)
+        if not self._keys_sorted:
+            self._sorted_keys.sort()
+            self._keys_sorted = True
+        results = []
+        for i in range(bisect_left(self._sorted_keys, key), len(self._sorted_keys)):
+            candidate = self._sorted_keys[i]
+            if not candidate.startswith(key) or len(results) >= limit:
+                break
+            results.append(self.entries[self._exact[candidate]])
+        return results
+
+    def _prefix_match(self, key):
+        """Match a query that is an unambiguous prefix of one name"""
+        matches = self.complete(key, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+    def _fuzzy_match(self, key):
+        """Match by trigram Jaccard similarity"""
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        if not shared:
+            return None
+
+        best, best_score = None, 0.0
+        for position, overlap in shared.items():
+            score = overlap / (len(grams) + self._gram_counts[position] - overlap)
+            if score > best_score:
+                best, best_score = position, score
+        return self.entries[best] if best_score >= self.min_similarity else None
+
+class GeocodeStore:
+    """SQLite-backed persistent store of remote geocoding results
+
+    Misses are cached too (as negative results) for negative_ttl seconds,
+    so repeated unknown queries do not hit the remote geocoder again.
+    """
+
+    def __init__(self, path=None, ttl=30 * 86400, negative_ttl=86400):
+        self.path = path or os.environ.get('GEOCODE_CACHE_PATH', DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        # SQLite connections must not be shared with forked workers
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_connections)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS geocodes ('
+            'query TEXT PRIMARY KEY, found INTEGER NOT NULL, lat REAL, lng REAL, '
+            'display_name TEXT, created_at REAL NOT NULL)'
+        )
+
+    def _reset_connections(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        """Get this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Get (hit, result) for a normalized query; result is None for negatives"""
+        row = self._connection().execute(
+            'SELECT found, lat, lng, display_name, created_at FROM geocodes WHERE query = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        found, lat, lng, display_name, created_at = row
+        if time.time() - created_at > (self.ttl if found else self.negative_ttl):
+            return False, None
+        if not found:
+            return True, None
+        return True, {'lat': lat, 'lng': lng, 'display_name': display_name}
+
+    def put(self, key, result):
+        """Store a result (or None for a negative result)"""
+        if result is None:
+            values = (key, 0, None, None, None, time.time())
+        else:
+            values = (key, 1, result['lat'], result['lng'], result.get('display_name'), time.time())
+        self._connection().execute('INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)', values)
+
+class LocalGeocoder:
+    """Geocoder answering from the gazetteer and cache before the remote service
+
+    Lookup order: local gazetteer, persistent store (including negative
+    results), then the remote geocoder on a true miss. Remote calls are
+    rate limited by the provider transport.
+    """
+
+    def __init__(self, remote=None, store=None, gazetteer=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.remote = remote
+        self.store = store or GeocodeStore()
+        self.gazetteer = gazetteer or Gazetteer()
+        self.stats = Counter()
+
+    def geocode(self, query):
+        """Geocode a query, returning {'lat', 'lng', 'display_name', 'source'} or None"""
+        key = normalize_place_name(query or '')
+        if not key:
+            return None
+
+        entry = self.gazetteer.lookup(key)
+        if entry:
+            self.stats['gazetteer'] += 1
+            return {'lat': entry['lat'], 'lng': entry['lng'], 'display_name': entry['name'], 'source': 'gazetteer'}
+
+        try:
+            hit, result = self.store.get(key)
+        except sqlite3.Error as e:
+            self.logger.error(f"Geocode cache read error: {e}")
+            hit, result = False, None
+        if hit:
+            self.stats['cache'] += 1
+            return {**result, 'source': 'cache'} if result else None
+
+        if self.remote is None or not getattr(self.remote, 'enabled', True):
+            self.stats['unavailable'] += 1
+            return None
+
+        self.stats['remote'] += 1
+        try:
+            result = self.remote.lookup(query)
+        except Exception as e:
+            # Transport failures are not cached so the next query retries
+            self.logger.error(f"Remote geocoding failed: {e}")
+            return None
+        try:
+            self.store.put(key, result)
+        except sqlite3.Error as e:
+            self.logger.error(f"Geocode cache write error: {e}")
+        return {**result, 'source': 'nominatim'} if result else None
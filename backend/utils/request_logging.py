@@ -0,0 +1,242 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def _log_default(value):
+    """Encode extra= values the JSON encoder does not know as strings rather than losing the record"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return dumps(entry, default=_log_default)
+
+class TextFormatter(logging.Formatter):
+    """Format records as one text line, with extra= fields appended as key=value pairs"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s [%(name)s] %(message)s')
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        extras = ' '.join(
+            f"{key}={_log_default(value)}" for key, value in vars(record).items() if key not in _RECORD_FIELDS
+        )
+        return f"{line} {extras}" if extras else line
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records as they are
+
+    The stock prepare() formats the record on the calling thread and drops
+    exc_info so the record can be pickled; the queue here never leaves the
+    process, so formatting (including tracebacks) is left to the listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+class LogPipeline:
+    """Root logging through a queue, drained by a background listener thread
+
+    Callers only enqueue the record; formatting and writing to the real
+    handlers happen on the listener thread, so a slow stderr or file never
+    stalls a request. The listener is restarted in forked workers.
+    """
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = RecordQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+    def start(self):
+        self.listener.start()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        return self
+
+    def stop(self):
+        # Flushes queued records; a no-op when already stopped
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def _after_fork(self):
+        # The listener thread did not survive the fork; start a fresh one on a new queue
+        self.queue = queue.SimpleQueue()
+        self.queue_handler.queue = self.queue
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+_pipeline = None
+
+def configure_logging(level=None, log_format=None):
+    """Route all logging through the background pipeline; safe to call more than once
+
+    LOG_LEVEL (default INFO) and LOG_FORMAT (json or text, default json) set
+    the defaults.
+    """
+    global _pipeline
+    if _pipeline is not None:
+        return _pipeline
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_format = log_format or os.environ.get('LOG_FORMAT', 'json')
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JSONFormatter() if log_format == 'json' else TextFormatter())
+    _pipeline = LogPipeline([handler]).start()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_pipeline.queue_handler)
+    root.setLevel(level)
+    return _pipeline
+
+class RequestSampler:
+    """Decide which requests get an access log line
+
+    Errors and slow requests are always logged; the rest at sample_rate.
+    """
+
+    def __init__(self, sample_rate=None, slow_ms=None):
+        self.sample_rate = float(sample_rate if sample_rate is not None else os.environ.get('REQUEST_LOG_SAMPLE_RATE', 0.1))
+        self.slow_ms = float(slow_ms if slow_ms is not None else os.environ.get('REQUEST_LOG_SLOW_MS', 1000))
+
+    def should_log(self, status, duration_ms):
+        if status >= 500 or duration_ms >= self.slow_ms:
+            return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+class RouteStats:
+    """Latency histogram and status counts for one endpoint"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'buckets', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.statuses = Counter()
+
+    def add(self, status, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.statuses[status] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.statuses.update(other.statuses)
+
+    def quantile(self, q):
+        """Estimate a latency quantile by interpolating within its histogram bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS_MS[i - 1] if i else 0.0
+                upper = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+                return round(min(lower + (upper - lower) * (rank - seen) / count, self.max_ms), 2)
+            seen += count
+        return round(self.max_ms, 2)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p90_ms': self.quantile(0.9),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'total_ms': round(self.total_ms, 1),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'histogram': {
+                (f'le_{bound}' if i < len(LATENCY_BUCKETS_MS) else 'inf'): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.buckets))
+            }
+        }
+
+class RequestMetrics:
+    """Per-endpoint request latency and status counts for this process
+
+    Keyed by Flask endpoint (blueprint.view), so unmatched paths share one
+    entry instead of growing the table.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.started_at = datetime.now()
+        self.lock = threading.Lock()
+
+    def observe(self, endpoint, status, duration_ms):
+        endpoint = endpoint or '<unmatched>'
+        with self.lock:
+            stats = self.routes.get(endpoint)
+            if stats is None:
+                stats = self.routes[endpoint] = RouteStats()
+            stats.add(status, duration_ms)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.started_at = datetime.now()
+
+    def snapshot(self, sort='total_ms'):
+        """Get per-route and per-blueprint stats, slowest (by sort key) first"""
+        with self.lock:
+            routes = {endpoint: stats.to_dict() for endpoint, stats in self.routes.items()}
+            blueprints = {}
+            for endpoint, stats in self.routes.items():
+                blueprint = endpoint.rsplit('.', 1)[0] if '.' in endpoint else '<app>'
+                blueprints.setdefault(blueprint, RouteStats()).merge(stats)
+        ordered = sorted(routes.items(), key=lambda item: item[1].get(sort) or 0, reverse=True)
+        return {
+            'pid': os.getpid(),
+            'since': self.started_at.isoformat(),
+            'routes': [{'endpoint': endpoint, **stats} for endpoint, stats in ordered],
+            'blueprints': {name: stats.to_dict() for name, stats in sorted(blueprints.items())}
+        }
\ No newline at end of file
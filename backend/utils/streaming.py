@@ -0,0 +1,64 @@
+import logging
+
+from models.database import db
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+def page_args(args, default_limit=DEFAULT_PAGE_SIZE):
+    """Parse keyset pagination args (?after=<id>&limit=) from a request"""
+    after = args.get('after') or None
+    limit = min(max(int(args.get('limit', default_limit)), 1), MAX_PAGE_SIZE)
+    return after, limit
+
+def keyset_page(statement, key_column, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Restrict an ordered select to the page after a key
+
+    One extra row is fetched so the stream can tell whether another page
+    follows without a count query.
+    """
+    if after is not None:
+        statement = statement.where(key_column > after)
+    return statement.order_by(key_column).limit(limit + 1)
+
+def iter_rows(statement, batch_size=DEFAULT_PAGE_SIZE):
+    """Iterate result rows through a server-side cursor, batch_size at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+def stream_json_list(rows, list_key, key_of, limit, encode=dumps, flush_every=100, **fields):
+    """Incrementally encode {**fields, list_key: [...], count, next_after}
+
+    rows yields dicts the encoder can serialize; at most limit rows are written,
+    and next_after is the key of the last row when more rows follow.
+    Output is flushed every flush_every rows, so the first bytes go out as
+    soon as the first batch is fetched.
+    """
+    head = encode(fields)[:-1]
+    yield f'{head}{", " if fields else ""}"{list_key}": ['
+
+    count = 0
+    last_key = None
+    has_more = False
+    buffer = []
+    for row in rows:
+        if count == limit:
+            has_more = True
+            break
+        buffer.append(encode(row))
+        count += 1
+        last_key = key_of(row)
+        if len(buffer) >= flush_every:
+            yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+            buffer = []
+    if buffer:
+        yield ('' if count == len(buffer) else ',') + ','.join(buffer)
+
+    yield f'], "count": {count}, "next_after": {encode(last_key if has_more else None)}}}'